@@ -0,0 +1,127 @@
+"""Защита от перегрузки: лимит запросов на клиента, очередь к LLM, бюджет времени запроса.
+
+Когда DeepSeek тормозит, запросы не должны копиться за ним без предела:
+- RateLimiter - token bucket на клиента: сверх лимита сразу 429 с Retry-After;
+- ConcurrencyGate - не больше N одновременных вызовов LLM, остальные ждут
+  в ограниченной очереди не дольше заданного времени (AsyncConcurrencyGate -
+  то же для asyncio);
+- Deadline - сквозной бюджет запроса: очередь и ответ DeepSeek ограничены
+  остатком бюджета, а когда он кончился - сразу локальная логика.
+"""
+import time, threading
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """Token bucket на клиента: rate запросов в секунду, всплеск до burst; rate <= 0 - без лимита"""
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()   # клиент -> (токены, когда пересчитаны)
+        self._lock = threading.Lock()
+
+    def acquire(self, client):
+        """0 - запрос пропущен, иначе через сколько секунд появится токен"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens, wait = tokens - 1, 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            # давно не приходившие клиенты забываются (вернутся с полным ведром)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyGate:
+    """Не больше limit одновременных вызовов; ждать места могут не больше max_queue"""
+
+    def __init__(self, limit, max_queue=None):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout):
+        """True - можно вызывать (потом release); False - очередь полна или место не освободилось"""
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.max_queue is not None and self.waiting >= self.max_queue:
+                return False
+            self.waiting += 1
+            try:
+                if not self._cond.wait_for(lambda: self.active < self.limit, max(0.0, timeout)):
+                    return False
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class AsyncConcurrencyGate:
+    """ConcurrencyGate для asyncio (asgi.py): ожидание места не занимает поток воркера.
+    Работает внутри одного event loop; asyncio импортируется при первом ожидании"""
+
+    def __init__(self, limit, max_queue=None):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = None
+
+    async def acquire(self, timeout):
+        """True - можно вызывать (потом release); False - очередь полна или место не освободилось"""
+        import asyncio
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        if self._semaphore.locked():
+            if self.max_queue is not None and self.waiting >= self.max_queue:
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), max(0.0, timeout))
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+
+class Deadline:
+    """Сквозной бюджет запроса в секундах от создания"""
+
+    def __init__(self, budget):
+        self.at = time.monotonic() + budget
+
+    def remaining(self):
+        return self.at - time.monotonic()
+
+
+def client_id(remote_addr, forwarded_for=None, trust_forwarded=False):
+    """Клиент для лимита: адрес соединения, за доверенным прокси - первый из X-Forwarded-For"""
+    if trust_forwarded and forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return remote_addr or "unknown"
@@ -1,196 +1,141 @@
-import os, json
-from flask import Flask, request, jsonify, render_template
-from dotenv import load_dotenv
-import requests
-import numpy as np
-from data import get_data
+import json, logging
+from functools import lru_cache
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
+import recommender
+from recommender import stream_recommendation, refresh_catalog
+from pipeline import Context, recommend_pipeline
+from pipeline.stages import admit, parse
+from rules import query_payload
+from serialization import encode, etag
+from admission import client_id
+from batch import recommend_batch, parse_batch_payload
+from planner import Planner, parse_plan_payload
+from config import Config
+from instrumentation import log, timed, trace_request, trace_enabled, server_timing, render_metrics
 
-# === конфиг ===
-load_dotenv()
-
-# Получаем API ключ безопасно
-api_key = os.getenv("DEEPSEEK_API_KEY")
-if not api_key:
-    print("⚠️ DEEPSEEK_API_KEY not found - using local logic")
-
-df = get_data()
 app = Flask(__name__)
 CORS(app)  # Важно для Vercel!
 
-def call_deepseek_api(prompt: str):
-    """Вызов DeepSeek API"""
-    if not api_key:
-        return None
-        
-    url = "https://api.deepseek.com/v1/chat/completions"
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    data = {
-        "model": "deepseek-chat",
-        "messages": [
-            {
-                "role": "system", 
-                "content": "Ты помощник по подбору блюд. Верни JSON: {choice: 'название', reason: 'текст', target_macros: {calories: число или null, proteins: число или null, fats: число или null, carbs: число или null}}"
-            },
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.3,
-        "response_format": {"type": "json_object"}
-    }
-    
-    try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"DeepSeek API error: {e}")
-        return None
+@app.before_request
+def switch_catalog():
+    """Новое поколение общего каталога подхватывается между запросами"""
+    refresh_catalog()
 
-def llm_pick_dish(free_text: str):
-    """Выбор блюда через DeepSeek или локальную логику"""
-    dish_names = df["name"].tolist()
-    
-    # Пытаемся использовать DeepSeek API
-    if api_key:
-        dishes_str = "\n".join([f"- {name}" for name in dish_names])
-        prompt = f"""
-Пользователь: "{free_text}"
-
-Доступные блюда:
-{dishes_str}
-
-Выбери ОДНО блюдо и верни JSON:
-{{
-    "choice": "название блюда",
-    "reason": "обоснование на русском",
-    "target_macros": {{
-        "calories": число или null,
-        "proteins": число или null, 
-        "fats": число или null,
-        "carbs": число или null
-    }}
-}}
-"""
-        try:
-            api_response = call_deepseek_api(prompt)
-            if api_response and 'choices' in api_response:
-                content = api_response['choices'][0]['message']['content']
-                result = json.loads(content)
-                
-                if 'choice' in result and result['choice'] in dish_names:
-                    print("✅ DeepSeek API успешно сработал!")
-                    return result
-        except Exception as e:
-            print(f"❌ DeepSeek failed: {e}")
-    
-    # Локальная логика как запасной вариант
-    print("🔄 Используем локальную логику")
-    query_lower = free_text.lower()
-    target_macros = {"calories": None, "proteins": None, "fats": None, "carbs": None}
-    
-    if any(word in query_lower for word in ["диетич", "легк", "мало калорий", "низкокалорий"]):
-        target_macros["calories"] = 250
-        return {"choice": "Рыба на пару", "reason": "Диетическое блюдо с низкой калорийностью", "target_macros": target_macros}
-    elif any(word in query_lower for word in ["белк", "протеин", "много белка"]):
-        target_macros["proteins"] = 30
-        return {"choice": "Курица с овощами", "reason": "Богатое белком блюдо", "target_macros": target_macros}
-    elif any(word in query_lower for word in ["углев", "карб", "энерги"]):
-        target_macros["carbs"] = 50
-        return {"choice": "Гречка с мясом", "reason": "Богатое углеводами для энергии", "target_macros": target_macros}
-    elif any(word in query_lower for word in ["вегетариан", "без мяса"]):
-        return {"choice": "Паста с томатами", "reason": "Вегетарианское блюдо", "target_macros": target_macros}
-    elif any(word in query_lower for word in ["завтрак", "омлет"]):
-        return {"choice": "Омлет с овощами", "reason": "Идеально для завтрака", "target_macros": target_macros}
-    elif any(word in query_lower for word in ["салат", "свеж"]):
-        return {"choice": "Салат Цезарь", "reason": "Свежий и легкий салат", "target_macros": target_macros}
-    else:
-        return {"choice": "Курица с овощами", "reason": "Сбалансированное блюдо", "target_macros": target_macros}
-
-def score_by_macros(row, target):
-    """Штраф за превышение целевых КБЖУ"""
-    score = 0.0
-    for k in ("calories", "proteins", "fats", "carbs"):
-        t = target.get(k)
-        if t is None: continue
-        try:
-            diff = max(0.0, float(row[k]) - float(t))
-            score += diff / (float(t) if float(t) > 0 else 1.0)
-        except (ValueError, TypeError): continue
-    return score
+def client():
+    """Кто спрашивает - для лимита запросов (см. admission.client_id)"""
+    return client_id(request.remote_addr, request.headers.get("X-Forwarded-For"),
+                     Config.RATE_LIMIT_TRUST_FORWARDED)
+
+@lru_cache(maxsize=1)
+def planner_for(catalog):
+    return Planner.from_catalog(catalog)
 
 @app.route("/")
 def home():
     return render_template("index.html")
 
-# ТОЛЬКО ОДИН endpoint /recommend!
-@app.route("/recommend", methods=["POST", "OPTIONS"])
+@app.route("/recommend", methods=["GET", "POST", "OPTIONS"])
 def recommend():
     if request.method == "OPTIONS":
         response = jsonify({"status": "ok"})
         response.headers.add("Access-Control-Allow-Origin", "*")
-        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
-        response.headers.add("Access-Control-Allow-Headers", "Content-Type")
+        response.headers.add("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        response.headers.add("Access-Control-Allow-Headers", "Content-Type, X-Trace, If-None-Match")
         return response
     
-    try:
-        payload = request.get_json(force=True)
-        query = (payload.get("query") or "").strip()
-        if not query:
-            return jsonify(error="empty query"), 400
-
-        llm = llm_pick_dish(query)
-        chosen_name = llm.get("choice")
-        target = llm.get("target_macros") or {}
-
-        # Находим блюдо в каталоге
-        if chosen_name in set(df["name"]):
-            candidate = df[df["name"] == chosen_name].iloc[0].to_dict()
-        else:
-            candidate = df.iloc[0].to_dict()
-
-        # Уточняем по КБЖУ если нужно
-        if any(v not in (None, "") for v in target.values()):
-            scored = [(score_by_macros(row, target), row.to_dict()) for _, row in df.iterrows()]
-            scored.sort(key=lambda x: x[0])
-            candidate = scored[0][1]
-
-        # ⭐⭐ ДОБАВЬТЕ ЭТОТ КОД ДЛЯ РЕКОМЕНДАЦИЙ ⭐⭐
-        recommendations = []
-        dish_name = candidate["name"]
-        
-        if dish_name == "Курица с овощами":
-            recommendations = ["Салат Цезарь", "Омлет с овощами"]
-        elif dish_name == "Рыба на пару":
-            recommendations = ["Гречка с мясом", "Салат Цезарь"]
-        elif dish_name == "Гречка с мясом":
-            recommendations = ["Рыба на пару", "Омлет с овощами"]
-        elif dish_name == "Омлет с овощами":
-            recommendations = ["Курица с овощами", "Салат Цезарь"]
-        elif dish_name == "Салат Цезарь":
-            recommendations = ["Курица с овощами", "Паста с томатами"]
-        elif dish_name == "Паста с томатами":
-            recommendations = ["Салат Цезарь", "Рыба на пару"]
-        # ⭐⭐ КОНЕЦ ДОБАВЛЕНИЯ ⭐⭐
-
-        response = jsonify({
-            "dish": candidate,
-            "llm_choice": llm.get("choice"),
-            "reason": llm.get("reason"),
-            "used_target_macros": target,
-            "recommendations": recommendations  # ⭐⭐ ВАЖНО: передаем рекомендации!
-        })
-        
+    # X-Trace: 1 - длительности этапов вернутся в заголовке Server-Timing
+    with trace_request(trace_enabled(request.headers.get("X-Trace"))) as spans:
+        with timed("request"):
+            payload = (request.get_json(force=True, silent=True) if request.method == "POST"
+                       else query_payload(request.args.to_dict()))
+            ctx = recommend_pipeline.run(payload, client())
+
+        response = Response(ctx.body, status=ctx.status, mimetype="application/json",
+                            headers=ctx.headers)
         response.headers.add("Access-Control-Allow-Origin", "*")
+        if ctx.status == 200:
+            # GET с If-None-Match на тот же ответ - 304 без тела
+            response.set_etag(etag(ctx.body))
+            response.headers["Access-Control-Expose-Headers"] = "ETag"
+            if request.method == "GET":
+                response.headers["Cache-Control"] = "no-cache"
+                response = response.make_conditional(request)
+        if spans is not None:
+            response.headers["Server-Timing"] = server_timing(spans)
+            response.headers["Access-Control-Expose-Headers"] = "ETag, Server-Timing"
+            log("trace", path="/recommend", stages={s: round(d * 1000, 3) for s, d in spans})
         return response
-    
+
+@app.route("/recommend/stream", methods=["GET", "POST"])
+def recommend_stream():
+    """/recommend как Server-Sent Events: локальный ответ сразу, выбор DeepSeek и
+    похожие блюда - следом, каждое событие по готовности (см. stream_recommendation)"""
+    ctx = Context(request.get_json(force=True, silent=True) if request.method == "POST"
+                  else query_payload(request.args.to_dict()), client())
+    admit(ctx)
+    if ctx.status == 200:
+        parse(ctx)
+    if ctx.status != 200:
+        return jsonify(ctx.result), ctx.status, ctx.headers
+
+    def generate():
+        try:
+            for event, data in stream_recommendation(ctx.query, ctx.k, ctx.selection, ctx.deadline):
+                yield b"event: %s\ndata: %s\n\n" % (event.encode(), encode(data, recommender.fragments))
+        except Exception as e:
+            log("recommend_stream_error", logging.ERROR, error=str(e))
+            yield 'event: error\ndata: {"error": "Internal server error"}\n\n'
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # прокси не должен копить события
+    return response
+
+@app.route("/recommend/batch", methods=["POST"])
+def recommend_batch_view():
+    """Много запросов за раз, ответы построчно в NDJSON по мере готовности.
+    Для лимита запросов пачка - один запрос: вызовы DeepSeek ограничивает llm_gate,
+    время - BATCH_DEADLINE на всю пачку"""
+    ctx = Context(request.get_json(force=True, silent=True), client(), Config.BATCH_DEADLINE)
+    admit(ctx)
+    if ctx.status != 200:
+        return jsonify(ctx.result), ctx.status, ctx.headers
+    try:
+        queries, k = parse_batch_payload(ctx.payload)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    def generate():
+        try:
+            for item in recommend_batch(queries, k, ctx.deadline):
+                yield encode(item, recommender.fragments) + b"\n"
+        except Exception as e:
+            log("recommend_batch_error", logging.ERROR, error=str(e))
+            yield json.dumps({"error": "Internal server error"}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/plan", methods=["POST"])
+def plan():
+    """Меню из нескольких блюд под цели по КБЖУ, бюджет и ограничения"""
+    try:
+        params = parse_plan_payload(request.get_json(force=True, silent=True),
+                                    Config.PLAN_MAX_COURSES, Config.PLAN_MAX_TIME_MS)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    try:
+        with timed("plan"):
+            result = planner_for(recommender.catalog).plan(**params)
+        return jsonify(result)
     except Exception as e:
-        print(f"❌ Error in recommend: {e}")
+        log("plan_error", logging.ERROR, error=str(e))
         return jsonify(error="Internal server error"), 500
 
+@app.route("/metrics")
+def metrics():
+    """Метрики процесса в формате Prometheus"""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     app.run(debug=True, host="127.0.0.1", port=5000)
@@ -0,0 +1,122 @@
+"""Асинхронный /recommend (ASGI): ожидание DeepSeek не держит поток воркера.
+
+    uvicorn asgi:app --host 127.0.0.1 --port 5001
+
+Синхронный Flask (app.py) продолжает работать как раньше; логика ответа общая
+(конвейер pipeline/, выбор блюда - асинхронный). Одинаковые одновременные запросы склеиваются в один вызов LLM.
+"""
+import json, logging
+from deepseek_client import make_async_client
+from recommender import allm_pick_dish, refresh_catalog, SingleFlight
+from pipeline import Context, recommend_pipeline
+from pipeline.stages import admit, parse
+from admission import client_id
+from config import Config
+from instrumentation import log, timed, trace_request, trace_enabled, server_timing, render_metrics
+
+client = make_async_client()
+flights = SingleFlight()
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"POST, OPTIONS"),
+    (b"access-control-allow-headers", b"Content-Type, X-Trace"),
+]
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+def header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def send_body(send, status, body, content_type, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type),
+                    (b"content-length", str(len(body)).encode())] + CORS_HEADERS + list(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send, status, data, headers=()):
+    await send_body(send, status, json.dumps(data, ensure_ascii=False).encode("utf-8"),
+                    b"application/json", headers)
+
+
+async def recommend(scope, receive, send):
+    # новое поколение каталога подхватывается до начала запроса, как в app.py
+    refresh_catalog()
+    # X-Trace: 1 - длительности этапов вернутся в заголовке Server-Timing
+    with trace_request(trace_enabled(header(scope, b"x-trace"))) as spans:
+        try:
+            with timed("request"):
+                try:
+                    payload = json.loads(await read_body(receive) or b"{}")
+                except ValueError:
+                    payload = None
+                ctx = Context(payload, client_id((scope.get("client") or ("",))[0],
+                                                 header(scope, b"x-forwarded-for"),
+                                                 Config.RATE_LIMIT_TRUST_FORWARDED))
+                for name, stage in (("admit", admit), ("parse", parse)):
+                    with timed(name):
+                        stage(ctx)
+                    if ctx.status != 200:
+                        break
+                if ctx.status != 200:
+                    return await send_json(send, ctx.status, ctx.result,
+                                           [(k.lower().encode(), v.encode()) for k, v in ctx.headers.items()])
+
+                # retrieve + pick - асинхронно, остальные стадии - общим конвейером
+                ctx.llm = await allm_pick_dish(ctx.query, client, flights, ctx.selection,
+                                               ctx.deadline)
+                recommend_pipeline.resume(ctx, "score")
+
+            headers = []
+            if spans is not None:
+                headers = [(b"server-timing", server_timing(spans).encode()),
+                           (b"access-control-expose-headers", b"Server-Timing")]
+                log("trace", path="/recommend", stages={s: round(d * 1000, 3) for s, d in spans})
+            await send_body(send, ctx.status, ctx.body, b"application/json", headers)
+        except Exception as e:
+            log("recommend_error", logging.ERROR, error=str(e))
+            await send_json(send, 500, {"error": "Internal server error"})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await client.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    if scope["path"] == "/recommend":
+        if scope["method"] == "POST":
+            return await recommend(scope, receive, send)
+        if scope["method"] == "OPTIONS":
+            return await send_json(send, 200, {"status": "ok"})
+    if scope["path"] == "/metrics" and scope["method"] == "GET":
+        refresh_catalog()
+        return await send_body(send, 200, render_metrics().encode("utf-8"),
+                               b"text/plain; version=0.0.4")
+    await send_json(send, 404, {"error": "not found"})
@@ -0,0 +1,169 @@
+"""Пакетные рекомендации: много запросов - мало промптов и один проход скоринга.
+
+Запросы раскладываются по промптам в пределах бюджета токенов (в промпт идут
+ближайшие к запросам блюда из поискового индекса, каждое один раз), DeepSeek
+отвечает JSON-массивом выборов, а цели по КБЖУ всей пачки скорятся одной
+матрицей N целей x M блюд.
+Результаты отдаются по мере готовности, пачка за пачкой.
+"""
+import json, logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import Config
+from llm_cache import make_key
+from instrumentation import log
+from admission import Deadline
+import recommender
+from recommender import (llm_slot, parse_k, local_pick,
+                         prompt_candidates, has_target, build_recommendation)
+
+BATCH_SYSTEM_PROMPT = "Ты помощник по подбору блюд. Для каждого запроса выбери одно блюдо. Верни JSON: {results: [{id: число, choice: 'название', reason: 'текст', target_macros: {calories: число или null, proteins: число или null, fats: число или null, carbs: число или null}}]}"
+# Примерная длина ответа на один запрос в токенах
+ANSWER_TOKENS = 80
+
+
+def estimate_tokens(text):
+    """Грубая оценка: ~3 символа кириллицы на токен"""
+    return len(text) // 3 + 1
+
+
+def dishes_block(dish_names):
+    return "\n".join(f"- {name}" for name in dish_names)
+
+
+def pack_queries(items, token_budget=None, output_budget=None):
+    """Раскладывает [(id, query, кандидаты), ...] по пачкам так, чтобы промпт и ответ
+    влезли в бюджет. Каждое блюдо попадает в промпт пачки один раз, поэтому запрос
+    стоит своих токенов плюс токенов тех кандидатов, которых в пачке ещё нет.
+
+    Возвращает [(chunk, названия блюд пачки), ...], chunk - [(id, query), ...]
+    """
+    token_budget = token_budget or Config.LLM_BATCH_TOKEN_BUDGET
+    output_budget = output_budget or Config.LLM_BATCH_OUTPUT_TOKENS
+    max_per_chunk = max(1, output_budget // ANSWER_TOKENS)
+    chunks, chunk, names, used = [], [], {}, 0
+    for i, query, candidates in items:
+        new = [n for n in candidates if n not in names]
+        cost = estimate_tokens(query) + 8 + sum(estimate_tokens(n) + 1 for n in new)
+        if chunk and (used + cost > token_budget or len(chunk) >= max_per_chunk):
+            chunks.append((chunk, list(names)))
+            chunk, names, used = [], {}, 0
+            new = candidates
+            cost = estimate_tokens(query) + 8 + sum(estimate_tokens(n) + 1 for n in new)
+        chunk.append((i, query))
+        names.update(dict.fromkeys(new))
+        used += cost
+    if chunk:
+        chunks.append((chunk, list(names)))
+    return chunks
+
+
+def build_batch_prompt(chunk, dishes_str):
+    queries_str = "\n".join(f'{i}. "{query}"' for i, query in chunk)
+    return f"""
+Запросы пользователей:
+{queries_str}
+
+Доступные блюда:
+{dishes_str}
+
+Для КАЖДОГО запроса выбери ОДНО блюдо и верни JSON:
+{{
+    "results": [
+        {{
+            "id": номер запроса,
+            "choice": "название блюда",
+            "reason": "обоснование на русском",
+            "target_macros": {{"calories": число или null, "proteins": число или null, "fats": число или null, "carbs": число или null}}
+        }}
+    ]
+}}
+"""
+
+
+def parse_batch_response(api_response, chunk):
+    """{id: выбор} для тех запросов пачки, на которые DeepSeek ответил корректно"""
+    ids = {i for i, _ in chunk}
+    picks = {}
+    try:
+        if api_response and 'choices' in api_response:
+            content = json.loads(api_response['choices'][0]['message']['content'])
+            for item in content.get("results") or []:
+                i = item.get("id")
+                if i in ids and item.get("choice") in recommender.catalog:
+                    picks[i] = {key: item.get(key) for key in ("choice", "reason", "target_macros")}
+    except Exception as e:
+        log("llm_batch_parse_error", logging.WARNING, error=str(e))
+    return picks
+
+
+def ask_chunk(chunk, dishes_str, deadline):
+    """Один промпт на пачку; кому DeepSeek не ответил - локальная логика.
+    Вызов DeepSeek - в общей очереди llm_gate и в пределах бюджета запроса, как у /recommend"""
+    response = None
+    with llm_slot(deadline) as until:
+        if until is not None:
+            response = recommender.deepseek.chat(build_batch_prompt(chunk, dishes_str),
+                                                 system=BATCH_SYSTEM_PROMPT, deadline=until)
+    picks = parse_batch_response(response, chunk)
+    for i, query in chunk:
+        if i in picks:
+            recommender.llm_cache.set(make_key(query, recommender.dishes_hash), picks[i])
+    log("llm_batch", answered=len(picks), queries=len(chunk))
+    return [(i, query, picks.get(i) or local_pick(query)) for i, query in chunk]
+
+
+def finish(picked, k):
+    """Скоринг всех целей пачки одной матрицей и сборка ответов"""
+    scored = [n for n, (_, _, llm) in enumerate(picked) if has_target(llm)]
+    ranked = recommender.scorer.top_k_many([picked[n][2]["target_macros"] for n in scored], k) if scored else []
+    ranked_by_row = dict(zip(scored, ranked))
+    for n, (i, query, llm) in enumerate(picked):
+        yield {"index": i, "query": query, **build_recommendation(llm, k, ranked_by_row.get(n))}
+
+
+def recommend_batch(queries, k=1, deadline=None):
+    """Генератор ответов для списка запросов (порядок - по готовности, см. поле index).
+    deadline (admission.Deadline, по умолчанию BATCH_DEADLINE) - бюджет всей пачки"""
+    deadline = deadline or Deadline(Config.BATCH_DEADLINE)
+    ready, pending = [], []
+    for i, query in enumerate(queries):
+        query = (query or "").strip() if isinstance(query, str) else ""
+        if not query:
+            yield {"index": i, "error": "empty query"}
+            continue
+        cached = recommender.llm_cache.get(make_key(query, recommender.dishes_hash)) if recommender.api_key else None
+        if cached is not None:
+            ready.append((i, query, cached))
+        elif recommender.api_key:
+            pending.append((i, query))
+        else:
+            ready.append((i, query, local_pick(query)))
+
+    # кеш и локальная логика - сразу, не дожидаясь DeepSeek
+    yield from finish(ready, k)
+    if not pending:
+        return
+
+    chunks = pack_queries([(i, query, prompt_candidates(query)) for i, query in pending])
+    with ThreadPoolExecutor(max_workers=Config.LLM_BATCH_CONCURRENCY) as pool:
+        futures = [pool.submit(ask_chunk, chunk, dishes_block(names), deadline)
+                   for chunk, names in chunks]
+        for future in as_completed(futures):
+            yield from finish(future.result(), k)
+
+
+def parse_batch_payload(payload):
+    """(queries, k) из тела /recommend/batch; ValueError с текстом ошибки"""
+    if not isinstance(payload, dict):
+        raise ValueError("invalid json")
+    queries = payload.get("queries")
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("queries must be a non-empty list")
+    if len(queries) > Config.BATCH_MAX_QUERIES:
+        raise ValueError(f"too many queries (max {Config.BATCH_MAX_QUERIES})")
+    try:
+        k = parse_k(payload)
+    except (ValueError, TypeError):
+        raise ValueError("invalid k")
+    return queries, k
@@ -0,0 +1,97 @@
+"""Пропускная способность /recommend: синхронный Flask против ASGI на заглушке LLM.
+
+    python -m benchmarks.bench_async --latency 0.2 --requests 200 --workers 4
+
+sync  - W потоков (как W синхронных воркеров gunicorn), каждый ждёт DeepSeek сам;
+async - один event loop, все запросы ждут заглушку одновременно;
+async-same - все запросы одинаковые: single-flight отправляет один вызов наверх.
+"""
+import time, json, asyncio, argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_summary, quiet, use_stub, write_results
+from benchmarks.deepseek_stub import start_stub
+
+
+def run_sync(app, queries, workers):
+    client = app.test_client()
+    latencies = []
+
+    def one(query):
+        started = time.perf_counter()
+        client.post("/recommend", json={"query": query})
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(one, queries))
+    return latency_summary(latencies, time.perf_counter() - started)
+
+
+async def call_asgi(app, query):
+    body = json.dumps({"query": query}).encode("utf-8")
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body}
+
+    async def send(message):
+        pass
+
+    await app({"type": "http", "method": "POST", "path": "/recommend"}, receive, send)
+
+
+async def run_async(app, client, queries):
+    latencies = []
+
+    async def one(query):
+        started = time.perf_counter()
+        await call_asgi(app, query)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    wall = time.perf_counter() - started
+    # сессия aiohttp привязана к event loop этого прогона
+    await client.aclose()
+    return latency_summary(latencies, wall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    stub, url = start_stub(latency=args.latency)
+    use_stub(url, pool_size=args.requests)
+    import app as flask_app
+    import asgi
+
+    # разные запросы в каждом режиме, чтобы не попадать в кеш LLM
+    def queries(mode):
+        return [f"{mode} блюдо номер {i}" for i in range(args.requests)]
+
+    results = {}
+    with quiet():
+        results["sync"] = run_sync(flask_app.app, queries("sync"), args.workers)
+        results["async"] = asyncio.run(run_async(asgi.app, asgi.client, queries("async")))
+        before = stub.requests
+        same = ["одно и то же блюдо"] * args.requests
+        results["async-same"] = asyncio.run(run_async(asgi.app, asgi.client, same))
+        results["async-same"]["upstream_calls"] = stub.requests - before
+
+    for mode, r in results.items():
+        print(f"{mode:>11}: {r['throughput_rps']:>8} req/s  p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms")
+    write_results(args.json, "async", results, vars(args))
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Фильтры до скоринга: время выборки по битовым картам и скоринг только прошедших строк.
+
+    python -m benchmarks.bench_filters --sizes 10000 100000 1000000
+
+Для каждого набора фильтров: сколько блюд прошло, время select() и
+top_k по отфильтрованным строкам против top_k по всему каталогу.
+"""
+import os, time, argparse, tempfile
+
+from benchmarks.common import synthetic_dishes, percentile, write_results
+from catalog import Catalog, build_catalog
+from filters import FilterIndex
+from scoring import MacroScorer
+
+TARGET = {"calories": 400, "proteins": 30, "fats": None, "carbs": None}
+SPECS = {
+    "diet": {"diet": ["вегетарианское"]},
+    "diet+price": {"diet": ["вегетарианское"], "price_max": 300.0},
+    "category+tags": {"category": ["десерт"], "tags": ["орехи"], "exclude_tags": ["мёд"]},
+    "narrow": {"category": ["салат"], "tags": ["лосось", "кунжут"], "price_min": 300.0,
+               "price_max": 360.0},
+}
+
+
+def p50_ms(func, repeats):
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return round(percentile(latencies, 50) * 1000, 4)
+
+
+def bench(size, repeats, workdir):
+    path = os.path.join(workdir, f"catalog-{size}.db")
+    build_catalog(synthetic_dishes(size), path, source="bench")
+    catalog = Catalog(path)
+    index = FilterIndex(catalog)
+    scorer = MacroScorer(catalog.macro_matrix())
+    full = p50_ms(lambda: scorer.top_k_indices(TARGET, 5), repeats)
+
+    rows = []
+    for name, spec in SPECS.items():
+        selection = index.select(spec)   # заодно прогревает кеш битовых карт
+        rows.append({
+            "size": size,
+            "filters": name,
+            "matched": len(selection),
+            "select_ms": p50_ms(lambda: index.select(spec), repeats),
+            "top_k_filtered_ms": p50_ms(lambda: scorer.top_k_indices(TARGET, 5, selection.rows), repeats),
+            "top_k_full_ms": full,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            for r in bench(size, args.repeats, workdir):
+                results.append(r)
+                print(f"{r['size']:>8} блюд {r['filters']:>14}: прошло {r['matched']:>7}  "
+                      f"select {r['select_ms']} ms  top_k {r['top_k_filtered_ms']} ms "
+                      f"(весь каталог {r['top_k_full_ms']} ms)")
+    write_results(args.json, "filters", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Нагрузочный прогон /recommend целиком: Flask test client и настоящий HTTP-сервер.
+
+    python -m benchmarks.bench_load --latency 0.2 --failure-rate 0.1 --requests 500 \\
+        --concurrency 8 --catalog-size 10000 --json load.json
+
+DeepSeek заменён локальной заглушкой с задержкой и долей ответов 503.
+client - запросы через app.test_client() (без сети, видна стоимость самого кода);
+server - werkzeug-сервер в потоке и requests.Session на каждый поток клиента.
+Кроме задержек в результат пишутся коды ответов, число вызовов заглушки и
+счётчики событий (успех LLM, кеш, локальная логика, ошибки) за прогон.
+"""
+import os, time, random, logging, argparse, tempfile, threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_summary, quiet, synthetic_dishes, use_stub, write_results
+from benchmarks.deepseek_stub import start_stub
+
+PHRASES = ["что-нибудь диетическое", "много белка после тренировки", "вегетарианское без мяса",
+           "шоколадный десерт", "паста с грибами", "салат с курицей", "острое из говядины",
+           "лёгкий завтрак", "рыба без глютена", "сытно и недорого"]
+
+
+def make_queries(n, repeat_ratio, seed=0):
+    """Запросы нагрузки: доля repeat_ratio повторяет уже заданные (попадания в кеш LLM)"""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n):
+        if queries and rng.random() < repeat_ratio:
+            queries.append(rng.choice(queries))
+        else:
+            queries.append(f"{rng.choice(PHRASES)} {i}")
+    return queries
+
+
+def drive(send, queries, concurrency):
+    """Гоняет send(query) -> status в concurrency потоков"""
+    latencies, statuses = [], Counter()
+
+    def one(query):
+        started = time.perf_counter()
+        status = send(query)
+        latencies.append(time.perf_counter() - started)
+        statuses[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, queries))
+    result = latency_summary(latencies, time.perf_counter() - started)
+    result["statuses"] = {str(k): v for k, v in sorted(statuses.items())}
+    return result
+
+
+def run_client(app, queries, concurrency, k):
+    client = app.test_client()
+    return drive(lambda q: client.post("/recommend", json={"query": q, "k": k}).status_code,
+                 queries, concurrency)
+
+
+def run_server(app, queries, concurrency, k):
+    import requests
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # без строки лога на запрос
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/recommend"
+    local = threading.local()
+
+    def send(query):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        return session.post(url, json={"query": query, "k": k}).status_code
+
+    try:
+        return drive(send, queries, concurrency)
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["client", "server"], choices=["client", "server"])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.1, help="задержка заглушки, с")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="доля повторных запросов")
+    parser.add_argument("--catalog-size", type=int, default=0,
+                        help="синтетический каталог на N блюд (0 - встроенный)")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    stub, url = start_stub(args.latency, args.jitter, args.failure_rate)
+    use_stub(url, pool_size=args.concurrency)
+    if args.catalog_size:
+        from catalog import build_catalog
+        os.environ["CATALOG_PATH"] = build_catalog(
+            synthetic_dishes(args.catalog_size), os.path.join(tempfile.mkdtemp(), "catalog.db"),
+            source="bench")
+
+    with quiet():
+        import app as flask_app
+        from instrumentation import EVENTS
+        from recommender import llm_cache, deepseek
+
+    results = {}
+    for n, mode in enumerate(args.modes):
+        run = run_client if mode == "client" else run_server
+        # свои запросы в каждом режиме, чтобы второй прогон не жил целиком из кеша
+        queries = make_queries(args.requests, args.repeat_ratio, seed=n)
+        events_before = EVENTS.snapshot()
+        upstream_before = stub.requests
+        with quiet():
+            r = run(flask_app.app, queries, args.concurrency, args.k)
+        r["upstream_calls"] = stub.requests - upstream_before
+        r["events"] = {dict(key)["event"]: value - events_before.get(key, 0)
+                       for key, value in EVENTS.snapshot().items()
+                       if value != events_before.get(key, 0)}
+        r["breaker"] = deepseek.breaker.state
+        results[mode] = r
+        print(f"{mode:>7}: {r['throughput_rps']:>8} req/s  p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms  "
+              f"коды {r['statuses']}  вызовов LLM {r['upstream_calls']}")
+        print(f"         события: {r['events']}")
+
+    results["llm_cache"] = llm_cache.stats()
+    write_results(args.json, "load", results, vars(args))
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
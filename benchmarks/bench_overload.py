@@ -0,0 +1,112 @@
+"""Перегрузка при медленном DeepSeek: задержки /recommend без защиты и с ней.
+
+    python -m benchmarks.bench_overload --latency 3 --concurrency 64 --requests 400 --json overload.json
+
+DeepSeek заменён заглушкой, которая отвечает дольше бюджета запроса. Приложение
+для каждого режима поднимается в отдельном процессе (настройки читаются при
+импорте) на werkzeug-сервере с потоком на соединение:
+unprotected - без лимитов: каждый запрос ждёт DeepSeek, сколько придётся;
+protected   - бюджет запроса --deadline, не больше --llm-concurrency вызовов
+              DeepSeek с ожиданием места до --max-wait, лимит --rate запросов
+              в секунду на клиента; не успели - локальная логика или 429.
+Запросы уникальные (кеш LLM не помогает) и идут от --clients клиентов
+(X-Forwarded-For). Кроме задержек пишутся коды ответов и события из /metrics.
+"""
+import os, re, sys, logging, argparse, threading, subprocess
+
+from benchmarks.common import quiet, use_stub, write_results
+from benchmarks.deepseek_stub import start_stub
+from benchmarks.bench_load import drive, make_queries
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EVENT = re.compile(r'^recommend_events_total\{event="([^"]+)"\} ([0-9.]+)$', re.MULTILINE)
+EVENTS = ("llm_success", "local_fallback", "llm_queue_rejected", "deadline_fallback",
+          "deepseek_deadline", "deepseek_circuit_open", "rate_limited")
+
+
+def serve():
+    """Дочерний процесс: app.py на werkzeug-сервере, порт - в stdout"""
+    with quiet():
+        from werkzeug.serving import make_server
+        import app as flask_app
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, flask_app.app, threaded=True)
+    print(f"PORT {server.server_port}", flush=True)
+    server.serve_forever()
+
+
+def run(mode, env, queries, concurrency, clients, k):
+    import requests
+
+    process = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_overload", "--serve"],
+                               cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    try:
+        line = process.stdout.readline()
+        if not line.startswith("PORT "):
+            raise RuntimeError(f"сервер не запустился (код {process.wait()})")
+        base = f"http://127.0.0.1:{line.split()[1]}"
+        sessions = threading.local()
+
+        def send(item):
+            n, query = item
+            if not hasattr(sessions, "session"):
+                sessions.session = requests.Session()
+            return sessions.session.post(f"{base}/recommend", json={"query": query, "k": k},
+                                         headers={"X-Forwarded-For": f"10.0.0.{n % clients}"}).status_code
+
+        result = drive(send, list(enumerate(queries)), concurrency)
+        metrics = requests.get(f"{base}/metrics").text
+    finally:
+        process.terminate()
+        process.wait()
+    counts = {name: int(float(value)) for name, value in EVENT.findall(metrics)}
+    result.update({"mode": mode, "events": {name: counts.get(name, 0) for name in EVENTS}})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--modes", nargs="+", default=["unprotected", "protected"],
+                        choices=["unprotected", "protected"])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=3.0, help="задержка заглушки, с")
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--deadline", type=float, default=1.0, help="бюджет запроса, с")
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--max-wait", type=float, default=0.25, help="ожидание места к DeepSeek, с")
+    parser.add_argument("--rate", type=float, default=10.0, help="запросов в секунду на клиента")
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+    if args.serve:
+        return serve()
+
+    stub, url = start_stub(args.latency, args.jitter)
+    use_stub(url, pool_size=args.concurrency)
+    base_env = dict(os.environ, LOG_LEVEL="error")
+    envs = {
+        "unprotected": dict(base_env, RATE_LIMIT_RPS="0", LLM_MAX_CONCURRENCY="1000000",
+                            LLM_QUEUE_MAX_WAIT="3600", REQUEST_DEADLINE="3600"),
+        "protected": dict(base_env, RATE_LIMIT_RPS=str(args.rate), RATE_LIMIT_BURST=str(args.burst),
+                          RATE_LIMIT_TRUST_FORWARDED="1", LLM_MAX_CONCURRENCY=str(args.llm_concurrency),
+                          LLM_QUEUE_MAX_WAIT=str(args.max_wait), REQUEST_DEADLINE=str(args.deadline)),
+    }
+
+    queries = make_queries(args.requests, 0.0)
+    results = []
+    for mode in args.modes:
+        r = run(mode, envs[mode], queries, args.concurrency, args.clients, args.k)
+        results.append(r)
+        print(f"{mode:>11}: p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms  {r['throughput_rps']} rps  "
+              f"коды {r['statuses']}")
+        print(" " * 13 + "  ".join(f"{name} {n}" for name, n in r["events"].items() if n))
+    stub.shutdown()
+    write_results(args.json, "overload", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
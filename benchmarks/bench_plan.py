@@ -0,0 +1,73 @@
+"""Подбор меню: время решения от размера каталога и числа блюд в плане.
+
+    python -m benchmarks.bench_plan --sizes 100 1000 10000 --courses 2 3 4
+"""
+import argparse
+import numpy as np
+
+from benchmarks.common import synthetic_dishes, percentile, write_results
+from data import COLUMNS
+from planner import Planner
+from scoring import MACRO_COLUMNS
+
+TARGETS = [
+    {"calories": 1200, "proteins": 80},
+    {"calories": 2000, "proteins": 150, "fats": 60},
+    {"calories": 700, "carbs": 60},
+    {"proteins": 100},
+]
+
+
+def make_planner(size):
+    dishes = [dict(zip(COLUMNS, row)) for row in synthetic_dishes(size)]
+    categories = sorted({d["category"] for d in dishes})
+    diets = sorted({d["diet"] for d in dishes})
+    return Planner(
+        np.array([[d[c] for c in MACRO_COLUMNS] for d in dishes], dtype=np.float64),
+        np.array([d["price"] for d in dishes], dtype=np.float64),
+        np.array([categories.index(d["category"]) for d in dishes], dtype=np.int32),
+        np.array([diets.index(d["diet"]) for d in dishes], dtype=np.int32),
+        categories, diets, lambda i: dishes[i],
+    )
+
+
+def bench(planner, size, courses, max_price, time_budget):
+    elapsed, optimal, scores = [], 0, []
+    for target in TARGETS:
+        result = planner.plan(target, courses, max_price * courses, {"десерт": 1},
+                              time_budget=time_budget)
+        elapsed.append(result["elapsed_ms"])
+        optimal += result["optimal"]
+        scores.append(result["score"])
+    return {
+        "size": size,
+        "courses": courses,
+        "p50_ms": percentile(elapsed, 50),
+        "max_ms": max(elapsed),
+        "optimal": f"{optimal}/{len(TARGETS)}",
+        "mean_score": round(float(np.mean([s for s in scores if s is not None] or [0])), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 100, 1000, 10000])
+    parser.add_argument("--courses", type=int, nargs="+", default=[2, 3, 4, 5])
+    parser.add_argument("--max-price", type=float, default=450, help="бюджет на одно блюдо")
+    parser.add_argument("--time-budget", type=float, default=1.0, help="секунд на один план")
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        planner = make_planner(size)
+        for courses in args.courses:
+            r = bench(planner, size, courses, args.max_price, args.time_budget)
+            results.append(r)
+            print(f"{r['size']:>7} блюд x {r['courses']}: p50 {r['p50_ms']} ms  max {r['max_ms']} ms  "
+                  f"оптимально {r['optimal']}  отклонение {r['mean_score']}")
+    write_results(args.json, "plan", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
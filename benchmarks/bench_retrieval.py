@@ -0,0 +1,54 @@
+"""Поиск по индексу блюд: время сборки и задержка запроса от размера каталога.
+
+    python -m benchmarks.bench_retrieval --sizes 1000 10000 100000
+"""
+import time, argparse
+
+from benchmarks.common import synthetic_dishes, percentile, write_results
+from data import COLUMNS
+from retrieval import RetrievalIndex, dish_document
+
+QUERIES = ["что-нибудь диетическое", "много белка", "вегетарианское без мяса",
+           "шоколадный десерт", "паста с грибами", "салат с курицей", "острое из говядины",
+           "лёгкий завтрак", "рыба без глютена", "сытно и недорого"]
+
+
+def bench(size, top_n, repeats):
+    docs = [dish_document(dict(zip(COLUMNS, row))) for row in synthetic_dishes(size)]
+    started = time.perf_counter()
+    index = RetrievalIndex.build(docs)
+    build_s = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(repeats):
+        for q in QUERIES:
+            started = time.perf_counter()
+            index.search(q, top_n)
+            latencies.append(time.perf_counter() - started)
+    return {
+        "size": size,
+        "build_s": round(build_s, 3),
+        "postings": int(index.doc_ids.shape[0]),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--top-n", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        r = bench(size, args.top_n, args.repeats)
+        results.append(r)
+        print(f"{r['size']:>7} блюд: сборка {r['build_s']:>7} s  поиск p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms")
+    write_results(args.json, "retrieval", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
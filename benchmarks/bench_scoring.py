@@ -0,0 +1,92 @@
+"""Микробенчмарки скоринга по КБЖУ и поиска блюд в каталоге от 16 до 1M блюд.
+
+    python -m benchmarks.bench_scoring --sizes 16 1000 100000 1000000 --json scoring.json
+
+scalar    - score_by_macros по всем строкам (эталон, только до --scalar-max блюд);
+vector    - MacroScorer.scores, один проход numpy;
+top_k     - MacroScorer.top_k_indices с k=5;
+many      - MacroScorer.top_k_many для пачки из 64 целей (время на одну цель);
+get       - Catalog.get по случайному имени (SQLite + lru_cache);
+record    - Catalog.record по случайной позиции.
+"""
+import os, time, random, argparse, tempfile
+
+from benchmarks.common import synthetic_dishes, percentile, write_results
+from catalog import Catalog, build_catalog
+from data import COLUMNS
+from scoring import MacroScorer, score_by_macros
+
+TARGETS = [
+    {"calories": 250, "proteins": None, "fats": None, "carbs": None},
+    {"calories": None, "proteins": 30, "fats": None, "carbs": None},
+    {"calories": 500, "proteins": 25, "fats": 15, "carbs": 50},
+    {"calories": None, "proteins": None, "fats": None, "carbs": 50},
+]
+
+
+def timeit(func, repeats):
+    """Задержки одного вызова в мс: p50 и p99 по repeats прогонам"""
+    latencies = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - started)
+    return {"p50_ms": round(percentile(latencies, 50) * 1000, 4),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 4)}
+
+
+def bench(size, repeats, scalar_max, workdir):
+    rows = synthetic_dishes(size)
+    path = os.path.join(workdir, f"catalog-{size}.db")
+    started = time.perf_counter()
+    build_catalog(rows, path, source="bench")
+    build_s = time.perf_counter() - started
+
+    catalog = Catalog(path)
+    started = time.perf_counter()
+    scorer = MacroScorer(catalog.macro_matrix())
+    load_s = time.perf_counter() - started
+
+    result = {"size": size, "build_s": round(build_s, 3), "load_ms": round(load_s * 1000, 3)}
+    if size <= scalar_max:
+        dishes = [dict(zip(COLUMNS, r)) for r in rows]
+        result["scalar"] = timeit(
+            lambda i: [score_by_macros(d, TARGETS[i % len(TARGETS)]) for d in dishes],
+            max(1, repeats // 10))
+    result["vector"] = timeit(lambda i: scorer.scores(TARGETS[i % len(TARGETS)]), repeats)
+    result["top_k"] = timeit(lambda i: scorer.top_k_indices(TARGETS[i % len(TARGETS)], 5), repeats)
+    batch = [TARGETS[i % len(TARGETS)] for i in range(64)]
+    many = timeit(lambda i: scorer.top_k_many(batch, 5), max(1, repeats // 10))
+    result["many_per_target"] = {k: round(v / len(batch), 4) for k, v in many.items()}
+
+    rng = random.Random(1)
+    names = [rows[rng.randrange(size)][0] for _ in range(repeats)]
+    positions = [rng.randrange(size) for _ in range(repeats)]
+    result["get"] = timeit(lambda i: catalog.get(names[i]), repeats)
+    result["record"] = timeit(lambda i: catalog.record(positions[i]), repeats)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 1000, 10000, 100000, 1000000])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--scalar-max", type=int, default=100000,
+                        help="до какого размера гонять построчный score_by_macros")
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            r = bench(size, args.repeats, args.scalar_max, workdir)
+            results.append(r)
+            scalar = f"scalar {r['scalar']['p50_ms']} ms  " if "scalar" in r else ""
+            print(f"{size:>8} блюд: {scalar}vector {r['vector']['p50_ms']} ms  "
+                  f"top_k {r['top_k']['p50_ms']} ms  many {r['many_per_target']['p50_ms']} ms/цель  "
+                  f"get {r['get']['p50_ms']} ms  record {r['record']['p50_ms']} ms")
+    write_results(args.json, "scoring", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
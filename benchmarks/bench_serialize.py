@@ -0,0 +1,96 @@
+"""Сериализация ответа /recommend: кодирование целиком против склейки готовых фрагментов блюд.
+
+    python -m benchmarks.bench_serialize --size 10000 --k 1 5 20 --json serialize.json
+
+Тело ответа собирается из того же словаря, что отдаёт стадия score + enrich:
+jsonify  - Flask jsonify (как было в app.py), json - json.dumps всего словаря
+(стадия serialize до фрагментов), fragments - serialization.encode на
+стандартном json, fragments_orjson - то же с orjson (если установлен).
+Фрагменты блюд закодированы заранее, как после загрузки каталога.
+"""
+import os, json, time, random, argparse, tempfile
+
+from benchmarks.common import synthetic_dishes, percentile, write_results
+from catalog import Catalog, build_catalog
+from rules import recommendation
+import serialization
+
+
+def p50_us(func, repeats):
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return round(percentile(latencies, 50) * 1e6, 2)
+
+
+def make_results(catalog, k, n, seed=0):
+    """n ответов /recommend по k блюд из случайных позиций каталога"""
+    rng = random.Random(seed)
+    results = []
+    for _ in range(n):
+        dishes = [catalog.record(rng.randrange(len(catalog))) for _ in range(k)]
+        llm = {"choice": dishes[0]["name"], "reason": "Богатое белком блюдо",
+               "target_macros": {"calories": None, "proteins": 30, "fats": None, "carbs": None}}
+        companions = [catalog.names()[rng.randrange(len(catalog))] for _ in range(3)]
+        results.append(recommendation(llm, dishes[0], dishes[1:], companions))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--responses", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    from flask import Flask, jsonify
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "catalog.db")
+        build_catalog(synthetic_dishes(args.size), path, source="bench")
+        catalog = Catalog(path)
+        started = time.perf_counter()
+        fragments = serialization.DishFragments(catalog, precompute=True)
+        precompute_ms = round((time.perf_counter() - started) * 1000, 2)
+        print(f"фрагменты {len(fragments)} блюд: {precompute_ms} ms")
+
+        fast = serialization.orjson
+        app = Flask(__name__)
+        rows = []
+        for k in args.k:
+            results = make_results(catalog, k, args.responses)
+
+            def encode_all(encoder):
+                return lambda: [encoder(r) for r in results]
+
+            def fragments_with(module):
+                serialization.orjson = module
+                try:
+                    return p50_us(encode_all(lambda r: serialization.encode(r, fragments)), args.repeats)
+                finally:
+                    serialization.orjson = fast
+
+            with app.app_context():
+                timings = {"jsonify": p50_us(encode_all(lambda r: jsonify(r).get_data()), args.repeats)}
+            timings["json"] = p50_us(encode_all(
+                lambda r: json.dumps(r, ensure_ascii=False).encode("utf-8")), args.repeats)
+            timings["fragments"] = fragments_with(None)
+            if fast is not None:
+                timings["fragments_orjson"] = fragments_with(fast)
+
+            row = {"size": args.size, "k": k, "precompute_ms": precompute_ms,
+                   "body_bytes": len(serialization.encode(results[0], fragments))}
+            for name, total_us in timings.items():
+                row[f"{name}_us"] = round(total_us / len(results), 2)
+            rows.append(row)
+            print(f"k={k:>2}: " + "  ".join(f"{name} {row[f'{name}_us']} мкс" for name in timings) +
+                  f"  (тело {row['body_bytes']} байт)")
+    write_results(args.json, "serialize", rows, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Холодный старт: время от импорта точки входа до первого ответа /recommend.
+
+    python -m benchmarks.bench_startup --repeats 10 --json startup.json
+
+Каждый прогон - новый процесс python: импорт модуля (app.py - Flask, slim_app.py -
+лёгкая точка входа на снимке каталога) и один POST /recommend через WSGI.
+warm  - артефакты уже собраны (catalog.db с индексами или catalog.snapshot);
+fresh - пустой каталог артефактов: всё собирается при первом запросе (на Vercel
+        catalog.snapshot приезжает из репозитория, так что slim - это warm).
+"""
+import os, sys, json, time, shutil, argparse, tempfile, subprocess
+
+from benchmarks.common import percentile, write_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {"app": "app", "slim": "slim_app"}
+HEAVY = ("pandas", "numpy", "flask", "flask_cors", "requests", "sqlite3", "dotenv")
+
+CHILD = r"""
+import io, sys, json, time
+from wsgiref.util import setup_testing_defaults
+
+started = time.perf_counter()
+module = __import__(sys.argv[1])
+imported = time.perf_counter()
+body = sys.argv[2].encode("utf-8")
+environ = {}
+setup_testing_defaults(environ)
+environ.update({"REQUEST_METHOD": "POST", "PATH_INFO": "/recommend",
+                "CONTENT_TYPE": "application/json", "CONTENT_LENGTH": str(len(body)),
+                "wsgi.input": io.BytesIO(body)})
+status = []
+b"".join(module.app(environ, lambda s, headers: status.append(s)))
+done = time.perf_counter()
+print("RESULT " + json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (done - imported) * 1000,
+    "total_ms": (done - started) * 1000,
+    "status": status[0],
+    "modules": sorted(m for m in sys.argv[3].split(",") if m in sys.modules),
+}))
+"""
+
+
+def run_once(module, workdir, body):
+    env = dict(os.environ, LOG_LEVEL="error",
+               CATALOG_PATH=os.path.join(workdir, "catalog.db"),
+               CATALOG_SNAPSHOT=os.path.join(workdir, "catalog.snapshot"))
+    env.pop("DEEPSEEK_API_KEY", None)
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD, module, body, ",".join(HEAVY)],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    process_ms = (time.perf_counter() - started) * 1000
+    result = json.loads(out.rsplit("RESULT ", 1)[1])
+    result["process_ms"] = process_ms
+    return result
+
+
+def bench(mode, scenario, repeats, body):
+    workdir = tempfile.mkdtemp()
+    try:
+        if scenario == "warm":
+            run_once(MODES[mode], workdir, body)   # собирает артефакты
+        runs = []
+        for _ in range(repeats):
+            if scenario == "fresh":
+                shutil.rmtree(workdir)
+                os.mkdir(workdir)
+            runs.append(run_once(MODES[mode], workdir, body))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    row = {"mode": mode, "scenario": scenario, "status": runs[-1]["status"],
+           "modules": runs[-1]["modules"]}
+    for key in ("import_ms", "first_response_ms", "total_ms", "process_ms"):
+        row[key] = round(percentile([r[key] for r in runs], 50), 2)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--scenarios", nargs="+", default=["warm", "fresh"], choices=["warm", "fresh"])
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--query", default="много белка после тренировки")
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    body = json.dumps({"query": args.query, "k": 3}, ensure_ascii=False)
+    results = []
+    for scenario in args.scenarios:
+        for mode in args.modes:
+            r = bench(mode, scenario, args.repeats, body)
+            results.append(r)
+            print(f"{scenario:>5} {mode:>4}: импорт {r['import_ms']} ms  первый ответ "
+                  f"{r['first_response_ms']} ms  всего {r['total_ms']} ms  "
+                  f"(процесс {r['process_ms']} ms, {r['status']})  модули: {', '.join(r['modules'])}")
+    write_results(args.json, "startup", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
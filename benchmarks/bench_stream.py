@@ -0,0 +1,81 @@
+"""/recommend/stream против /recommend: когда клиент видит первый и итоговый ответ.
+
+    python -m benchmarks.bench_stream --latency 0.5 --token-delay 0.05 --requests 20
+
+DeepSeek заменён локальной заглушкой: latency - задержка до первого куска
+потокового ответа, token-delay - пауза между кусками. Для каждого события SSE
+(local, choice, llm, companions, done) пишется время от отправки запроса;
+для обычного /recommend - время полного ответа. Запросы уникальные, кеш LLM не
+помогает ни одному из режимов.
+"""
+import time, logging, argparse, threading
+
+from benchmarks.common import percentile, quiet, use_stub, write_results
+from benchmarks.deepseek_stub import start_stub
+from benchmarks.bench_load import make_queries
+
+
+def read_events(response):
+    """[(event, секунды от начала чтения), ...] из потока SSE"""
+    events, event = [], None
+    for line in response.iter_lines():
+        if line.startswith(b"event:"):
+            event = line[6:].strip().decode()
+        elif line.startswith(b"data:") and event:
+            events.append((event, time.perf_counter()))
+    return events
+
+
+def summary(values):
+    return {"p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="задержка до первого куска, с")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="пауза между кусками, с")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    stub, url = start_stub(args.latency, token_delay=args.token_delay)
+    use_stub(url)
+    with quiet():
+        import requests
+        from werkzeug.serving import make_server
+        import app as flask_app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, flask_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    session = requests.Session()
+
+    plain, stream = [], {}
+    queries = make_queries(2 * args.requests, 0.0)
+    with quiet():
+        for query in queries[:args.requests]:
+            started = time.perf_counter()
+            session.post(f"{base}/recommend", json={"query": query, "k": args.k}).raise_for_status()
+            plain.append(time.perf_counter() - started)
+        for query in queries[args.requests:]:
+            started = time.perf_counter()
+            with session.post(f"{base}/recommend/stream", json={"query": query, "k": args.k},
+                              stream=True) as response:
+                for event, at in read_events(response):
+                    stream.setdefault(event, []).append(at - started)
+    server.shutdown()
+    stub.shutdown()
+
+    results = {"recommend": summary(plain),
+               "stream": {event: summary(values) for event, values in stream.items()}}
+    print(f"/recommend целиком: p50 {results['recommend']['p50_ms']} ms")
+    for event, r in results["stream"].items():
+        print(f"/recommend/stream {event:>10}: p50 {r['p50_ms']} ms  ({len(stream[event])} раз)")
+    write_results(args.json, "stream", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Несколько воркеров (serve.py): память на воркер и пропускная способность.
+
+    python -m benchmarks.bench_workers --catalog-size 100000 --workers 1 2 4 8 --json workers.json
+
+private - каждый воркер загружает свой catalog.db (CATALOG_PATH) и строит индексы сам;
+shared  - все воркеры читают одно поколение каталога через mmap (CATALOG_SHARED_DIR).
+Для каждого числа воркеров serve.py поднимается заново, /recommend гоняется
+в --concurrency потоков (без DeepSeek - локальная логика), затем из
+/proc/<pid>/smaps_rollup читаются RSS и PSS воркеров. RSS считает общие
+страницы mmap в каждом процессе, PSS делит их между процессами - по сумме PSS
+видно, сколько памяти реально занимают все воркеры вместе.
+"""
+import os, sys, time, argparse, tempfile, threading, subprocess
+
+from benchmarks.common import quiet, synthetic_dishes, write_results
+from benchmarks.bench_load import drive, make_queries
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_kb(pid):
+    """{"rss": ..., "pss": ...} процесса в КБ из /proc/<pid>/smaps_rollup"""
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                out[key.lower()] = int(value.split()[0])
+    return out
+
+
+def children(pid):
+    """Дочерние процессы pid (воркеры serve.py)"""
+    found = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # поле 4 (ppid) идёт после имени процесса в скобках
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            found.append(int(name))
+    return found
+
+
+def start_server(workers, env):
+    process = subprocess.Popen([sys.executable, "serve.py", "--workers", str(workers), "--port", "0"],
+                               cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               text=True)
+    for line in process.stdout:
+        if "http://" in line:
+            return process, line.strip().rsplit(" ", 1)[1]
+    raise RuntimeError(f"serve.py не запустился (код {process.wait()})")
+
+
+def run(mode, workers, env, queries, concurrency, k):
+    import requests
+
+    process, base = start_server(workers, env)
+    sessions = threading.local()
+
+    def send(query):
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        return sessions.session.post(f"{base}/recommend", json={"query": query, "k": k}).status_code
+
+    try:
+        drive(send, queries[:concurrency * 2], concurrency)  # прогрев: ленивые индексы, кеши страниц
+        result = drive(send, queries, concurrency)
+        memory = [memory_kb(pid) for pid in children(process.pid)]
+    finally:
+        process.terminate()
+        process.wait()
+    result.update({
+        "mode": mode, "workers": workers,
+        "rss_mb_per_worker": round(sum(m["rss"] for m in memory) / len(memory) / 1024, 1),
+        "pss_mb_per_worker": round(sum(m["pss"] for m in memory) / len(memory) / 1024, 1),
+        "pss_mb_total": round(sum(m["pss"] for m in memory) / 1024, 1),
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["private", "shared"], choices=["private", "shared"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--catalog-size", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--json", help="куда записать результаты")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    rows = synthetic_dishes(args.catalog_size)
+    with quiet():
+        from catalog import build_catalog
+        from shared_catalog import publish
+        db_path = build_catalog(rows, os.path.join(workdir, "catalog.db"), source="bench")
+        shared_dir = os.path.join(workdir, "shared")
+        publish(shared_dir, rows, source="bench")
+    env = dict(os.environ, LOG_LEVEL="error", CATALOG_PATH=db_path, RATE_LIMIT_RPS="0")
+    env.pop("DEEPSEEK_API_KEY", None)
+    envs = {"private": env, "shared": dict(env, CATALOG_SHARED_DIR=shared_dir)}
+
+    queries = make_queries(args.requests, 0.0)
+    results = []
+    for mode in args.modes:
+        for workers in args.workers:
+            started = time.perf_counter()
+            r = run(mode, workers, envs[mode], queries, args.concurrency, args.k)
+            results.append(r)
+            print(f"{mode:>7} x{workers}: {r['throughput_rps']:>8} rps  p99 {r['p99_ms']} ms  "
+                  f"RSS {r['rss_mb_per_worker']} MB/воркер  PSS {r['pss_mb_per_worker']} MB/воркер "
+                  f"(всего {r['pss_mb_total']} MB)  [{time.perf_counter() - started:.1f} с]")
+    write_results(args.json, "workers", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
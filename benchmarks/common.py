@@ -0,0 +1,83 @@
+"""Общие помощники бенчмарков: перцентили, тишина в stdout, запись результатов"""
+import os, io, json, time, random, platform, contextlib, subprocess
+
+from data import DISHES
+
+_ADJECTIVES = ["домашний", "пикантный", "нежный", "фирменный", "летний", "острый",
+               "сливочный", "хрустящий", "печёный", "томлёный", "запечённый", "лёгкий"]
+_EXTRA_TAGS = ["сыр", "грибы", "рис", "тыква", "шпинат", "кунжут", "лосось", "индейка",
+               "фасоль", "орехи", "ягоды", "мёд", "без глютена", "без свинины", "острое"]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def latency_summary(latencies, wall):
+    """Сводка по задержкам (в мс) и пропускной способности"""
+    return {
+        "requests": len(latencies),
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def synthetic_dishes(n, seed=0):
+    """n блюд по схеме data.DISHES: вариации встроенных с уникальными именами и шумом в КБЖУ"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        base = DISHES[i % len(DISHES)]
+        name = f"{base[0]} {rng.choice(_ADJECTIVES)} №{i}"
+        macros = [max(0, int(v * rng.uniform(0.6, 1.4))) for v in base[3:8]]
+        tags = ",".join([base[8], *rng.sample(_EXTRA_TAGS, 2)])
+        rows.append((name, base[1], base[2], *macros, tags, base[9], base[10]))
+    return rows
+
+
+def quiet():
+    """Глушит print() приложения, чтобы не мешал выводу бенчмарка"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def use_stub(base_url, pool_size=100):
+    """Направляет Config на локальную заглушку; вызывать до импорта модулей приложения"""
+    os.environ.update({
+        "DEEPSEEK_API_KEY": "stub",
+        "DEEPSEEK_BASE_URL": base_url,
+        "DEEPSEEK_RETRIES": "0",
+        "DEEPSEEK_POOL_SIZE": str(pool_size),
+    })
+
+
+def git_commit():
+    """Короткий хеш HEAD (+dirty, если есть незакоммиченные правки) или None вне git"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}+dirty" if dirty else commit
+
+
+def write_results(path, name, results, params=None):
+    """Пишет результаты в JSON, чтобы сравнивать прогоны между коммитами"""
+    if not path:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "benchmark": name,
+            "commit": git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "params": params or {},
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
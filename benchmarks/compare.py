@@ -0,0 +1,73 @@
+"""Сравнение двух JSON-результатов одного бенчмарка (например, до и после коммита).
+
+    python -m benchmarks.compare base.json new.json [--threshold 10]
+
+Сравниваются поля времени и пропускной способности (*_ms, *_s, *_rps):
+строки списков сопоставляются по полю size (или по порядку), словари - по
+ключам. Печатаются изменения больше порога в процентах; для *_ms и *_s рост -
+регрессия, для *_rps - улучшение. Код выхода 1, если есть регрессии.
+"""
+import sys, json, argparse
+
+
+def flatten(data, prefix=""):
+    """{путь: число} для всех числовых листьев"""
+    out = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            out.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            tag = value.get("size", i) if isinstance(value, dict) else i
+            out.update(flatten(value, f"{prefix}[{tag}]"))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        out[prefix] = float(data)
+    return out
+
+
+METRIC_SUFFIXES = ("_ms", "_s", "_rps")
+
+
+def is_metric(path):
+    return path.rsplit(".", 1)[-1].endswith(METRIC_SUFFIXES)
+
+
+def lower_is_better(path):
+    return not path.endswith("_rps")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="порог изменения, %%")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    if base.get("benchmark") != new.get("benchmark"):
+        sys.exit(f"разные бенчмарки: {base.get('benchmark')} и {new.get('benchmark')}")
+
+    print(f"{base.get('benchmark')}: {base.get('commit')} -> {new.get('commit')}")
+    before, after = flatten(base["results"]), flatten(new["results"])
+    regressions = 0
+    for path in sorted(p for p in before.keys() & after.keys() if is_metric(p)):
+        old, cur = before[path], after[path]
+        if old == 0:
+            continue
+        change = (cur - old) / abs(old) * 100
+        if abs(change) < args.threshold:
+            continue
+        worse = (change > 0) == lower_is_better(path)
+        regressions += worse
+        mark = "❌" if worse else "✅"
+        print(f"{mark} {path}: {old:g} -> {cur:g} ({change:+.1f}%)")
+    if not regressions:
+        print("регрессий выше порога нет")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Локальная заглушка DeepSeek chat completions для ручных проверок и бенчмарков.
+
+    python -m benchmarks.deepseek_stub --port 8765 --latency 0.5 --failure-rate 0.1
+    DEEPSEEK_API_KEY=stub DEEPSEEK_BASE_URL=http://127.0.0.1:8765/v1 python app.py
+"""
+import re, json, time, random, argparse, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_DISH_LINE = re.compile(r"^- (.+)$", re.MULTILINE)
+
+
+def pick_from_prompt(prompt):
+    """Первое блюдо из списка '- название' в промпте"""
+    names = _DISH_LINE.findall(prompt)
+    choice = names[0].strip() if names else ""
+    return {"choice": choice, "reason": "stub", "target_macros": {
+        "calories": None, "proteins": None, "fats": None, "carbs": None}}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # иначе при сотнях одновременных соединений accept теряет SYN
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            number = server.requests
+        time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+        if number <= server.fail_first or random.random() < server.failure_rate:
+            return self._reply(server.fail_status, {"error": "stub failure"})
+        prompt = payload.get("messages", [{}])[-1].get("content", "")
+        content = json.dumps(server.responder(prompt), ensure_ascii=False)
+        if payload.get("stream"):
+            return self._stream(content)
+        # без потока ответ приходит целиком, когда сгенерирован последний кусок
+        time.sleep(server.token_delay * ((len(content) - 1) // server.chunk_chars))
+        self._reply(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    def _stream(self, content):
+        """stream=True: content кусками по chunk_chars символов через token_delay секунд,
+        события SSE в chunked-ответе, как у настоящего API"""
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = [content[i:i + server.chunk_chars] for i in range(0, len(content), server.chunk_chars)]
+        for n, piece in enumerate(pieces):
+            if n == server.truncate_after:
+                # обрыв посреди потока: соединение закрывается без [DONE] и конца chunked
+                self.close_connection = True
+                return
+            if n:
+                time.sleep(server.token_delay)
+            chunk = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+            self._chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+def start_stub(latency=0.0, jitter=0.0, failure_rate=0.0, port=0, responder=pick_from_prompt,
+               token_delay=0.0, chunk_chars=8, fail_first=0, fail_status=503, truncate_after=None):
+    """Запускает заглушку в фоновом потоке, возвращает (server, base_url).
+    latency - задержка до ответа (для stream=True - до первого куска);
+    первые fail_first запросов и доля failure_rate остальных получают fail_status;
+    truncate_after - потоковый ответ обрывается после стольких кусков"""
+    server = StubServer(("127.0.0.1", port), StubHandler)
+    server.latency = latency
+    server.jitter = jitter
+    server.failure_rate = failure_rate
+    server.fail_first = fail_first
+    server.fail_status = fail_status
+    server.token_delay = token_delay
+    server.chunk_chars = chunk_chars
+    server.truncate_after = truncate_after
+    server.responder = responder
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.05,
+                        help="пауза между кусками потокового ответа, с")
+    args = parser.parse_args()
+    server, url = start_stub(args.latency, args.jitter, args.failure_rate, args.port,
+                             token_delay=args.token_delay)
+    print(f"DeepSeek stub: {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,247 @@
+import os, sys, sqlite3, tempfile, threading
+from functools import lru_cache
+import numpy as np
+
+from data import COLUMNS, DISHES, fingerprint
+
+CATALOG_PATH = os.getenv(
+    "CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.db"),
+)
+NUMERIC_COLUMNS = ("calories", "proteins", "fats", "carbs", "price")
+INDEXED_COLUMNS = ("category", "diet", "tags")
+
+
+def split_list(value):
+    """'курица,без свинины' -> ['курица', 'без свинины']"""
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def build_postings(rows):
+    """{(kind, value): [позиции блюд]} для категорий, диет и тегов"""
+    postings = {}
+    for i, r in enumerate(rows):
+        for c in INDEXED_COLUMNS:
+            value = r[COLUMNS.index(c)]
+            keys = split_list(value) if c == "tags" else [value]
+            for key in keys:
+                postings.setdefault((c, key.lower()), []).append(i)
+    return postings
+
+
+def build_catalog(rows, path, source="builtin"):
+    """Собирает catalog.db из списка кортежей в порядке COLUMNS.
+
+    Кроме самой таблицы блюд в файл кладутся готовые индексы:
+    числовые колонки одним бинарным блобом и списки позиций блюд
+    для каждой категории, диеты и тега.
+    """
+    rows = [tuple(r) for r in rows]
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        cols = ", ".join(
+            f"{c} INTEGER" if c in NUMERIC_COLUMNS else f"{c} TEXT" for c in COLUMNS
+        )
+        conn.execute(f"CREATE TABLE dishes (position INTEGER PRIMARY KEY, {cols})")
+        conn.execute("CREATE UNIQUE INDEX dishes_name ON dishes(name)")
+        conn.executemany(
+            f"INSERT INTO dishes VALUES (?, {', '.join('?' * len(COLUMNS))})",
+            [(i, *r) for i, r in enumerate(rows)],
+        )
+
+        conn.execute("CREATE TABLE numeric (name TEXT PRIMARY KEY, data BLOB)")
+        for c in NUMERIC_COLUMNS:
+            j = COLUMNS.index(c)
+            values = np.array([r[j] for r in rows], dtype=np.float64)
+            conn.execute("INSERT INTO numeric VALUES (?, ?)", (c, values.tobytes()))
+
+        postings = build_postings(rows)
+        conn.execute(
+            "CREATE TABLE postings (kind TEXT, value TEXT, data BLOB, PRIMARY KEY (kind, value))"
+        )
+        conn.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?)",
+            [(kind, value, np.array(pos, dtype=np.int32).tobytes())
+             for (kind, value), pos in postings.items()],
+        )
+
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("size", str(len(rows))),
+            ("fingerprint", fingerprint(rows)),
+            ("source", source),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+class Catalog:
+    """Каталог блюд поверх catalog.db (только чтение).
+
+    Ничего не читается целиком при старте: поиск по имени идёт через
+    уникальный индекс SQLite и кешируется, числовые колонки и индексы
+    по категории/диете/тегу читаются готовыми бинарными массивами
+    при первом обращении.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        meta = dict(self._conn().execute("SELECT key, value FROM meta"))
+        self.size = int(meta["size"])
+        self.fingerprint = meta["fingerprint"]
+        self.source = meta.get("source")
+        self._numeric = {}
+        self._names = None
+        self.index_of = lru_cache(maxsize=4096)(self._index_of)
+        self.postings = lru_cache(maxsize=1024)(self._postings)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, name):
+        return self.index_of(name) is not None
+
+    def _index_of(self, name):
+        row = self._conn().execute(
+            "SELECT position FROM dishes WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def record(self, position):
+        row = self._conn().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM dishes WHERE position = ?", (int(position),)
+        ).fetchone()
+        if row is None:
+            raise IndexError(position)
+        return dict(zip(COLUMNS, row))
+
+    def get(self, name):
+        """Блюдо по имени или None"""
+        i = self.index_of(name)
+        return None if i is None else self.record(i)
+
+    def records(self):
+        cursor = self._conn().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM dishes ORDER BY position"
+        )
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def names(self):
+        if self._names is None:
+            self._names = [n for (n,) in self._conn().execute(
+                "SELECT name FROM dishes ORDER BY position"
+            )]
+        return self._names
+
+    def column(self, name):
+        """Числовая колонка как float64 массив (только чтение)"""
+        values = self._numeric.get(name)
+        if values is None:
+            (blob,) = self._conn().execute(
+                "SELECT data FROM numeric WHERE name = ?", (name,)
+            ).fetchone()
+            values = np.frombuffer(blob, dtype=np.float64)
+            self._numeric[name] = values
+        return values
+
+    def macro_matrix(self):
+        from scoring import MACRO_COLUMNS
+        return np.column_stack([self.column(c) for c in MACRO_COLUMNS])
+
+    def price_index(self):
+        """(позиции по возрастанию цены, отсортированные цены)"""
+        price = self.column("price")
+        order = np.argsort(price, kind="stable")
+        return order, price[order]
+
+    def _postings(self, kind, value):
+        row = self._conn().execute(
+            "SELECT data FROM postings WHERE kind = ? AND value = ?", (kind, value.lower())
+        ).fetchone()
+        if row is None:
+            return np.empty(0, dtype=np.int32)
+        return np.frombuffer(row[0], dtype=np.int32)
+
+    def by_category(self, category):
+        return self.postings("category", category)
+
+    def by_diet(self, diet):
+        return self.postings("diet", diet)
+
+    def by_tag(self, tag):
+        return self.postings("tags", tag)
+
+    def index_values(self, kind):
+        """Все значения индекса: категории, диеты или теги"""
+        return [v for (v,) in self._conn().execute(
+            "SELECT value FROM postings WHERE kind = ? ORDER BY value", (kind,)
+        )]
+
+    def retrieval_index(self):
+        """Поисковый индекс из файла рядом с catalog.db (собирается, если его нет)"""
+        from retrieval import load_or_build
+        return load_or_build(self)
+
+    def similarity_graph(self, k=8):
+        """Граф похожих блюд из файла рядом с catalog.db (собирается, если его нет)"""
+        from similarity import load_or_build
+        return load_or_build(self, k)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def _is_stale(path):
+    """Файл собран из встроенного каталога, но DISHES с тех пор поменялся"""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return True
+    return meta.get("source") == "builtin" and meta.get("fingerprint") != fingerprint(DISHES)
+
+
+def load_catalog(path=None):
+    """Каталог из catalog.db; если файла нет - собирается из встроенного DISHES"""
+    global _catalog
+    if path is None and _catalog is not None:
+        return _catalog
+    with _catalog_lock:
+        if path is None and _catalog is not None:
+            return _catalog
+        target = path or CATALOG_PATH
+        if not os.path.exists(target) or _is_stale(target):
+            try:
+                build_catalog(DISHES, target)
+            except (OSError, sqlite3.Error):
+                # read-only FS (serverless): собираем во временный каталог
+                target = os.path.join(tempfile.gettempdir(), "catalog.db")
+                build_catalog(DISHES, target)
+        catalog = Catalog(target)
+        if path is None:
+            _catalog = catalog
+        return catalog
+
+
+if __name__ == "__main__":
+    out = sys.argv[1] if len(sys.argv) > 1 else CATALOG_PATH
+    build_catalog(DISHES, out)
+    print(f"✅ Каталог собран: {out} ({len(DISHES)} блюд)")
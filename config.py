@@ -4,4 +4,71 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
-    DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
\ No newline at end of file
+    DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
+    DEEPSEEK_BASE_URL = os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com/v1')
+
+    # Клиент DeepSeek: таймауты в секундах, повторы, hedging и circuit breaker
+    DEEPSEEK_CONNECT_TIMEOUT = float(os.getenv('DEEPSEEK_CONNECT_TIMEOUT', '3.05'))
+    DEEPSEEK_READ_TIMEOUT = float(os.getenv('DEEPSEEK_READ_TIMEOUT', '20'))
+    DEEPSEEK_RETRIES = int(os.getenv('DEEPSEEK_RETRIES', '2'))
+    DEEPSEEK_HEDGE = os.getenv('DEEPSEEK_HEDGE', '0') == '1'
+    DEEPSEEK_HEDGE_DELAY = float(os.getenv('DEEPSEEK_HEDGE_DELAY', '2.0'))
+    DEEPSEEK_POOL_SIZE = int(os.getenv('DEEPSEEK_POOL_SIZE', '10'))
+    DEEPSEEK_BREAKER_THRESHOLD = int(os.getenv('DEEPSEEK_BREAKER_THRESHOLD', '5'))
+    DEEPSEEK_BREAKER_RESET = float(os.getenv('DEEPSEEK_BREAKER_RESET', '30'))
+    # Медленный вызов: попытка, оборванная бюджетом запроса, считается ошибкой провайдера,
+    # если длилась дольше p95 его ответов (пока замеров мало - дольше этого порога, с)
+    DEEPSEEK_SLOW_CALL = float(os.getenv('DEEPSEEK_SLOW_CALL', '0.2'))
+
+    # Кеш ответов LLM: memory (в процессе) или sqlite (общий для воркеров)
+    LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'memory')
+    LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '1024'))
+    LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', '3600'))
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH')
+
+    # Сколько ближайших к запросу блюд (из поискового индекса) отправлять в промпт
+    LLM_PROMPT_CANDIDATES = int(os.getenv('LLM_PROMPT_CANDIDATES', '30'))
+
+    # Граф похожих блюд: соседей в графе и сколько отдавать в recommendations
+    SIMILARITY_K = int(os.getenv('SIMILARITY_K', '8'))
+    RECOMMENDATIONS_COUNT = int(os.getenv('RECOMMENDATIONS_COUNT', '3'))
+
+    # Пакетный режим /recommend/batch: бюджет токенов на промпт и на ответ
+    LLM_BATCH_TOKEN_BUDGET = int(os.getenv('LLM_BATCH_TOKEN_BUDGET', '6000'))
+    LLM_BATCH_OUTPUT_TOKENS = int(os.getenv('LLM_BATCH_OUTPUT_TOKENS', '4000'))
+    LLM_BATCH_CONCURRENCY = int(os.getenv('LLM_BATCH_CONCURRENCY', '4'))
+    BATCH_MAX_QUERIES = int(os.getenv('BATCH_MAX_QUERIES', '1000'))
+    # Бюджет всей пачки в секундах: ответ до LLM_BATCH_OUTPUT_TOKENS токенов DeepSeek
+    # генерирует десятки секунд, в REQUEST_DEADLINE одиночного запроса он не влезает
+    BATCH_DEADLINE = float(os.getenv('BATCH_DEADLINE', '60.0'))
+
+    # Подбор меню /plan: максимум блюд в плане и бюджет времени на поиск
+    PLAN_MAX_COURSES = int(os.getenv('PLAN_MAX_COURSES', '8'))
+    PLAN_MAX_TIME_MS = float(os.getenv('PLAN_MAX_TIME_MS', '2000'))
+
+    # Защита от перегрузки (admission.py): лимит запросов на клиента (0 - без лимита),
+    # сколько вызовов DeepSeek одновременно и сколько ждать места в очереди,
+    # сквозной бюджет запроса /recommend и /stream (у /batch свой BATCH_DEADLINE)
+    # и запас на локальный ответ после DeepSeek.
+    # Лимит по умолчанию выключен: клиент - это адрес соединения, а за прокси (Vercel, nginx)
+    # он у всех один. Включать вместе с RATE_LIMIT_TRUST_FORWARDED=1, если прокси
+    # выставляет X-Forwarded-For, или когда клиенты ходят напрямую
+    RATE_LIMIT_RPS = float(os.getenv('RATE_LIMIT_RPS', '0'))
+    RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '30'))
+    RATE_LIMIT_TRUST_FORWARDED = os.getenv('RATE_LIMIT_TRUST_FORWARDED', '0') == '1'
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+    LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '32'))
+    LLM_QUEUE_MAX_WAIT = float(os.getenv('LLM_QUEUE_MAX_WAIT', '1.0'))
+    REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', '8.0'))
+    REQUEST_DEADLINE_RESERVE = float(os.getenv('REQUEST_DEADLINE_RESERVE', '0.05'))
+
+    # Общий каталог для нескольких воркеров (см. shared_catalog.py): каталог с поколениями
+    # и как часто (в секундах) проверять, не опубликовано ли новое
+    CATALOG_SHARED_DIR = os.getenv('CATALOG_SHARED_DIR')
+    CATALOG_CHECK_INTERVAL = float(os.getenv('CATALOG_CHECK_INTERVAL', '1.0'))
+    # Откуда recommender берёт каталог: db - catalog.db (или CATALOG_SHARED_DIR),
+    # snapshot - готовый снимок catalog.snapshot (snapshot.py, по умолчанию у slim_app.py)
+    CATALOG_SOURCE = os.getenv('CATALOG_SOURCE', 'db')
+
+    # Уровень JSON-логов (debug, info, warning, error)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'info')
\ No newline at end of file
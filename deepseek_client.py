@@ -0,0 +1,465 @@
+import json, time, random, logging, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import Config
+from instrumentation import log
+
+SYSTEM_PROMPT = "Ты помощник по подбору блюд. Верни JSON: {choice: 'название', reason: 'текст', target_macros: {calories: число или null, proteins: число или null, fats: число или null, carbs: число или null}}"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Таймаут, сработавший не раньше чем за столько секунд до дедлайна, - это дедлайн
+DEADLINE_SLACK = 0.02
+
+
+class TransientError(Exception):
+    """Ошибка, после которой есть смысл повторить запрос"""
+
+
+class CircuitBreaker:
+    """closed -> (N ошибок подряд) -> open -> (reset_timeout) -> half_open -> closed/open"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probe = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """Можно ли сейчас идти к провайдеру; в half_open пропускается один пробный запрос"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe:
+                self._probe = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probe or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probe = False
+
+    def record_abandoned(self):
+        """Вызов оборвал бюджет вызывающего, а не провайдер: о здоровье провайдера
+        ничего не известно - счётчик не меняется, пробный запрос освобождается"""
+        with self._lock:
+            self._probe = False
+
+
+def backoff_delay(attempt, base=0.25, cap=4.0):
+    """Экспоненциальная задержка с полным джиттером"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def build_payload(prompt, model="deepseek-chat", system=SYSTEM_PROMPT):
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.3,
+        "response_format": {"type": "json_object"}
+    }
+
+
+def as_completion(content):
+    """Собранный из потока текст в форме обычного ответа chat completions"""
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+class LatencyWindow:
+    """Последние задержки ответов провайдера для оценки p95"""
+
+    def __init__(self, size=200, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def p95(self):
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class _BaseClient:
+    """Общие настройки синхронного и асинхронного клиентов"""
+
+    def __init__(self, api_key, base_url="https://api.deepseek.com/v1", model="deepseek-chat",
+                 connect_timeout=3.05, read_timeout=20.0, retries=2, backoff=0.25,
+                 hedge=False, hedge_delay=2.0, pool_size=10, breaker=None, slow_call=0.2):
+        self.api_key = api_key
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.slow_call = slow_call
+        self.latency = LatencyWindow()
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+
+    def _deadline_cut(self, started, attempt):
+        """Попытку оборвал дедлайн. Ошибка провайдера, только если это медленный вызов:
+        длился дольше p95 его ответов (или slow_call, пока замеров мало). Иначе у
+        провайдера просто не было времени, и счётчик breaker не меняется"""
+        elapsed = time.monotonic() - started
+        slow = elapsed >= (self.latency.p95() or self.slow_call)
+        log("deepseek_deadline", attempt=attempt + 1, elapsed=round(elapsed, 3), slow=slow)
+        if slow:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_abandoned()
+
+    def _retry_misses_deadline(self, attempt, delay, deadline):
+        """Повтор в дедлайн не влезет: не делаем и ошибкой провайдера не считаем"""
+        if attempt < self.retries and deadline is not None and time.monotonic() + delay >= deadline:
+            log("deepseek_deadline", attempt=attempt + 1)
+            self.breaker.record_abandoned()
+            return True
+        return False
+
+    def _admit(self):
+        """Проверки перед запросом: есть ключ и провайдер не в open"""
+        if not self.api_key:
+            return False
+        if not self.breaker.allow():
+            log("deepseek_circuit_open")
+            return False
+        return True
+
+
+class DeepSeekClient(_BaseClient):
+    """Клиент DeepSeek chat completions.
+
+    Одна requests.Session с пулом keep-alive соединений, раздельные
+    таймауты на соединение и чтение, повторы временных ошибок с джиттером,
+    опциональный hedging (второй запрос, если первый не ответил за p95)
+    и circuit breaker: пока провайдер болеет, chat() сразу возвращает None
+    и вызывающий код уходит в локальную логику. chat_stream() - тот же
+    запрос с stream=True: куски ответа отдаются по мере прихода.
+    """
+
+    def __init__(self, api_key, **kwargs):
+        super().__init__(api_key, **kwargs)
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.timeout = (self.connect_timeout, self.read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size) if self.hedge else None
+
+    def _timeout(self, deadline=None):
+        """(connect, read) таймауты, урезанные до момента deadline (time.monotonic())"""
+        if deadline is None:
+            return self.timeout
+        remaining = max(0.001, deadline - time.monotonic())
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def _timed_out_at_deadline(self, error, timeout):
+        """Сработал урезанный дедлайном таймаут, и дедлайн действительно наступил"""
+        import requests
+        cause = error.__cause__
+        if isinstance(cause, requests.ConnectTimeout):
+            fired, full = timeout[0], self.connect_timeout
+        elif isinstance(cause, requests.ReadTimeout):
+            fired, full = timeout[1], self.read_timeout
+        else:
+            return False
+        return fired < full
+
+    def _stop_at_deadline(self, error, timeout, started, attempt, delay, deadline):
+        """True - попытки кончаются из-за дедлайна (breaker уже обновлён), False - идём дальше"""
+        if deadline is None:
+            return False
+        if time.monotonic() >= deadline - DEADLINE_SLACK and self._timed_out_at_deadline(error, timeout):
+            self._deadline_cut(started, attempt)
+            return True
+        return self._retry_misses_deadline(attempt, delay, deadline)
+
+    def _post(self, payload, timeout=None):
+        import requests
+        started = time.monotonic()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=timeout or self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientError(str(e)) from e
+        if response.status_code in RETRY_STATUSES:
+            raise TransientError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        result = response.json()
+        self.latency.add(time.monotonic() - started)
+        return result
+
+    def _post_hedged(self, payload, timeout=None):
+        """Если первый запрос не ответил за p95, параллельно шлём второй и берём первый успешный"""
+        delay = self.latency.p95() or self.hedge_delay
+        pending = {self._executor.submit(self._post, payload, timeout)}
+        done, pending = wait(pending, timeout=delay)
+        if not done:
+            pending.add(self._executor.submit(self._post, payload, timeout))
+        error = None
+        while True:
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                for other in pending:
+                    other.cancel()
+                return result
+            if not pending:
+                raise error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+    def chat(self, prompt, system=SYSTEM_PROMPT, deadline=None):
+        """Ответ chat completions как dict или None при любой неудаче.
+        deadline (time.monotonic()) - позже не ждём: таймауты урезаются, лишних повторов нет.
+        Оборванная дедлайном попытка - ошибка провайдера, только если вызов медленный"""
+        if not self._admit():
+            return None
+
+        payload = build_payload(prompt, self.model, system)
+        for attempt in range(self.retries + 1):
+            timeout, started = self._timeout(deadline), time.monotonic()
+            try:
+                if self.hedge:
+                    result = self._post_hedged(payload, timeout)
+                else:
+                    result = self._post(payload, timeout)
+                self.breaker.record_success()
+                return result
+            except TransientError as e:
+                log("deepseek_transient_error", logging.WARNING, attempt=attempt + 1, error=str(e))
+                delay = backoff_delay(attempt, self.backoff)
+                if self._stop_at_deadline(e, timeout, started, attempt, delay, deadline):
+                    return None
+                if attempt < self.retries:
+                    time.sleep(delay)
+            except Exception as e:
+                log("deepseek_error", logging.ERROR, error=str(e))
+                break
+        self.breaker.record_failure()
+        return None
+
+    def _open_stream(self, payload, timeout=None):
+        import requests
+        try:
+            response = self.session.post(self.url, json=payload, timeout=timeout or self.timeout,
+                                         stream=True)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientError(str(e)) from e
+        if response.status_code in RETRY_STATUSES:
+            response.close()
+            raise TransientError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return response
+
+    def chat_stream(self, prompt, system=SYSTEM_PROMPT, deadline=None):
+        """Потоковый ответ (stream=True): генератор кусков content по мере прихода.
+
+        Повторы - только пока ответ не начался. Провайдер считается живым, как
+        только ответил 200; обрыв посреди потока просто заканчивает генератор.
+        deadline (time.monotonic()) - как у chat(); поток после него обрывается.
+        """
+        import requests
+        if not self._admit():
+            return
+        payload = dict(build_payload(prompt, self.model, system), stream=True)
+        response = None
+        for attempt in range(self.retries + 1):
+            timeout, started = self._timeout(deadline), time.monotonic()
+            try:
+                response = self._open_stream(payload, timeout)
+                break
+            except TransientError as e:
+                log("deepseek_transient_error", logging.WARNING, attempt=attempt + 1, error=str(e))
+                delay = backoff_delay(attempt, self.backoff)
+                if self._stop_at_deadline(e, timeout, started, attempt, delay, deadline):
+                    return
+                if attempt < self.retries:
+                    time.sleep(delay)
+            except Exception as e:
+                log("deepseek_error", logging.ERROR, error=str(e))
+                break
+        if response is None:
+            self.breaker.record_failure()
+            return
+        self.breaker.record_success()
+
+        with response:
+            try:
+                for line in response.iter_lines():
+                    if deadline is not None and time.monotonic() >= deadline:
+                        log("deepseek_deadline", streamed=True)
+                        break
+                    if not line.startswith(b"data:"):
+                        continue  # пустые строки между событиями и комментарии keep-alive
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta") or {}
+                    if delta.get("content"):
+                        yield delta["content"]
+            except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+                log("deepseek_stream_error", logging.WARNING, error=str(e))
+
+
+class AsyncDeepSeekClient(_BaseClient):
+    """То же, что DeepSeekClient, но на aiohttp: ожидание ответа не занимает поток.
+
+    aiohttp импортируется лениво - синхронному режиму он не нужен.
+    Сессия создаётся внутри работающего event loop при первом запросе.
+    """
+
+    def __init__(self, api_key, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self._session = None
+
+    def _http(self):
+        if self._session is None:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout,
+                                              sock_read=self.read_timeout),
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+            )
+        return self._session
+
+    async def _post(self, payload):
+        import asyncio, aiohttp
+        started = time.monotonic()
+        try:
+            async with self._http().post(self.url, json=payload) as response:
+                if response.status in RETRY_STATUSES:
+                    raise TransientError(f"HTTP {response.status}")
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise TransientError(str(e) or type(e).__name__) from e
+        self.latency.add(time.monotonic() - started)
+        return result
+
+    async def _post_hedged(self, payload):
+        import asyncio
+        delay = self.latency.p95() or self.hedge_delay
+        pending = {asyncio.ensure_future(self._post(payload))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                pending.add(asyncio.ensure_future(self._post(payload)))
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    return task.result()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # и проигравший запрос, и оба - если нас отменили по дедлайну
+            for other in pending:
+                other.cancel()
+
+    async def chat(self, prompt, system=SYSTEM_PROMPT, deadline=None):
+        """Ответ chat completions как dict или None при любой неудаче.
+        deadline (time.monotonic()) - как у DeepSeekClient.chat: попытка после него
+        отменяется (asyncio.wait_for), повтор, который не влезет, не делается"""
+        import asyncio
+        if not self._admit():
+            return None
+
+        payload = build_payload(prompt, self.model, system)
+        for attempt in range(self.retries + 1):
+            started = time.monotonic()
+            call = self._post_hedged(payload) if self.hedge else self._post(payload)
+            try:
+                if deadline is None:
+                    result = await call
+                else:
+                    result = await asyncio.wait_for(call, max(0.001, deadline - started))
+                self.breaker.record_success()
+                return result
+            except TransientError as e:
+                log("deepseek_transient_error", logging.WARNING, attempt=attempt + 1, error=str(e))
+                delay = backoff_delay(attempt, self.backoff)
+                if self._retry_misses_deadline(attempt, delay, deadline):
+                    return None
+                if attempt < self.retries:
+                    await asyncio.sleep(delay)
+            except asyncio.TimeoutError:
+                # свои таймауты _post превращает в TransientError, этот - от wait_for
+                self._deadline_cut(started, attempt)
+                return None
+            except Exception as e:
+                log("deepseek_error", logging.ERROR, error=str(e))
+                break
+        self.breaker.record_failure()
+        return None
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def _config_kwargs():
+    return dict(
+        base_url=Config.DEEPSEEK_BASE_URL,
+        connect_timeout=Config.DEEPSEEK_CONNECT_TIMEOUT,
+        read_timeout=Config.DEEPSEEK_READ_TIMEOUT,
+        retries=Config.DEEPSEEK_RETRIES,
+        hedge=Config.DEEPSEEK_HEDGE,
+        hedge_delay=Config.DEEPSEEK_HEDGE_DELAY,
+        pool_size=Config.DEEPSEEK_POOL_SIZE,
+        breaker=CircuitBreaker(Config.DEEPSEEK_BREAKER_THRESHOLD, Config.DEEPSEEK_BREAKER_RESET),
+        slow_call=Config.DEEPSEEK_SLOW_CALL,
+    )
+
+
+def make_client(api_key=None):
+    """Клиент по настройкам из Config"""
+    return DeepSeekClient(api_key if api_key is not None else Config.DEEPSEEK_API_KEY,
+                          **_config_kwargs())
+
+
+def make_async_client(api_key=None):
+    """Асинхронный клиент по настройкам из Config"""
+    return AsyncDeepSeekClient(api_key if api_key is not None else Config.DEEPSEEK_API_KEY,
+                               **_config_kwargs())
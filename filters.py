@@ -0,0 +1,183 @@
+"""Фильтры каталога (диета, категория, теги, цена), которые применяются до скоринга.
+
+Для каждого значения диеты, категории и тега строится битовая карта блюд
+(np.packbits над позициями из индексов каталога), условия сочетаются
+побитовыми AND/OR/NOT. Цена - отсортированный индекс: диапазон цен даёт
+непрерывный срез позиций через searchsorted. Скоринг и поиск дальше
+работают только с прошедшими строками.
+
+Формат фильтров в теле /recommend:
+    {"diet": ["вегетарианское"], "category": "десерт", "tags": ["без глютена"],
+     "exclude_tags": ["курица"], "exclude_category": ["салат"], "exclude_diet": [],
+     "price_min": 200, "price_max": 400}
+Внутри diet и category - ИЛИ, tags - все обязательны, exclude_* - ни одного.
+Фильтры из текста запроса - догадка: если вместе с явными они не оставили ни
+одного блюда, они ослабляются (relax), а не дают пустой ответ.
+"""
+import re, json, math
+from functools import lru_cache
+import numpy as np
+
+from llm_cache import stem
+
+LIST_FILTERS = ("diet", "category", "tags", "exclude_tags", "exclude_category", "exclude_diet")
+PRICE_FILTERS = ("price_min", "price_max")
+
+# цена - только с валютой: «до 30 г жира», «до 500 ккал», «от 20 минут» - не цена
+_PRICE_MAX = re.compile(r"\b(?:до|не дороже|дешевле)\s*(\d+)\s*(?:₽|руб\w*|р\b)")
+_PRICE_MIN = re.compile(r"(?<!не )\b(?:от|дороже)\s*(\d+)\s*(?:₽|руб\w*|р\b)")
+# «без X», «кроме X», «не X», «не хочу X» - X исключается, а не выбирается
+_NEGATED = re.compile(r"\b(?:без|кроме|не)\s+(?:(?:хочу|хочется|надо|нужно|нужен|нужна|люблю|ем|буду)\s+)?(\w+)")
+# какие фильтры из текста снимаются первыми, если вместе ничего не прошло
+RELAX_ORDER = ("price_min", "price_max", "tags", "diet", "category",
+               "exclude_tags", "exclude_diet", "exclude_category")
+_WORD = re.compile(r"\w+")
+
+
+def _stems(text):
+    return {stem(w) for w in _WORD.findall(text.lower().replace("ё", "е"))}
+
+
+def normalize_filters(raw):
+    """Фильтры из payload в каноничном виде; ValueError с текстом ошибки"""
+    if raw is None:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("filters must be an object")
+    spec = {}
+    for key, value in raw.items():
+        if key in LIST_FILTERS:
+            values = [value] if isinstance(value, str) else value
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"filter {key} must be a string or a list of strings")
+            values = sorted({v.strip().lower() for v in values if v.strip()})
+            if values:
+                spec[key] = values
+        elif key in PRICE_FILTERS:
+            if value in (None, ""):
+                continue
+            try:
+                number = float(value)
+            except (ValueError, TypeError):
+                number = math.nan
+            if not math.isfinite(number):
+                raise ValueError(f"filter {key} must be a number")
+            spec[key] = number
+        else:
+            raise ValueError(f"unknown filter: {key}")
+    return spec
+
+
+def filter_key(spec):
+    """Строка для ключа кеша LLM: один и тот же запрос с разными фильтрами - разные ответы"""
+    return json.dumps(spec, ensure_ascii=False, sort_keys=True) if spec else ""
+
+
+class Selection:
+    """Результат фильтрации: отсортированные позиции блюд и их битовая карта"""
+
+    def __init__(self, spec, rows, bits):
+        self.spec = spec
+        self.rows = rows
+        self.bits = bits
+        self.key = filter_key(spec)
+
+    def __len__(self):
+        return self.rows.shape[0]
+
+    def __contains__(self, position):
+        if position is None or position < 0 or position >> 3 >= self.bits.shape[0]:
+            return False
+        return bool((self.bits[position >> 3] >> (7 - (position & 7))) & 1)
+
+
+class FilterIndex:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.size = len(catalog)
+        self.price_order, self.price_sorted = catalog.price_index()
+        self._all = np.packbits(np.ones(self.size, dtype=bool))
+        self.bitmap = lru_cache(maxsize=1024)(self._bitmap)
+        # значения индексов по основам слов - для разбора текста запроса
+        self.values = {kind: {v: _stems(v) for v in catalog.index_values(kind)}
+                       for kind in ("diet", "category", "tags")}
+
+    def _bitmap(self, kind, value):
+        bits = np.zeros(self.size, dtype=bool)
+        bits[self.catalog.postings(kind, value)] = True
+        return np.packbits(bits)
+
+    def _any(self, kind, values):
+        out = np.zeros_like(self._all)
+        for value in values:
+            out |= self.bitmap(kind, value)
+        return out
+
+    def price_bitmap(self, low=None, high=None):
+        """Диапазон цен [low, high] - срез отсортированного индекса"""
+        start = 0 if low is None else np.searchsorted(self.price_sorted, low, side="left")
+        stop = self.size if high is None else np.searchsorted(self.price_sorted, high, side="right")
+        bits = np.zeros(self.size, dtype=bool)
+        bits[self.price_order[start:stop]] = True
+        return np.packbits(bits)
+
+    def select(self, spec):
+        """Selection для каноничных фильтров (см. normalize_filters)"""
+        bits = self._all.copy()
+        for kind in ("diet", "category"):
+            if spec.get(kind):
+                bits &= self._any(kind, spec[kind])
+        for tag in spec.get("tags", ()):
+            bits &= self.bitmap("tags", tag)
+        for kind in ("tags", "diet", "category"):
+            if spec.get(f"exclude_{kind}"):
+                bits &= ~self._any(kind, spec[f"exclude_{kind}"])
+        if "price_min" in spec or "price_max" in spec:
+            bits &= self.price_bitmap(spec.get("price_min"), spec.get("price_max"))
+        rows = np.flatnonzero(np.unpackbits(bits, count=self.size))
+        return Selection(spec, rows, bits)
+
+    def extract(self, text):
+        """Фильтры из свободного текста: «до 400 ₽», «без свинины», «вегетарианское»"""
+        text = (text or "").lower().replace("ё", "е")
+        spec = {}
+        price_max = _PRICE_MAX.search(text)
+        if price_max:
+            spec["price_max"] = float(price_max.group(1))
+        price_min = _PRICE_MIN.search(text)
+        if price_min:
+            spec["price_min"] = float(price_min.group(1))
+
+        # «без X», «кроме X», «не X» - исключаются блюда с тегом, категорией или диетой,
+        # где есть слово X (теги «без ...» не в счёт: «без глютена» - это то, что нужно)
+        negated = {stem(word) for word in _NEGATED.findall(text)}
+        for kind in ("tags", "diet", "category"):
+            excluded = sorted(v for v, s in self.values[kind].items()
+                              if not v.startswith("без ") and s & negated)
+            if excluded:
+                spec[f"exclude_{kind}"] = excluded
+
+        # диета и категория - по основам слов вне отрицаний
+        words = _stems(_NEGATED.sub(" ", text))
+        for kind in ("diet", "category"):
+            found = sorted(v for v, s in self.values[kind].items() if s and s <= words)
+            if found:
+                spec[kind] = found
+        return spec
+
+    def relax(self, spec, keep=None):
+        """Selection, в которой снято столько фильтров из текста, сколько нужно, чтобы
+        остались блюда (по порядку RELAX_ORDER); keep - явные фильтры, их не трогаем.
+        None - без фильтров из текста ничего, кроме keep, не остаётся"""
+        keep = keep or {}
+        spec = dict(spec)
+        for key in RELAX_ORDER:
+            if key not in spec or key in keep:
+                continue
+            del spec[key]
+            if not spec:
+                return None
+            selection = self.select(spec)
+            if len(selection):
+                return selection
+        return self.select(spec)
@@ -0,0 +1,236 @@
+"""Лёгкая инструментовка горячего пути: метрики, трассировка запроса, JSON-логи.
+
+- Счётчики и гистограммы живут в памяти процесса (у каждого воркера свои)
+  и отдаются в текстовом формате Prometheus (/metrics).
+- timed("stage") / @traced("stage") пишут длительность этапа в гистограмму
+  recommend_stage_seconds и, если запрос трассируется (заголовок X-Trace),
+  в список этапов запроса - из него собирается заголовок Server-Timing.
+- log("event", ...) - одна JSON-строка на событие вместо print(), заодно
+  считается в recommend_events_total.
+
+Замер этапа - perf_counter, bisect и инкремент под локом (единицы мкс),
+поэтому всё включено всегда.
+"""
+import sys, json, time, bisect, logging, threading, functools, contextvars, inspect
+from contextlib import contextmanager
+
+from config import Config
+
+# Границы бакетов в секундах: от кеша/скоринга до медленного DeepSeek
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+           0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def snapshot(self):
+        """Копия всех значений: {метки: значение}"""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}      # метки -> [счётчики по бакетам (+Inf в конце), сумма, количество]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(k, list(s[0]), s[1], s[2]) for k, s in sorted(self._series.items())]
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("recommend_stage_seconds", "Длительность этапов обработки запроса")
+EVENTS = Counter("recommend_events_total", "События: ответы LLM, кеш, локальная логика, ошибки")
+_METRICS = [STAGE_SECONDS, EVENTS]
+_GAUGES = []   # (имя, описание, функция -> число или {метка: число}, имя метки)
+
+
+def register_gauge(name, help, read, label=None):
+    """Значение, которое читается в момент запроса /metrics (размер кеша, состояние breaker)"""
+    _GAUGES.append((name, help, read, label))
+
+
+def render_metrics():
+    """Все метрики процесса в текстовом формате Prometheus"""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for name, help, read, label in _GAUGES:
+        try:
+            value = read()
+        except Exception:
+            continue
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        items = value.items() if isinstance(value, dict) else [(None, value)]
+        for key, v in items:
+            labels = _format_labels([(label, key)] if key is not None else [])
+            lines.append(f"{name}{labels} {float(v)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- трассировка этапов ---
+
+_spans = contextvars.ContextVar("spans", default=None)
+
+
+@contextmanager
+def timed(stage):
+    """Замер этапа: гистограмма всегда, список этапов - если запрос трассируется"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+def traced(stage):
+    """Декоратор-версия timed() для обычных и async-функций"""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def trace_request(enabled):
+    """Включает сбор этапов для текущего запроса; отдаёт список (этап, секунды)"""
+    spans = [] if enabled else None
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+def trace_enabled(header_value):
+    return (header_value or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def server_timing(spans):
+    """Значение заголовка Server-Timing: этап;dur=мс, повторы этапа нумеруются"""
+    seen, parts = {}, []
+    for stage, elapsed in spans:
+        seen[stage] = seen.get(stage, 0) + 1
+        name = stage if seen[stage] == 1 else f"{stage}-{seen[stage]}"
+        parts.append(f"{name};dur={elapsed * 1000:.2f}")
+    return ", ".join(parts)
+
+
+# --- структурированные логи ---
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Пишет в текущий sys.stdout (а не в тот, что был при импорте)"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+logger = logging.getLogger("recommender")
+if not logger.handlers:
+    _handler = _StdoutHandler()
+    _handler.setFormatter(JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(Config.LOG_LEVEL.upper())
+    logger.propagate = False
+
+
+def log(event, level=logging.INFO, **fields):
+    """Событие в лог одной JSON-строкой и в счётчик recommend_events_total"""
+    EVENTS.inc(event=event)
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
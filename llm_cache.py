@@ -0,0 +1,154 @@
+import os, re, json, time, hashlib, logging, threading
+from collections import OrderedDict
+
+from instrumentation import log
+
+# Окончания для лёгкого стемминга (длинные раньше коротких)
+_ENDINGS = sorted([
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ешь", "ишь",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ом", "ем",
+    "ам", "ям", "ах", "ях", "ую", "юю", "ов", "ев", "ия", "ью", "ть",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+], key=len, reverse=True)
+_MIN_STEM = 3
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def stem(word: str) -> str:
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def normalize_query(text: str) -> str:
+    """'Что-нибудь  ДИЕТИЧЕСКОЕ!' -> 'что нибуд диетическ'"""
+    text = (text or "").lower().replace("ё", "е")
+    return " ".join(stem(w) for w in _NON_WORD.sub(" ", text).split())
+
+
+def dish_list_hash(dish_names) -> str:
+    """Хеш списка блюд, которые видит LLM: другой каталог - другие ключи"""
+    return hashlib.sha1("\n".join(dish_names).encode("utf-8")).hexdigest()[:16]
+
+
+def make_key(free_text: str, dishes_hash: str) -> str:
+    return hashlib.sha1(f"{dishes_hash}|{normalize_query(free_text)}".encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """LRU-кеш в памяти процесса с TTL на каждую запись"""
+
+    def __init__(self, maxsize=1024, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"backend": "memory", "size": len(self), "hits": self.hits, "misses": self.misses}
+
+
+class SQLiteCache:
+    """Общий для всех воркеров кеш в файле SQLite (LRU по времени обращения + TTL)"""
+
+    def __init__(self, path, maxsize=10000, ttl=3600.0):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(key TEXT PRIMARY KEY, value TEXT, expires REAL, used REAL)"
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS llm_cache_used ON llm_cache(used)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        import sqlite3
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT value, expires FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            log("llm_cache_error", logging.ERROR, error=str(e))
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        import sqlite3
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl, now),
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+        except sqlite3.Error as e:
+            log("llm_cache_error", logging.ERROR, error=str(e))
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def stats(self):
+        return {"backend": "sqlite", "size": len(self), "hits": self.hits, "misses": self.misses}
+
+
+def make_cache(backend="memory", maxsize=1024, ttl=3600.0, path=None):
+    """Кеш ответов LLM по настройкам из Config"""
+    if backend == "sqlite":
+        return SQLiteCache(path or os.path.join(os.getcwd(), "llm_cache.db"), maxsize, ttl)
+    if backend == "memory":
+        return MemoryCache(maxsize, ttl)
+    raise ValueError(f"unknown LLM cache backend: {backend}")
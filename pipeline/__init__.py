@@ -0,0 +1,24 @@
+"""Конвейер /recommend: admit -> parse -> retrieve -> pick -> score -> enrich -> serialize.
+
+Один конвейер на все точки входа (app.py, api/index.py, asgi.py, slim_app.py): они только
+достают тело запроса и адрес клиента и отдают ctx.status, ctx.headers и
+ctx.body. Стадии заменяются по имени:
+
+    build_pipeline(pick=my_pick)                 # свой выбор блюда
+    recommend_pipeline.replace("enrich", ...)    # то же для готового конвейера
+"""
+from pipeline.core import Context, Pipeline
+from pipeline import stages
+
+STAGES = ("admit", "parse", "retrieve", "pick", "score", "enrich", "serialize")
+
+
+def build_pipeline(**overrides):
+    """Конвейер из стадий по умолчанию; overrides заменяют стадии по имени"""
+    unknown = set(overrides) - set(STAGES)
+    if unknown:
+        raise ValueError(f"unknown stages: {', '.join(sorted(unknown))}")
+    return Pipeline([(name, overrides.get(name) or getattr(stages, name)) for name in STAGES])
+
+
+recommend_pipeline = build_pipeline()
@@ -0,0 +1,81 @@
+"""Конвейер стадий над состоянием одного запроса"""
+import logging
+
+from config import Config
+from admission import Deadline
+from instrumentation import log, timed
+
+INTERNAL_ERROR = b'{"error": "Internal server error"}'
+
+
+class Context:
+    """Состояние запроса: стадии по очереди читают и дополняют его поля"""
+
+    def __init__(self, payload=None, client=None, budget=None):
+        self.payload = payload
+        self.client = client    # кто спрашивает - для лимита запросов
+        self.deadline = Deadline(Config.REQUEST_DEADLINE if budget is None else budget)
+        self.status = 200
+        self.headers = {}       # дополнительные заголовки ответа (Retry-After)
+        self.query = None
+        self.k = 1
+        self.selection = None   # блюда, прошедшие фильтры (filters.Selection) или None
+        self.cache_key = None
+        self.candidates = None  # названия блюд для промпта; None - DeepSeek не спрашиваем
+        self.llm = None         # выбор: {"choice", "reason", "target_macros"}
+        self.result = None      # тело ответа словарём
+        self.body = None        # тело ответа байтами
+        self.jump_to = None
+
+    def jump(self, stage):
+        """Пропустить стадии до stage (например, попадание в кеш - без pick)"""
+        self.jump_to = stage
+
+    def fail(self, status, **body):
+        """Ошибка запроса: тело ответа - body, дальше только сериализация"""
+        self.status = status
+        self.result = body
+        self.jump("serialize")
+
+
+class Pipeline:
+    """Стадии (имя, функция(ctx)) по порядку; собирается один раз при старте.
+
+    Каждая стадия замеряется timed(имя): гистограмма recommend_stage_seconds и
+    Server-Timing при X-Trace. Исключение любой стадии - ответ 500.
+    """
+
+    def __init__(self, stages, name="recommend"):
+        self.name = name
+        self.stages = tuple(stages)
+        self._position = {stage: i for i, (stage, _) in enumerate(self.stages)}
+
+    def __iter__(self):
+        return (name for name, _ in self.stages)
+
+    def replace(self, name, stage):
+        """Новый конвейер, в котором стадия name заменена на stage"""
+        if name not in self._position:
+            raise KeyError(name)
+        return Pipeline([(n, stage if n == name else s) for n, s in self.stages], self.name)
+
+    def run(self, payload, client=None):
+        return self.resume(Context(payload, client), self.stages[0][0])
+
+    def resume(self, ctx, start):
+        """Прогон ctx со стадии start; переходы ctx.jump - только вперёд"""
+        try:
+            i = self._position[start]
+            while i < len(self.stages):
+                name, stage = self.stages[i]
+                with timed(name):
+                    stage(ctx)
+                if ctx.jump_to is None:
+                    i += 1
+                else:
+                    i = max(i + 1, self._position.get(ctx.jump_to, len(self.stages)))
+                    ctx.jump_to = None
+        except Exception as e:
+            log(f"{self.name}_error", logging.ERROR, error=str(e))
+            ctx.status, ctx.body = 500, INTERNAL_ERROR
+        return ctx
@@ -0,0 +1,84 @@
+"""Стадии /recommend по умолчанию: каждая - функция(ctx)"""
+import math
+
+import recommender
+from config import Config
+from rules import build_prompt, parse_k
+from instrumentation import log
+from serialization import encode
+from admission import RateLimiter
+from recommender import (select_dishes, cache_key_for, prompt_candidates,
+                         call_deepseek_api, parse_llm_response, local_pick, build_recommendation,
+                         companions_for)
+
+limiter = RateLimiter(Config.RATE_LIMIT_RPS, Config.RATE_LIMIT_BURST)
+
+
+def admit(ctx):
+    """Лимит запросов на клиента (token bucket): сверх лимита - 429 с Retry-After"""
+    retry_after = limiter.acquire(ctx.client)
+    if retry_after:
+        log("rate_limited")
+        ctx.headers["Retry-After"] = str(math.ceil(retry_after))
+        ctx.fail(429, error="rate limit exceeded")
+
+
+def parse(ctx):
+    """Тело запроса -> query, k, selection; мусор во вводе - 400, пустой фильтр - 404"""
+    payload = ctx.payload
+    if not isinstance(payload, dict):
+        return ctx.fail(400, error="invalid json")
+    query = payload.get("query")
+    ctx.query = query.strip() if isinstance(query, str) else ""
+    if not ctx.query:
+        return ctx.fail(400, error="empty query")
+    try:
+        ctx.k = parse_k(payload)
+    except (ValueError, TypeError):
+        return ctx.fail(400, error="invalid k")
+    try:
+        ctx.selection = select_dishes(ctx.query, payload.get("filters"))
+    except ValueError as e:
+        return ctx.fail(400, error=str(e))
+    if ctx.selection is not None and not len(ctx.selection):
+        return ctx.fail(404, error="no dishes match filters", filters=ctx.selection.spec)
+
+
+def retrieve(ctx):
+    """Кеш выбора LLM и кандидаты для промпта; попадание в кеш - сразу к score"""
+    if not recommender.api_key:
+        return
+    ctx.cache_key = cache_key_for(ctx.query, ctx.selection)
+    cached = recommender.llm_cache.get(ctx.cache_key)
+    if cached is not None:
+        log("llm_cache_hit")
+        ctx.llm = cached
+        return ctx.jump("score")
+    ctx.candidates = prompt_candidates(ctx.query, ctx.selection)
+
+
+def pick(ctx):
+    """Выбор DeepSeek среди кандидатов (в пределах бюджета запроса), иначе локальная логика"""
+    if ctx.candidates is not None:
+        prompt = build_prompt(ctx.query, ctx.candidates)
+        result = parse_llm_response(call_deepseek_api(prompt, ctx.deadline), ctx.selection)
+        if result is not None:
+            recommender.llm_cache.set(ctx.cache_key, result)
+            ctx.llm = result
+            return
+    ctx.llm = local_pick(ctx.query, ctx.selection)
+
+
+def score(ctx):
+    """Блюдо и альтернативы по целям КБЖУ"""
+    ctx.result = build_recommendation(ctx.llm, ctx.k, selection=ctx.selection, with_companions=False)
+
+
+def enrich(ctx):
+    """Похожие блюда к итоговому выбору"""
+    ctx.result["recommendations"] = companions_for(ctx.result["dish"]["name"], ctx.selection)
+
+
+def serialize(ctx):
+    """Тело ответа из готовых JSON-фрагментов блюд текущего каталога"""
+    ctx.body = encode(ctx.result, recommender.fragments)
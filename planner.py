@@ -0,0 +1,251 @@
+"""Подбор меню из нескольких блюд под цели по КБЖУ и бюджет.
+
+Ищется набор из N разных блюд, сумма КБЖУ которого ближе всего к целям
+(сумма относительных отклонений |итог - цель| / цель), при ограничениях:
+цена не выше бюджета, не больше X блюд из категории, только разрешённые
+диеты/категории.
+
+Перебор - branch-and-bound в глубину по возрастающим позициям блюд.
+Все дети узла оцениваются одним векторным проходом: нижняя граница
+отклонения считается через интервал, куда ещё может попасть сумма
+(минимальные/максимальные суммы оставшихся слотов), и дети с границей
+не лучше текущего рекорда отсекаются. Стартовый рекорд даёт лучевой
+поиск. Если время вышло - возвращается лучший найденный план.
+"""
+import math, time
+import numpy as np
+
+from scoring import MACRO_COLUMNS
+
+
+class Planner:
+    def __init__(self, macros, price, categories, diets, category_names, diet_names, materialize):
+        self.macros = np.asarray(macros, dtype=np.float64)
+        self.price = np.asarray(price, dtype=np.float64)
+        self.categories = categories      # код категории для каждого блюда
+        self.diets = diets                # код диеты для каждого блюда
+        self.category_names = category_names
+        self.diet_names = diet_names
+        self._materialize = materialize
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Коды категорий и диет - из готовых индексов каталога"""
+        def codes(kind):
+            values = catalog.index_values(kind)
+            out = np.full(len(catalog), -1, dtype=np.int32)
+            for j, value in enumerate(values):
+                out[catalog.postings(kind, value)] = j
+            return out, values
+
+        categories, category_names = codes("category")
+        diets, diet_names = codes("diet")
+        return cls(catalog.macro_matrix(), catalog.column("price"), categories, diets,
+                   category_names, diet_names, catalog.record)
+
+    def _codes(self, names, known):
+        lookup = {v: j for j, v in enumerate(known)}
+        return [lookup[n.lower()] for n in names if n.lower() in lookup]
+
+    def plan(self, targets, courses=3, max_price=None, max_per_category=None,
+             diets=None, categories=None, time_budget=0.2, beam_width=64):
+        started = time.monotonic()
+        deadline = started + time_budget
+
+        # цели: только заданные колонки
+        cols, goals = [], []
+        for j, k in enumerate(MACRO_COLUMNS):
+            t = (targets or {}).get(k)
+            if t not in (None, ""):
+                cols.append(j)
+                goals.append(float(t))
+        goals = np.array(goals)
+        scale = np.where(goals > 0, goals, 1.0)
+
+        # фильтры по диете и категории - до перебора
+        pool = np.ones(len(self.price), dtype=bool)
+        if diets:
+            pool &= np.isin(self.diets, self._codes(diets, self.diet_names))
+        if categories:
+            pool &= np.isin(self.categories, self._codes(categories, self.category_names))
+        if max_price is not None:
+            pool &= self.price <= max_price
+        idx = np.flatnonzero(pool)
+
+        # лишний слот в конце - для блюд без категории (код -1)
+        caps = np.full(len(self.category_names) + 1, courses, dtype=np.int64)
+        for name, cap in (max_per_category or {}).items():
+            for j in self._codes([name], self.category_names):
+                caps[j] = int(cap)
+
+        values = self.macros[idx][:, cols]
+        price = self.price[idx]
+        cats = self.categories[idx]
+        budget = np.inf if max_price is None else float(max_price)
+        n = idx.shape[0]
+        if n < courses:
+            return self._result(None, None, cols, goals, True, started)
+
+        # минимальные/максимальные суммы для r оставшихся слотов
+        sorted_vals = np.sort(values, axis=0)
+        lo = np.vstack([np.zeros(len(cols)), np.cumsum(sorted_vals, axis=0)])
+        hi = np.vstack([np.zeros(len(cols)), np.cumsum(sorted_vals[::-1], axis=0)])
+        min_price = np.concatenate([[0.0], np.cumsum(np.sort(price))])
+
+        def bound(sums, remaining):
+            """Нижняя граница отклонения, если осталось remaining слотов"""
+            low, high = sums + lo[remaining], sums + hi[remaining]
+            gap = np.maximum(goals - high, 0.0) + np.maximum(low - goals, 0.0)
+            return (gap / scale).sum(axis=-1)
+
+        best = {"score": np.inf, "picks": None}
+
+        def consider(picks, sums):
+            score = float((np.abs(sums - goals) / scale).sum())
+            if score < best["score"]:
+                best["score"], best["picks"] = score, list(picks)
+
+        def expand(picks, sums, spent, used):
+            """Векторная оценка всех детей узла. На последнем слоте сразу берётся
+            лучший вариант; иначе - кадр с детьми, прошедшими отсечение"""
+            remaining = courses - len(picks) - 1
+            start = picks[-1] + 1 if picks else 0
+            cand = np.arange(start, n - remaining)
+            cand = cand[(used[cats[cand]] < caps[cats[cand]])
+                        & (spent + price[cand] + min_price[remaining] <= budget)]
+            if cand.shape[0] == 0:
+                return None
+            child_sums = sums + values[cand]
+            if remaining == 0:
+                j = int(np.argmin(bound(child_sums, 0)))
+                consider(picks + (int(cand[j]),), child_sums[j])
+                return None
+            bounds = bound(child_sums, remaining)
+            keep = np.flatnonzero(bounds < best["score"])
+            order = keep[np.argsort(bounds[keep], kind="stable")]
+            return {"picks": picks, "sums": child_sums[order], "spent": spent, "used": used,
+                    "cand": cand[order], "bounds": bounds[order], "next": 0}
+
+        self._beam(values, price, cats, caps, budget, min_price, courses, bound, consider,
+                   beam_width, deadline)
+
+        # стек кадров: узел + его дети, отсортированные по границе; дети
+        # разворачиваются по одному, поэтому рекорд, найденный в одной ветке,
+        # сразу отсекает ещё не тронутых соседей
+        optimal = True
+        stack = [expand((), np.zeros(len(cols)), 0.0, np.zeros_like(caps))]
+        while stack:
+            if time.monotonic() > deadline:
+                optimal = False
+                break
+            frame = stack[-1]
+            if frame is None or frame["next"] >= frame["cand"].shape[0] \
+                    or frame["bounds"][frame["next"]] >= best["score"]:
+                stack.pop()
+                continue
+            j = frame["next"]
+            frame["next"] += 1
+            c = int(frame["cand"][j])
+            used = frame["used"].copy()
+            used[cats[c]] += 1
+            stack.append(expand(frame["picks"] + (c,), frame["sums"][j], frame["spent"] + price[c], used))
+
+        picks = None if best["picks"] is None else [int(idx[p]) for p in best["picks"]]
+        return self._result(picks, best["score"], cols, goals, optimal, started)
+
+    def _beam(self, values, price, cats, caps, budget, min_price, courses, bound, consider,
+              width, deadline):
+        """Лучевой поиск: быстрый стартовый рекорд для отсечений"""
+        n = values.shape[0]
+        beams = [((), np.zeros(values.shape[1]), 0.0, np.zeros_like(caps))]
+        for depth in range(courses):
+            if time.monotonic() > deadline:
+                width = 1  # время вышло - дособрать план жадно
+            remaining = courses - depth - 1
+            scored = []
+            for picks, sums, spent, used in beams:
+                start = picks[-1] + 1 if picks else 0
+                cand = np.arange(start, n - remaining)
+                cand = cand[(used[cats[cand]] < caps[cats[cand]])
+                            & (spent + price[cand] + min_price[remaining] <= budget)]
+                if cand.shape[0] == 0:
+                    continue
+                b = bound(sums + values[cand], remaining)
+                top = np.argpartition(b, width - 1)[:width] if b.shape[0] > width else np.arange(b.shape[0])
+                for j in top[np.argsort(b[top], kind="stable")]:
+                    scored.append((b[j], picks, sums, spent, used, int(cand[j])))
+            scored.sort(key=lambda x: x[0])
+            beams = []
+            for _, picks, sums, spent, used, c in scored[:width]:
+                child_used = used.copy()
+                child_used[cats[c]] += 1
+                beams.append((picks + (c,), sums + values[c], spent + price[c], child_used))
+        for picks, sums, _, _ in beams:
+            consider(picks, sums)
+
+    def _result(self, picks, score, cols, goals, optimal, started):
+        elapsed_ms = round((time.monotonic() - started) * 1000, 2)
+        if picks is None:
+            return {"dishes": [], "totals": {}, "score": None, "optimal": optimal,
+                    "elapsed_ms": elapsed_ms}
+        dishes = [self._materialize(p) for p in picks]
+        totals = {k: float(self.macros[picks, j].sum()) for j, k in enumerate(MACRO_COLUMNS)}
+        totals["price"] = float(self.price[picks].sum())
+        return {
+            "dishes": dishes,
+            "totals": totals,
+            "targets": {MACRO_COLUMNS[c]: float(g) for c, g in zip(cols, goals)},
+            "score": round(score, 6),
+            "optimal": optimal,
+            "elapsed_ms": elapsed_ms,
+        }
+
+
+def _names(payload, key):
+    """Строка или список строк (как фильтры в filters.normalize_filters) -> список или None"""
+    values = payload.get(key)
+    values = [values] if isinstance(values, str) else values or []
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise ValueError(f"{key} must be a string or a list of strings")
+    return [v for v in values if v.strip()] or None
+
+
+def parse_plan_payload(payload, max_courses=8, max_time_ms=2000):
+    """Аргументы Planner.plan из тела /plan; ValueError с текстом ошибки"""
+    if not isinstance(payload, dict):
+        raise ValueError("invalid json")
+    try:
+        targets = {k: payload.get("targets", {}).get(k) for k in MACRO_COLUMNS}
+        for k, v in targets.items():
+            if v not in (None, ""):
+                targets[k] = float(v)
+        courses = int(payload.get("courses") or 3)
+        max_price = payload.get("max_price")
+        max_price = None if max_price in (None, "") else float(max_price)
+        time_ms = float(payload.get("time_budget_ms") or 200)
+    except (AttributeError, ValueError, TypeError):
+        raise ValueError("invalid plan parameters")
+    # "nan"/"inf" float() принимает, а перебор с ними теряет смысл
+    numbers = [v for v in targets.values() if v not in (None, "")] + [max_price, time_ms]
+    if not all(math.isfinite(v) for v in numbers if v is not None):
+        raise ValueError("invalid plan parameters")
+    if not 1 <= courses <= max_courses:
+        raise ValueError(f"courses must be between 1 and {max_courses}")
+    caps = payload.get("max_per_category") or {}
+    if not isinstance(caps, dict):
+        raise ValueError("max_per_category must be an object")
+    try:
+        caps = {name: int(cap) for name, cap in caps.items()}
+    except (ValueError, TypeError):
+        raise ValueError("max_per_category values must be integers")
+    if any(cap < 0 for cap in caps.values()):
+        raise ValueError("max_per_category values must be non-negative")
+    return {
+        "targets": targets,
+        "courses": courses,
+        "max_price": max_price,
+        "max_per_category": caps,
+        "diets": _names(payload, "diets"),
+        "categories": _names(payload, "categories"),
+        "time_budget": min(max(time_ms, 1.0), max_time_ms) / 1000,
+    }
@@ -0,0 +1,426 @@
+"""Общая логика /recommend для синхронного (Flask) и асинхронного (ASGI) режимов.
+
+Импорт лёгкий (холодный старт slim_app.py): каталог и всё, что из него строится
+(CatalogParts), загружается при первом обращении - recommender.catalog,
+recommender.scorer и т.д. или parts(); numpy, requests и SQLite подтягиваются
+только тогда, когда нужны. Клиент DeepSeek и кеш ответов LLM создаются, только
+если задан DEEPSEEK_API_KEY.
+"""
+import logging, threading
+from contextlib import contextmanager, asynccontextmanager
+from functools import cached_property
+from llm_cache import make_cache, make_key, dish_list_hash
+from config import Config
+from deepseek_client import make_client, as_completion
+from snapshot import load_snapshot
+from serialization import DishFragments
+from admission import ConcurrencyGate, AsyncConcurrencyGate, Deadline
+from instrumentation import log, timed, traced, register_gauge
+from rules import (build_prompt, parse_choice, partial_choice, local_choice, parse_k, has_target,
+                   recommendation)
+
+# Получаем API ключ безопасно
+api_key = Config.DEEPSEEK_API_KEY
+if not api_key:
+    log("deepseek_key_missing", logging.WARNING, msg="DEEPSEEK_API_KEY not found - using local logic")
+
+# без ключа DeepSeek не спрашиваем: ни клиента, ни кеша его ответов
+llm_cache = make_cache(Config.LLM_CACHE_BACKEND, Config.LLM_CACHE_SIZE,
+                       Config.LLM_CACHE_TTL, Config.LLM_CACHE_PATH) if api_key else None
+deepseek = make_client(api_key) if api_key else None
+llm_gate = ConcurrencyGate(Config.LLM_MAX_CONCURRENCY, Config.LLM_MAX_QUEUE)
+# то же для asgi.py: у event loop своя очередь, ожидание не занимает поток
+allm_gate = AsyncConcurrencyGate(Config.LLM_MAX_CONCURRENCY, Config.LLM_MAX_QUEUE)
+
+
+def current_catalog():
+    """Снимок каталога (CATALOG_SOURCE=snapshot), текущее поколение общего каталога
+    (CATALOG_SHARED_DIR) или catalog.db"""
+    if Config.CATALOG_SOURCE == "snapshot":
+        return load_snapshot()
+    if Config.CATALOG_SHARED_DIR:
+        from shared_catalog import generation
+        return generation(Config.CATALOG_SHARED_DIR, Config.CATALOG_CHECK_INTERVAL)
+    from catalog import load_catalog
+    return load_catalog()
+
+
+class CatalogParts:
+    """Каталог и всё, что из него строится; каждая часть - при первом обращении"""
+
+    NAMES = ("catalog", "scorer", "dishes_hash", "retrieval", "similarity", "filter_index",
+             "fragments")
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    @cached_property
+    def scorer(self):
+        from scoring import MacroScorer
+        return MacroScorer(self.catalog.macro_matrix())
+
+    @cached_property
+    def dishes_hash(self):
+        return dish_list_hash(self.catalog.names())
+
+    @cached_property
+    def retrieval(self):
+        return self.catalog.retrieval_index()
+
+    @cached_property
+    def similarity(self):
+        return self.catalog.similarity_graph(Config.SIMILARITY_K)
+
+    @cached_property
+    def filter_index(self):
+        from filters import FilterIndex
+        return FilterIndex(self.catalog)
+
+    @cached_property
+    def fragments(self):
+        return DishFragments(self.catalog)
+
+    def build(self):
+        """Собрать все части сразу (перед подменой каталога между запросами)"""
+        for name in self.NAMES:
+            getattr(self, name)
+        return self
+
+
+_parts = None
+_parts_lock = threading.Lock()
+
+
+def parts():
+    """Текущий каталог и его части (CatalogParts); первый вызов загружает каталог"""
+    if _parts is None:
+        with _parts_lock:
+            if _parts is None:
+                use_catalog(current_catalog(), build=False)
+    return _parts
+
+
+def __getattr__(name):
+    # recommender.catalog, recommender.scorer, ... - части текущего каталога
+    if name in CatalogParts.NAMES:
+        return getattr(parts(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def use_catalog(new_catalog, build=True):
+    """Переключает каталог и всё, что из него построено; сначала строим, потом подменяем.
+    build=False - части соберутся при первом обращении"""
+    global _parts
+    new_parts = CatalogParts(new_catalog)
+    _parts = new_parts.build() if build else new_parts
+
+
+def refresh_catalog():
+    """Переход на новое поколение каталога, если оно опубликовано. Вызывается между
+    запросами: у синхронного воркера весь запрос видит одно поколение"""
+    new_catalog = current_catalog()
+    if new_catalog is not parts().catalog:
+        use_catalog(new_catalog)
+        log("catalog_swapped", fingerprint=new_catalog.fingerprint, size=len(new_catalog))
+
+
+register_gauge("catalog_dishes", "Блюд в текущем каталоге (по отпечатку поколения)",
+               lambda: {parts().catalog.fingerprint[:12]: len(parts().catalog)}, "fingerprint")
+register_gauge("dish_fragments", "Блюд с готовым JSON-фрагментом ответа",
+               lambda: len(parts().fragments))
+register_gauge("llm_cache_entries", "Записей в кеше ответов LLM", lambda: llm_cache.stats()["size"])
+register_gauge("llm_cache_requests", "Обращения к кешу LLM (hit/miss)",
+               lambda: {"hit": llm_cache.hits, "miss": llm_cache.misses}, "result")
+register_gauge("llm_gate", "Вызовы DeepSeek (/recommend, /stream, /batch): идут сейчас и ждут места",
+               lambda: {"active": llm_gate.active + allm_gate.active,
+                        "waiting": llm_gate.waiting + allm_gate.waiting}, "state")
+register_gauge("deepseek_breaker_state", "Состояние circuit breaker DeepSeek (1 - текущее)",
+               lambda: {s: int(s == deepseek.breaker.state) for s in ("closed", "open", "half_open")},
+               "state")
+
+
+def llm_budget(deadline):
+    """Сколько секунд бюджета запроса осталось на DeepSeek (минус запас на локальный ответ);
+    None - не осталось"""
+    budget = deadline.remaining() - Config.REQUEST_DEADLINE_RESERVE
+    if budget <= 0:
+        log("deadline_fallback")
+        return None
+    return budget
+
+
+@contextmanager
+def llm_slot(deadline):
+    """Место в очереди llm_gate в пределах бюджета запроса (admission.Deadline).
+
+    Отдаёт момент (time.monotonic()), после которого ответ DeepSeek уже не ждём -
+    остаток бюджета минус запас на локальный ответ, - или None, если бюджет
+    кончился или место не освободилось: тогда DeepSeek не спрашиваем.
+    """
+    budget = llm_budget(deadline)
+    if budget is not None and not llm_gate.acquire(min(Config.LLM_QUEUE_MAX_WAIT, budget)):
+        log("llm_queue_rejected", waiting=llm_gate.waiting)
+        budget = None
+    if budget is None:
+        yield None
+        return
+    try:
+        yield deadline.at - Config.REQUEST_DEADLINE_RESERVE
+    finally:
+        llm_gate.release()
+
+
+@asynccontextmanager
+async def allm_slot(deadline):
+    """llm_slot для asyncio: место в очереди allm_gate ждём, не занимая поток"""
+    budget = llm_budget(deadline)
+    if budget is not None and not await allm_gate.acquire(min(Config.LLM_QUEUE_MAX_WAIT, budget)):
+        log("llm_queue_rejected", waiting=allm_gate.waiting)
+        budget = None
+    if budget is None:
+        yield None
+        return
+    try:
+        yield deadline.at - Config.REQUEST_DEADLINE_RESERVE
+    finally:
+        allm_gate.release()
+
+
+@traced("deepseek")
+def call_deepseek_api(prompt: str, deadline=None):
+    """Вызов DeepSeek API через общий клиент (пул соединений, повторы, circuit breaker).
+
+    deadline (admission.Deadline) - бюджет запроса: место в очереди llm_gate и ответ
+    ждём не дольше его остатка (см. llm_slot); None - если не дождались.
+    """
+    if deadline is None:
+        return deepseek.chat(prompt)
+    with llm_slot(deadline) as until:
+        return None if until is None else deepseek.chat(prompt, deadline=until)
+
+
+@traced("llm_parse")
+def parse_llm_response(api_response, selection=None):
+    """Выбор из ответа DeepSeek или None, если ответ пустой или блюда нет в каталоге (в фильтре)"""
+    try:
+        result = parse_choice(api_response)
+        if result is not None and allowed(result['choice'], selection):
+            log("llm_success")
+            return result
+    except Exception as e:
+        log("llm_parse_error", logging.WARNING, error=str(e))
+    return None
+
+
+def allowed(name, selection=None):
+    """Блюдо есть в каталоге и проходит фильтры"""
+    catalog = parts().catalog
+    if selection is None:
+        return name in catalog
+    return catalog.index_of(name) in selection
+
+
+@traced("filters")
+def select_dishes(free_text: str, raw_filters=None):
+    """Фильтры из текста запроса + явные из payload (они важнее) -> Selection или None.
+    Пустая Selection - только из-за явных фильтров: фильтры из текста, с которыми
+    ничего не прошло, ослабляются. ValueError, если в payload мусор"""
+    from filters import normalize_filters
+    filter_index = parts().filter_index
+    explicit = normalize_filters(raw_filters)
+    spec = filter_index.extract(free_text)
+    spec.update(explicit)
+    if not spec:
+        return None
+    selection = filter_index.select(spec)
+    if len(selection) or spec == explicit:
+        return selection
+    log("filters_relaxed", filters=selection.key)
+    return filter_index.relax(spec, explicit)
+
+
+def cache_key_for(free_text: str, selection=None):
+    return make_key(free_text, parts().dishes_hash + (selection.key if selection is not None else ""))
+
+
+@traced("retrieval")
+def prompt_candidates(free_text: str, selection=None):
+    """Названия блюд для промпта: только ближайшие к запросу, а не весь каталог"""
+    catalog, retrieval = parts().catalog, parts().retrieval
+    names = catalog.names()
+    if selection is not None:
+        if len(selection) <= Config.LLM_PROMPT_CANDIDATES:
+            return [names[i] for i in selection.rows]
+        return [names[i] for i, _ in retrieval.search(
+            free_text, Config.LLM_PROMPT_CANDIDATES, selection.rows)]
+    if len(catalog) <= Config.LLM_PROMPT_CANDIDATES:
+        return names
+    return [names[i] for i, _ in retrieval.search(free_text, Config.LLM_PROMPT_CANDIDATES)]
+
+
+@traced("local_pick")
+def local_pick(free_text: str, selection=None):
+    """Локальная логика как запасной вариант: намерение по ключевым словам + поиск по индексу"""
+    log("local_fallback")
+    rows = selection.rows if selection is not None else None
+    return local_choice(free_text, parts().retrieval.search, parts().catalog.names(), rows,
+                        lambda name: allowed(name, selection))
+
+
+class SingleFlight:
+    """Склеивает одинаковые одновременные запросы к LLM в один вызов"""
+
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, factory):
+        import asyncio
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # помечаем исключение полученным: ожидающие увидят его через shield
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+
+@traced("llm_pick")
+async def allm_pick_dish(free_text: str, client, flights: SingleFlight, selection=None,
+                         deadline=None):
+    """Выбор блюда для asgi.py (стадии retrieve + pick): ждёт DeepSeek, не занимая поток.
+    deadline (admission.Deadline, по умолчанию REQUEST_DEADLINE) - как у /recommend:
+    очередь allm_gate и ответ DeepSeek - в пределах остатка бюджета"""
+    deadline = deadline or Deadline(Config.REQUEST_DEADLINE)
+    if api_key:
+        cache_key = cache_key_for(free_text, selection)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            log("llm_cache_hit")
+            return cached
+
+        async def ask():
+            prompt = build_prompt(free_text, prompt_candidates(free_text, selection))
+            async with allm_slot(deadline) as until:
+                response = None if until is None else await client.chat(prompt, deadline=until)
+            result = parse_llm_response(response, selection)
+            if result is not None:
+                llm_cache.set(cache_key, result)
+            return result
+
+        result = await flights.do(cache_key, ask)
+        if result is not None:
+            return result
+
+    return local_pick(free_text, selection)
+
+
+def companions_for(dish_name, selection=None):
+    """Похожие блюда из графа: кураторские из recommendations, затем ближайшие соседи.
+    С фильтрами соседи берутся из всего списка графа и отсеиваются"""
+    catalog, similarity = parts().catalog, parts().similarity
+    position = catalog.index_of(dish_name)
+    if position is None:
+        return []
+    names = catalog.names()
+    if selection is None:
+        return [names[i] for i in similarity.companions(position, Config.RECOMMENDATIONS_COUNT)]
+    found = [i for i in similarity.companions(position) if i in selection]
+    return [names[i] for i in found[:Config.RECOMMENDATIONS_COUNT]]
+
+
+def build_recommendation(llm, k=1, ranked=None, selection=None, with_companions=True):
+    """Ответ /recommend по выбору LLM: блюдо, альтернативы по КБЖУ и рекомендации.
+
+    ranked - уже посчитанные позиции лучших блюд (пакетный режим считает их разом).
+    selection - блюда, прошедшие фильтры: скоринг идёт только по ним.
+    with_companions=False - recommendations не считаются (None), поток шлёт их отдельно.
+    """
+    chosen_name = llm.get("choice")
+    target = llm.get("target_macros") or {}
+    catalog = parts().catalog
+
+    # Находим блюдо в каталоге
+    if allowed(chosen_name, selection):
+        candidate = catalog.get(chosen_name)
+    else:
+        candidate = catalog.record(int(selection.rows[0]) if selection is not None else 0)
+
+    # Уточняем по КБЖУ если нужно
+    alternatives = []
+    if has_target(llm):
+        with timed("scoring"):
+            if ranked is None:
+                rows = selection.rows if selection is not None else None
+                ranked, _ = parts().scorer.top_k_indices(target, k, rows)
+            dishes = [catalog.record(int(i)) for i in ranked]
+        candidate, alternatives = dishes[0], dishes[1:]
+
+    recommendations = None
+    if with_companions:
+        with timed("companions"):
+            recommendations = companions_for(candidate["name"], selection)
+    return recommendation(llm, candidate, alternatives, recommendations,
+                          selection.spec if selection is not None else None)
+
+
+def stream_recommendation(free_text: str, k=1, selection=None, deadline=None):
+    """События /recommend/stream по мере готовности: (event, data).
+
+    local      - мгновенный локальный выбор (ключевые слова, поиск, скоринг КБЖУ);
+    choice     - блюдо DeepSeek, как только в потоковом ответе закрыто поле choice;
+    llm        - выбор DeepSeek целиком: обоснование, цели, альтернативы;
+    withdraw   - вместо llm после choice: ответ оборвался или не разобрался,
+                 объявленный выбор отменяется, в силе local;
+    companions - похожие блюда для итогового выбора; done - конец потока.
+    Без ключа, при ошибке DeepSeek или выборе не из каталога llm не приходит.
+    deadline (admission.Deadline, по умолчанию REQUEST_DEADLINE) - как у /recommend:
+    место в очереди llm_gate и поток DeepSeek ждём не дольше остатка бюджета.
+    """
+    deadline = deadline or Deadline(Config.REQUEST_DEADLINE)
+    result = build_recommendation(local_pick(free_text, selection), k, selection=selection,
+                                  with_companions=False)
+    yield "local", result
+
+    if api_key:
+        cache_key = cache_key_for(free_text, selection)
+        llm = llm_cache.get(cache_key)
+        if llm is not None:
+            log("llm_cache_hit")
+        else:
+            prompt = build_prompt(free_text, prompt_candidates(free_text, selection))
+            content, name, announced = "", None, None
+            with llm_slot(deadline) as until:
+                deltas = deepseek.chat_stream(prompt, deadline=until) if until is not None else ()
+                for delta in deltas:
+                    content += delta
+                    if name is None:
+                        name = partial_choice(content)
+                        if name is not None and allowed(name, selection):
+                            announced = name
+                            yield "choice", {"llm_choice": name, "dish": parts().catalog.get(name)}
+            llm = parse_llm_response(as_completion(content), selection) if content else None
+            if llm is not None:
+                llm_cache.set(cache_key, llm)
+        if llm is not None:
+            result = build_recommendation(llm, k, selection=selection, with_companions=False)
+            yield "llm", result
+        elif announced is not None:
+            yield "withdraw", {"llm_choice": announced}
+
+    with timed("companions"):
+        recommendations = companions_for(result["dish"]["name"], selection)
+    yield "companions", {"recommendations": recommendations}
+    yield "done", {}
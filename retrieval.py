@@ -0,0 +1,143 @@
+"""Локальный поиск блюд по тексту запроса (без сети).
+
+Каждое блюдо - документ из названия, тегов, категории и диеты. Документы
+разбиваются на символьные n-граммы, n-граммы хешируются (crc32) в
+фиксированное пространство признаков, веса - TF-IDF с L2-нормировкой.
+Хранится инвертированный индекс: отсортированные id признаков, смещения
+и плоские массивы (блюдо, вес) - поиск трогает только постинги n-грамм запроса.
+"""
+import os, re, zlib
+import numpy as np
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+NGRAM = 3
+DIM = 1 << 22
+# Версия формата .retrieval.npz и параметров сборки: индекс другой версии пересобирается.
+# Поднять FORMAT при правке dish_document или весов
+FORMAT = 1
+VERSION = f"{FORMAT}:{NGRAM}:{DIM}"
+
+
+def clean_text(text):
+    return _NON_WORD.sub(" ", (text or "").lower().replace("ё", "е")).strip()
+
+
+def ngram_features(text, n=NGRAM, dim=DIM):
+    """Хеши символьных n-грамм слов с границами: ' суп ' -> ' су', 'суп', 'уп '"""
+    feats = []
+    for word in clean_text(text).split():
+        padded = f" {word} "
+        for i in range(max(1, len(padded) - n + 1)):
+            feats.append(zlib.crc32(padded[i:i + n].encode("utf-8")) % dim)
+    return feats
+
+
+def dish_document(dish):
+    return " ".join([dish["name"], dish["tags"].replace(",", " "), dish["category"], dish["diet"]])
+
+
+class RetrievalIndex:
+    def __init__(self, feature_ids, offsets, doc_ids, weights, idf, size):
+        self.feature_ids = feature_ids
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.idf = idf
+        self.size = size
+
+    @classmethod
+    def build(cls, documents):
+        docs, feats = [], []
+        for d, text in enumerate(documents):
+            f = ngram_features(text)
+            docs.extend([d] * len(f))
+            feats.extend(f)
+        docs = np.asarray(docs, dtype=np.int32)
+        feats = np.asarray(feats, dtype=np.int64)
+        size = len(documents)
+
+        # tf по парам (признак, документ)
+        pair = np.unique(feats * size + docs, return_counts=True)
+        pair_feat, pair_doc = pair[0] // size, (pair[0] % size).astype(np.int32)
+        tf = 1.0 + np.log(pair[1])
+
+        feature_ids, starts, df = np.unique(pair_feat, return_index=True, return_counts=True)
+        idf = np.log((1.0 + size) / (1.0 + df)) + 1.0
+        weights = tf * np.repeat(idf, df)
+
+        norms = np.sqrt(np.bincount(pair_doc, weights=weights ** 2, minlength=size))
+        weights = weights / np.where(norms > 0, norms, 1.0)[pair_doc]
+        offsets = np.append(starts, pair_feat.shape[0]).astype(np.int64)
+        return cls(feature_ids, offsets, pair_doc, weights.astype(np.float32),
+                   idf.astype(np.float32), size)
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        return cls.build([dish_document(d) for d in catalog.records()])
+
+    def __len__(self):
+        return self.size
+
+    def scores(self, query):
+        """Косинусная близость запроса ко всем блюдам"""
+        feats, counts = np.unique(np.asarray(ngram_features(query), dtype=np.int64),
+                                  return_counts=True)
+        pos = np.searchsorted(self.feature_ids, feats)
+        pos = np.minimum(pos, len(self.feature_ids) - 1)
+        known = self.feature_ids[pos] == feats
+        pos, counts = pos[known], counts[known]
+        if pos.shape[0] == 0:
+            return np.zeros(self.size, dtype=np.float32)
+        q = (1.0 + np.log(counts)) * self.idf[pos]
+        q /= np.sqrt((q ** 2).sum())
+
+        slices = [slice(self.offsets[p], self.offsets[p + 1]) for p in pos]
+        docs = np.concatenate([self.doc_ids[s] for s in slices])
+        contrib = np.concatenate([self.weights[s] * w for s, w in zip(slices, q)])
+        return np.bincount(docs, weights=contrib, minlength=self.size)
+
+    def search(self, query, top_n=10, rows=None):
+        """[(позиция блюда, близость), ...] по убыванию близости; rows - искать только среди них"""
+        scores = self.scores(query)
+        if rows is not None:
+            scores = scores[rows]
+        size = scores.shape[0]
+        top_n = min(top_n, size)
+        if top_n <= 0:
+            return []
+        idx = np.argpartition(-scores, top_n - 1)[:top_n] if top_n < size else np.arange(size)
+        idx = idx[np.lexsort((idx, -scores[idx]))]
+        positions = idx if rows is None else np.asarray(rows)[idx]
+        return [(int(p), float(scores[i])) for i, p in zip(idx, positions)]
+
+    def save(self, path, fingerprint=""):
+        np.savez(path, feature_ids=self.feature_ids, offsets=self.offsets, doc_ids=self.doc_ids,
+                 weights=self.weights, idf=self.idf, size=self.size, fingerprint=fingerprint,
+                 version=VERSION)
+
+    @classmethod
+    def load(cls, path, fingerprint=""):
+        """Индекс из .npz или None, если файла нет или он собран для другого каталога
+        либо другой версией (VERSION)"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if "version" not in data.files or str(data["version"]) != VERSION:
+                return None
+            if str(data["fingerprint"]) != fingerprint:
+                return None
+            return cls(data["feature_ids"], data["offsets"], data["doc_ids"],
+                       data["weights"], data["idf"], int(data["size"]))
+
+
+def load_or_build(catalog):
+    """Индекс для каталога: из файла рядом с catalog.db, иначе собирается и сохраняется"""
+    path = f"{catalog.path}.retrieval.npz"
+    index = RetrievalIndex.load(path, catalog.fingerprint)
+    if index is None:
+        index = RetrievalIndex.from_catalog(catalog)
+        try:
+            index.save(path, catalog.fingerprint)
+        except OSError:
+            pass
+    return index
@@ -0,0 +1,127 @@
+"""Правила /recommend без тяжёлых зависимостей: промпт, разбор ответа, намерения, ответ.
+
+Модуль использует только стандартную библиотеку, поэтому его импортирует и
+полный recommender.py, и лёгкая точка входа slim_app.py.
+"""
+import re, json
+
+MAX_K = 20
+DEFAULT_DISH = "Курица с овощами"
+# Ниже этой близости совпадение с запросом считаем случайным
+MIN_RETRIEVAL_SCORE = 0.2
+
+# Намерения запроса: ключевые слова -> цели по КБЖУ, подсказка для поиска, обоснование
+INTENTS = [
+    (("диетич", "легк", "мало калорий", "низкокалорий"), {"calories": 250}, "диетическое",
+     "Диетическое блюдо с низкой калорийностью"),
+    (("белк", "протеин"), {"proteins": 30}, "", "Богатое белком блюдо"),
+    (("углев", "карб", "энерги"), {"carbs": 50}, "сытное", "Богатое углеводами для энергии"),
+    (("вегетариан", "без мяса"), {}, "вегетарианское", "Вегетарианское блюдо"),
+    (("завтрак", "омлет"), {}, "завтрак", "Идеально для завтрака"),
+    (("салат", "свеж"), {}, "салат", "Свежий и легкий салат"),
+]
+
+# Закрытое поле choice в (возможно, ещё недописанном) JSON-ответе
+_CHOICE = re.compile(r'"choice"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def build_prompt(free_text: str, dish_names):
+    dishes_str = "\n".join([f"- {name}" for name in dish_names])
+    return f"""
+Пользователь: "{free_text}"
+
+Доступные блюда:
+{dishes_str}
+
+Выбери ОДНО блюдо и верни JSON:
+{{
+    "choice": "название блюда",
+    "reason": "обоснование на русском",
+    "target_macros": {{
+        "calories": число или null,
+        "proteins": число или null,
+        "fats": число или null,
+        "carbs": число или null
+    }}
+}}
+"""
+
+
+def parse_choice(api_response):
+    """JSON выбора из ответа DeepSeek или None; исключение, если в ответе не JSON"""
+    if api_response and 'choices' in api_response:
+        content = api_response['choices'][0]['message']['content']
+        result = json.loads(content)
+        if 'choice' in result:
+            return result
+    return None
+
+
+def partial_choice(content):
+    """Название блюда из недописанного потокового ответа - как только поле choice закрыто"""
+    match = _CHOICE.search(content)
+    return json.loads(f'"{match.group(1)}"') if match else None
+
+
+def match_intent(free_text: str):
+    """Цели по КБЖУ, подсказка для поиска и обоснование по ключевым словам запроса"""
+    query_lower = free_text.lower()
+    target_macros = {"calories": None, "proteins": None, "fats": None, "carbs": None}
+    for words, macros, hint, reason in INTENTS:
+        if any(word in query_lower for word in words):
+            target_macros.update(macros)
+            return target_macros, hint, reason
+    return target_macros, "", None
+
+
+def local_choice(free_text: str, search, names, rows=None, allowed=None):
+    """Локальный выбор блюда: намерение по ключевым словам + поиск по индексу.
+
+    search(text, n, rows) -> [(позиция, близость), ...]; rows - блюда, прошедшие
+    фильтры, allowed(name) - проходит ли их блюдо.
+    """
+    target_macros, hint, reason = match_intent(free_text)
+    hits = search(f"{free_text} {hint}", 1, rows)
+    if hits and hits[0][1] >= MIN_RETRIEVAL_SCORE:
+        choice = names[hits[0][0]]
+        reason = reason or "Ближе всего к запросу по названию и тегам"
+    else:
+        choice = DEFAULT_DISH
+        if rows is not None and len(rows) and not allowed(choice):
+            choice = names[rows[0]]
+        reason = reason or "Сбалансированное блюдо"
+    return {"choice": choice, "reason": reason, "target_macros": target_macros}
+
+
+def parse_k(payload):
+    """Сколько блюд вернуть (1..MAX_K); ValueError/TypeError на мусор"""
+    return max(1, min(int(payload.get("k") or 1), MAX_K))
+
+
+def query_payload(params):
+    """payload /recommend из параметров GET-запроса: filters - JSON-объект строкой"""
+    payload = dict(params)
+    if isinstance(payload.get("filters"), str):
+        try:
+            payload["filters"] = json.loads(payload["filters"])
+        except ValueError:
+            pass  # останется строкой: разбор ответит "filters must be an object"
+    return payload
+
+
+def has_target(llm):
+    """Задал ли LLM хоть одну цель по КБЖУ"""
+    return any(v not in (None, "") for v in (llm.get("target_macros") or {}).values())
+
+
+def recommendation(llm, dish, alternatives, recommendations, spec=None):
+    """Тело ответа /recommend"""
+    return {
+        "dish": dish,
+        "llm_choice": llm.get("choice"),
+        "reason": llm.get("reason"),
+        "used_target_macros": llm.get("target_macros") or {},
+        "alternatives": alternatives,
+        "recommendations": recommendations,
+        "filters": spec or {}
+    }
@@ -0,0 +1,115 @@
+import numpy as np
+
+MACRO_COLUMNS = ("calories", "proteins", "fats", "carbs")
+
+
+def score_by_macros(row, target):
+    """Штраф за превышение целевых КБЖУ (одно блюдо)"""
+    score = 0.0
+    for k in MACRO_COLUMNS:
+        t = target.get(k)
+        if t is None: continue
+        try:
+            diff = max(0.0, float(row[k]) - float(t))
+            score += diff / (float(t) if float(t) > 0 else 1.0)
+        except (ValueError, TypeError): continue
+    return score
+
+
+def _target_vectors(target):
+    """Целевые КБЖУ -> (цели, делители, маска заданных колонок)"""
+    goals = np.zeros(len(MACRO_COLUMNS))
+    scale = np.ones(len(MACRO_COLUMNS))
+    active = np.zeros(len(MACRO_COLUMNS), dtype=bool)
+    for j, k in enumerate(MACRO_COLUMNS):
+        t = target.get(k)
+        if t is None: continue
+        try:
+            t = float(t)
+        except (ValueError, TypeError): continue
+        goals[j] = t
+        scale[j] = t if t > 0 else 1.0
+        active[j] = True
+    return goals, scale, active
+
+
+def _select_top_k(scores, k):
+    """argpartition + стабильный порядок: при равных штрафах раньше идёт блюдо выше в каталоге"""
+    n = scores.shape[0]
+    k = max(0, min(int(k), n))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        part = np.argpartition(scores, k - 1)[:k]
+        kth = scores[part].max()
+        below = np.flatnonzero(scores < kth)
+        ties = np.flatnonzero(scores == kth)[:k - below.shape[0]]
+        idx = np.concatenate([below, ties])
+    else:
+        idx = np.arange(n)
+    return idx[np.lexsort((idx, scores[idx]))]
+
+
+class MacroScorer:
+    """Векторный скоринг всего каталога по КБЖУ.
+
+    Колонки calories/proteins/fats/carbs хранятся одной float-матрицей (M x 4),
+    штраф считается за один проход numpy, наружу отдаются позиции блюд:
+    словари собирает вызывающий код и только для тех строк, что ушли в ответ.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def scores(self, target, rows=None):
+        """Штраф для всех блюд сразу (или только для позиций rows), тот же смысл что у score_by_macros"""
+        goals, scale, active = _target_vectors(target)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        if not active.any():
+            return np.zeros(matrix.shape[0])
+        cols = matrix[:, active]
+        over = np.maximum(cols - goals[active], 0.0) / scale[active]
+        # нечисловые значения в каталоге не штрафуются, как и в score_by_macros
+        return np.nan_to_num(over, nan=0.0).sum(axis=1)
+
+    def top_k_indices(self, target, k=1, rows=None):
+        """Индексы k лучших блюд по возрастанию штрафа (при равенстве - по порядку в каталоге).
+
+        rows - отсортированные позиции прошедших фильтр блюд: скорятся только они,
+        а возвращаемые штрафы выровнены по rows.
+        """
+        scores = self.scores(target, rows)
+        idx = _select_top_k(scores, k)
+        return (idx if rows is None else np.asarray(rows)[idx]), scores
+
+    def scores_many(self, targets):
+        """Матрица штрафов N целей x M блюд, накапливается по колонкам КБЖУ"""
+        out = np.zeros((len(targets), len(self)))
+        vectors = [_target_vectors(t) for t in targets]
+        goals = np.array([v[0] for v in vectors]).reshape(len(targets), -1)
+        scale = np.array([v[1] for v in vectors]).reshape(len(targets), -1)
+        active = np.array([v[2] for v in vectors]).reshape(len(targets), -1)
+        for j in range(len(MACRO_COLUMNS)):
+            rows = np.flatnonzero(active[:, j])
+            if rows.shape[0] == 0:
+                continue
+            over = np.maximum(self.matrix[None, :, j] - goals[rows, j, None], 0.0)
+            out[rows] += np.nan_to_num(over / scale[rows, j, None], nan=0.0)
+        return out
+
+    def top_k_many(self, targets, k=1, block_cells=4_000_000):
+        """Индексы k лучших блюд для каждой цели; цели считаются блоками,
+        чтобы матрица N x M не раздувала память на больших каталогах"""
+        block = max(1, block_cells // max(1, len(self)))
+        result = []
+        for start in range(0, len(targets), block):
+            scores = self.scores_many(targets[start:start + block])
+            if k == 1 and len(self):
+                result.extend(np.argmin(scores, axis=1)[:, None])
+            else:
+                result.extend(_select_top_k(row, k) for row in scores)
+        return result
+
@@ -0,0 +1,84 @@
+"""Сериализация ответов /recommend: JSON каждого блюда кодируется один раз на каталог.
+
+Блюда - самая большая часть тела ответа (длинные image_url, теги) и одни и те
+же от запроса к запросу. DishFragments хранит байты JSON каждого блюда до смены
+каталога (небольшие каталоги кодируются сразу при загрузке, большие - по мере
+обращения), а encode() собирает тело склейкой готовых фрагментов: заново
+кодируются только короткие поля - выбор, обоснование, цели КБЖУ. Мелкие поля
+кодирует orjson, если он установлен, иначе json; вывод - компактный UTF-8.
+
+ETag ответа - хеш тела: GET /recommend с If-None-Match получает 304 без тела.
+Модуль на стандартной библиотеке, его импортирует и slim_app.py.
+"""
+import json, hashlib
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость: ускоряет только мелкие поля
+    orjson = None
+
+# Каталоги до стольки блюд кодируются целиком при загрузке
+PRECOMPUTE_MAX = 5000
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(value):
+    """Компактный JSON в UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return _encoder.encode(value).encode("utf-8")
+
+
+class DishFragments:
+    """Байты JSON блюд каталога; каждое блюдо кодируется один раз"""
+
+    def __init__(self, catalog, precompute=None):
+        self.catalog = catalog
+        self._fragments = {}
+        if precompute is None:
+            precompute = len(catalog) <= PRECOMPUTE_MAX
+        if precompute:
+            for position in range(len(catalog)):
+                self._fragments[position] = dumps(catalog.record(position))
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def position(self, position):
+        fragment = self._fragments.get(position)
+        if fragment is None:
+            fragment = self._fragments[position] = dumps(self.catalog.record(position))
+        return fragment
+
+    def dish(self, dish):
+        """Фрагмент блюда-словаря из каталога (по имени); блюдо не из каталога кодируется как есть"""
+        position = self.catalog.index_of(dish.get("name"))
+        return dumps(dish) if position is None else self.position(position)
+
+
+def encode(data, fragments=None):
+    """Тело ответа: dish и alternatives - готовыми фрагментами, остальные поля - одним dumps"""
+    if fragments is None or not isinstance(data.get("dish"), dict):
+        return dumps(data)
+    body = b'{"dish":' + fragments.dish(data["dish"])
+    if "alternatives" in data:
+        body += b',"alternatives":[' + b",".join(fragments.dish(d) for d in data["alternatives"]) + b"]"
+    rest = dumps({key: value for key, value in data.items() if key not in ("dish", "alternatives")})
+    return body + (b"}" if rest == b"{}" else b"," + rest[1:])
+
+
+def etag(body):
+    """ETag тела ответа (без кавычек)"""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def not_modified(if_none_match, tag):
+    """Совпадает ли If-None-Match с ETag (слабые W/ сравниваются как сильные)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/").strip('"') == tag:
+            return True
+    return False
@@ -0,0 +1,92 @@
+"""Несколько процессов-воркеров app.py на одном порту (prefork).
+
+    CATALOG_SHARED_DIR=/srv/catalog python serve.py --workers 4 --port 8000
+
+Родитель открывает сокет и форкает воркеров; каждый импортирует app.py уже
+после fork и принимает соединения с общего сокета, по одному запросу за раз.
+С CATALOG_SHARED_DIR все воркеры читают один mmap-файл поколения каталога
+(shared_catalog.py), и каталог лежит в памяти один раз на всех; без него
+каждый воркер загружает catalog.db себе. Упавший воркер перезапускается.
+
+То же под gunicorn (синхронные воркеры):
+
+    CATALOG_SHARED_DIR=/srv/catalog gunicorn -w 4 -b 0.0.0.0:8000 app:app
+"""
+import os, sys, select, signal, socket, logging, argparse
+
+
+def run_worker(sock, ready):
+    """Тело воркера: импорт приложения после fork и цикл обработки запросов"""
+    from werkzeug.serving import make_server
+    import app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app.app, fd=sock.fileno())
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    os.write(ready, b"1")
+    server.serve_forever()
+
+
+def spawn(sock, ready):
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            run_worker(sock, ready)
+            code = 0
+        except KeyboardInterrupt:
+            code = 0
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="0 - любой свободный")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    sock = socket.create_server((args.host, args.port), backlog=128)
+    port = sock.getsockname()[1]
+    ready_r, ready_w = os.pipe()
+    workers = {spawn(sock, ready_w) for _ in range(args.workers)}
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    started = 0
+    while started < args.workers:
+        if select.select([ready_r], [], [], 0.5)[0]:
+            started += len(os.read(ready_r, args.workers))
+        elif os.waitpid(-1, os.WNOHANG)[0]:
+            stop()
+            sys.exit("воркер завершился до старта (ошибка импорта app.py?)")
+    print(f"✅ {args.workers} воркеров слушают http://{args.host}:{port}", flush=True)
+
+    while workers:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            workers.add(spawn(sock, ready_w))
+    sock.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""Общий для всех воркеров каталог: поколения в mmap-файлах и атомарная смена.
+
+Поколение - один файл, в котором лежит всё, что каждый воркер иначе строил бы
+себе сам: числовые колонки и матрица КБЖУ, строковые колонки (смещения +
+UTF-8), индексы категорий/диет/тегов, поисковый индекс, граф похожих блюд и
+отсортированный индекс цен. Воркеры открывают файл через mmap и смотрят в него
+numpy-массивами без копирования, так что страницы каталога в памяти одни на
+все процессы (page cache), сколько бы воркеров ни было.
+
+Текущее поколение записано в файле CURRENT. publish() пишет новый файл
+поколения и подменяет CURRENT через os.replace - атомарно; воркеры сверяют
+CURRENT не чаще раза в CATALOG_CHECK_INTERVAL секунд и переходят на новое
+поколение между запросами, без рестарта. Старые поколения удаляются, кроме
+последних keep: открытые mmap на удалённые файлы продолжают работать.
+add_dish() публикует поколение с одним новым блюдом: граф похожих блюд не
+пересобирается за O(M^2), а дополняется копией графа текущего поколения за O(M).
+
+    python shared_catalog.py /srv/catalog            # опубликовать встроенный каталог
+    python shared_catalog.py /srv/catalog dish.json  # добавить блюдо (словарь по COLUMNS)
+    CATALOG_SHARED_DIR=/srv/catalog python serve.py --workers 4
+"""
+import os, sys, json, mmap, time, struct, threading
+from functools import lru_cache
+import numpy as np
+
+from data import COLUMNS, DISHES
+from catalog import NUMERIC_COLUMNS, build_postings, fingerprint
+
+MAGIC = b"CATGEN01"
+VERSION = 1
+ALIGN = 64
+POINTER = "CURRENT"
+TEXT_COLUMNS = tuple(c for c in COLUMNS if c not in NUMERIC_COLUMNS)
+
+
+def _string_table(values):
+    """Строки -> (смещения int64 длины M+1, байты UTF-8 подряд)"""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_generation(path, rows, source="builtin", k=8, graph=None):
+    """Файл поколения: MAGIC, длина и JSON заголовка, затем выровненные массивы.
+    graph - готовый граф похожих блюд для rows (иначе строится заново)"""
+    from retrieval import RetrievalIndex, dish_document
+    from similarity import SimilarityGraph
+    from scoring import MACRO_COLUMNS
+
+    rows = [tuple(r) for r in rows]
+    records = [dict(zip(COLUMNS, r)) for r in rows]
+    arrays = {}
+    for c in NUMERIC_COLUMNS:
+        arrays[f"col:{c}"] = np.array([r[c] for r in records], dtype=np.float64)
+    arrays["macros"] = np.column_stack([arrays[f"col:{c}"] for c in MACRO_COLUMNS])
+    arrays["price_order"] = np.argsort(arrays["col:price"], kind="stable")
+    arrays["price_sorted"] = arrays["col:price"][arrays["price_order"]]
+    for c in TEXT_COLUMNS:
+        arrays[f"str:{c}:offsets"], arrays[f"str:{c}:data"] = _string_table(r[c] or "" for r in records)
+    names = [r["name"] for r in records]
+    arrays["name_order"] = np.array(sorted(range(len(names)), key=names.__getitem__), dtype=np.int64)
+
+    postings, spans, start = [], {}, 0
+    for (kind, value), positions in sorted(build_postings(rows).items()):
+        postings.append(np.array(positions, dtype=np.int32))
+        spans[f"{kind}\t{value}"] = [start, start + len(positions)]
+        start += len(positions)
+    arrays["postings"] = np.concatenate(postings) if postings else np.empty(0, dtype=np.int32)
+
+    index = RetrievalIndex.build([dish_document(d) for d in records])
+    for name in ("feature_ids", "offsets", "doc_ids", "weights", "idf"):
+        arrays[f"retrieval:{name}"] = getattr(index, name)
+    if graph is None or len(graph) != len(rows) or graph.k != k:
+        graph = SimilarityGraph.build(records, k)
+    for name in ("neighbors", "weights", "mean", "std", "macros", "tokens"):
+        arrays[f"graph:{name}"] = getattr(graph, name)
+
+    header = {
+        "version": VERSION, "size": len(rows), "fingerprint": fingerprint(rows), "source": source,
+        "postings": spans, "retrieval_size": index.size,
+        "vocab": sorted(graph.vocab, key=graph.vocab.get), "arrays": {},
+    }
+    # смещения массивов - от начала данных, сразу за заголовком (выровнен пробелами)
+    offset = 0
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        arrays[name] = values
+        header["arrays"][name] = [offset, values.dtype.str, list(values.shape)]
+        offset += -(-values.nbytes // ALIGN) * ALIGN
+    blob = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    base = -(-(len(MAGIC) + 8 + len(blob)) // ALIGN) * ALIGN
+    blob = blob.ljust(base - len(MAGIC) - 8)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(blob)) + blob)
+        for name, values in arrays.items():
+            f.seek(base + header["arrays"][name][0])
+            f.write(values.tobytes())
+        f.truncate(base + offset)
+    os.replace(tmp_path, path)
+    return path
+
+
+class StringColumn:
+    """Строковая колонка поверх mmap: элемент декодируется при обращении"""
+
+    def __init__(self, buffer, offsets, start):
+        self._buffer = buffer
+        self._offsets = offsets
+        self._start = start
+
+    def __len__(self):
+        return self._offsets.shape[0] - 1
+
+    def __getitem__(self, i):
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        a, b = self._offsets[i], self._offsets[i + 1]
+        return self._buffer[self._start + a:self._start + b].decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class SharedCatalog:
+    """Каталог из файла поколения (только чтение) с интерфейсом catalog.Catalog"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: не файл поколения каталога")
+        (length,) = struct.unpack("<Q", self._mmap[len(MAGIC):len(MAGIC) + 8])
+        header = json.loads(self._mmap[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+        if header["version"] != VERSION:
+            raise ValueError(f"{path}: версия {header['version']}, ожидается {VERSION}")
+        base = len(MAGIC) + 8 + length
+        self.size = header["size"]
+        self.fingerprint = header["fingerprint"]
+        self.source = header["source"]
+        self._header = header
+        self._arrays = {
+            name: np.frombuffer(self._mmap, dtype=dtype, count=int(np.prod(shape)),
+                                offset=base + offset).reshape(shape)
+            for name, (offset, dtype, shape) in header["arrays"].items()
+        }
+        self._strings = {
+            c: StringColumn(self._mmap, self._arrays[f"str:{c}:offsets"],
+                            base + header["arrays"][f"str:{c}:data"][0])
+            for c in TEXT_COLUMNS
+        }
+        self.index_of = lru_cache(maxsize=4096)(self._index_of)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, name):
+        return self.index_of(name) is not None
+
+    def _index_of(self, name):
+        """Бинарный поиск по отсортированному порядку имён"""
+        if not isinstance(name, str):
+            return None
+        names, order = self._strings["name"], self._arrays["name_order"]
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if names[order[mid]] < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.size and names[order[lo]] == name:
+            return int(order[lo])
+        return None
+
+    def record(self, position):
+        position = int(position)
+        if not 0 <= position < self.size:
+            raise IndexError(position)
+        out = {}
+        for c in COLUMNS:
+            if c in NUMERIC_COLUMNS:
+                value = float(self._arrays[f"col:{c}"][position])
+                out[c] = int(value) if value.is_integer() else value
+            else:
+                out[c] = self._strings[c][position]
+        return out
+
+    def get(self, name):
+        """Блюдо по имени или None"""
+        i = self.index_of(name)
+        return None if i is None else self.record(i)
+
+    def records(self):
+        return [self.record(i) for i in range(self.size)]
+
+    def names(self):
+        return self._strings["name"]
+
+    def column(self, name):
+        """Числовая колонка как float64 массив (только чтение, без копии)"""
+        return self._arrays[f"col:{name}"]
+
+    def macro_matrix(self):
+        return self._arrays["macros"]
+
+    def price_index(self):
+        """(позиции по возрастанию цены, отсортированные цены)"""
+        return self._arrays["price_order"], self._arrays["price_sorted"]
+
+    def postings(self, kind, value):
+        start, stop = self._header["postings"].get(f"{kind}\t{value.lower()}", (0, 0))
+        return self._arrays["postings"][start:stop]
+
+    def by_category(self, category):
+        return self.postings("category", category)
+
+    def by_diet(self, diet):
+        return self.postings("diet", diet)
+
+    def by_tag(self, tag):
+        return self.postings("tags", tag)
+
+    def index_values(self, kind):
+        """Все значения индекса: категории, диеты или теги"""
+        prefix = f"{kind}\t"
+        return sorted(key[len(prefix):] for key in self._header["postings"] if key.startswith(prefix))
+
+    def retrieval_index(self):
+        from retrieval import RetrievalIndex
+        a = self._arrays
+        return RetrievalIndex(a["retrieval:feature_ids"], a["retrieval:offsets"], a["retrieval:doc_ids"],
+                              a["retrieval:weights"], a["retrieval:idf"], self._header["retrieval_size"])
+
+    def similarity_graph(self, k=8):
+        """Граф из файла поколения; для другого k строится заново (в памяти воркера)"""
+        from similarity import SimilarityGraph
+        a = self._arrays
+        if a["graph:neighbors"].shape[1] != k:
+            return SimilarityGraph.build(self.records(), k)
+        vocab = {t: j for j, t in enumerate(self._header["vocab"])}
+        return SimilarityGraph(a["graph:neighbors"], a["graph:weights"], a["graph:mean"],
+                               a["graph:std"], a["graph:macros"], a["graph:tokens"], vocab)
+
+
+def publish(directory, rows=None, source="builtin", k=8, keep=2, graph=None):
+    """Новое поколение каталога в directory и атомарная смена CURRENT; путь к файлу"""
+    rows = DISHES if rows is None else rows
+    os.makedirs(directory, exist_ok=True)
+    name = f"catalog-{time.time_ns()}.gen"
+    path = write_generation(os.path.join(directory, name), rows, source, k, graph)
+    pointer = os.path.join(directory, POINTER)
+    with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    generations = sorted(n for n in os.listdir(directory) if n.endswith(".gen"))
+    for old in generations[:-keep]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError:
+            pass
+    return path
+
+
+def add_dish(directory, dish, k=8, keep=2):
+    """Публикует поколение = текущее + блюдо dish (словарь по COLUMNS); путь к файлу.
+
+    Граф похожих блюд текущего поколения копируется и дополняется
+    SimilarityGraph.add: кураторские соседи из recommendations нового блюда
+    и блюда, которые ссылаются на него в своих recommendations, закрепляются
+    так же, как при полной сборке. Остальные индексы пересобираются.
+    """
+    from catalog import split_list
+
+    current = Generations(directory).get()
+    if not dish.get("name"):
+        raise ValueError("dish name is required")
+    if dish["name"] in current:
+        raise ValueError(f"dish already exists: {dish['name']}")
+    row = tuple(dish.get(c) for c in COLUMNS)
+    records = current.records()
+    positions = {d["name"]: i for i, d in enumerate(records)}
+    graph = current.similarity_graph(k)
+    graph.add(dict(zip(COLUMNS, row)),
+              curated=[positions[n] for n in split_list(dish.get("recommendations")) if n in positions],
+              referenced_by=[i for i, d in enumerate(records)
+                             if dish["name"] in split_list(d["recommendations"])])
+    rows = [tuple(d[c] for c in COLUMNS) for d in records] + [row]
+    return publish(directory, rows, current.source, k, keep, graph)
+
+
+class Generations:
+    """Текущее поколение каталога в directory; CURRENT сверяется не чаще раза в interval секунд"""
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self.current = None
+        self._stamp = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if self.current is not None and now - self._checked < self.interval:
+            return self.current
+        with self._lock:
+            self._checked = now
+            pointer = os.path.join(self.directory, POINTER)
+            st = os.stat(pointer)
+            stamp = (st.st_ino, st.st_mtime_ns)
+            if stamp != self._stamp:
+                with open(pointer, encoding="utf-8") as f:
+                    path = os.path.join(self.directory, f.read().strip())
+                if self.current is None or self.current.path != path:
+                    self.current = SharedCatalog(path)
+                self._stamp = stamp
+            return self.current
+
+
+_generations = {}
+
+
+def generation(directory, interval=1.0):
+    """Текущее поколение общего каталога (объект меняется только при смене CURRENT)"""
+    gens = _generations.get(directory)
+    if gens is None:
+        gens = _generations.setdefault(directory, Generations(directory, interval))
+    return gens.get()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python shared_catalog.py DIRECTORY [DISH.json]")
+    if len(sys.argv) > 2:
+        from config import Config
+        with open(sys.argv[2], encoding="utf-8") as f:
+            path = add_dish(sys.argv[1], json.load(f), Config.SIMILARITY_K)
+    else:
+        path = publish(sys.argv[1])
+    print(f"✅ Поколение каталога опубликовано: {path} ({len(SharedCatalog(path))} блюд)")
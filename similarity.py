@@ -0,0 +1,220 @@
+"""Граф похожих блюд для поля recommendations.
+
+Для каждого блюда хранится k соседей: сначала кураторские из колонки
+recommendations, затем ближайшие по сумме двух близостей - нормированных КБЖУ
+(z-score, 1 / (1 + расстояние)) и пересечения тегов/категории (Жаккар).
+Граф - две плотные матрицы M x k (позиции соседей и их близость), поэтому
+выдача соседей - O(k). Новое блюдо добавляется за O(M) без пересборки
+(shared_catalog.add_dish публикует с ним новое поколение каталога).
+
+    python similarity.py        # собрать граф для текущего catalog.db
+"""
+import os
+import numpy as np
+
+from catalog import split_list
+from scoring import MACRO_COLUMNS
+
+# Кураторские соседи закреплены: их близость +inf, kNN их не вытесняет
+PINNED = np.inf
+MACRO_WEIGHT = 0.5
+# Версия формата .graph.npz и параметров сборки: граф другой версии пересобирается.
+# Поднять FORMAT при правке близостей или dish_tokens
+FORMAT = 1
+VERSION = f"{FORMAT}:{MACRO_WEIGHT}"
+
+
+def dish_tokens(dish):
+    return {t.lower() for t in split_list(dish["tags"])} | {f"cat:{dish['category']}"}
+
+
+class SimilarityGraph:
+    def __init__(self, neighbors, weights, mean, std, macros, tokens, vocab):
+        self.neighbors = neighbors    # M x k int32, -1 - пусто
+        self.weights = weights        # M x k float32, по убыванию
+        self.mean = mean
+        self.std = std
+        self.macros = macros          # M x 4, уже нормированные
+        self.tokens = tokens          # M x T bool
+        self.vocab = vocab            # токен -> колонка в tokens
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    def __len__(self):
+        return self.neighbors.shape[0]
+
+    # --- сборка ---
+
+    @staticmethod
+    def _similarity(macros_a, tokens_a, macros_b, tokens_b):
+        """Матрица близости A x B"""
+        sq = (macros_a ** 2).sum(axis=1)[:, None] + (macros_b ** 2).sum(axis=1)[None, :]
+        dist = np.sqrt(np.maximum(sq - 2.0 * macros_a @ macros_b.T, 0.0))
+        ta, tb = tokens_a.astype(np.float32), tokens_b.astype(np.float32)
+        inter = ta @ tb.T
+        union = ta.sum(axis=1)[:, None] + tb.sum(axis=1)[None, :] - inter
+        jaccard = np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+        return MACRO_WEIGHT / (1.0 + dist) + (1.0 - MACRO_WEIGHT) * jaccard
+
+    @classmethod
+    def build(cls, dishes, k=8, block_cells=4_000_000, scale=None):
+        """dishes - список словарей в порядке каталога (как Catalog.records()).
+        Близости считаются блоками строк, чтобы не держать в памяти M x M.
+        scale - готовые (mean, std) для нормировки КБЖУ, иначе считаются по dishes"""
+        size = len(dishes)
+        block = max(1, block_cells // max(1, size))
+        raw = np.array([[float(d[c]) for c in MACRO_COLUMNS] for d in dishes]).reshape(size, -1)
+        if scale is None:
+            mean, std = raw.mean(axis=0), raw.std(axis=0)
+            std[std == 0] = 1.0
+        else:
+            mean, std = scale
+        macros = (raw - mean) / std
+
+        token_sets = [dish_tokens(d) for d in dishes]
+        vocab = {t: j for j, t in enumerate(sorted(set().union(*token_sets)))}
+        tokens = np.zeros((size, len(vocab)), dtype=bool)
+        for i, ts in enumerate(token_sets):
+            tokens[i, [vocab[t] for t in ts]] = True
+
+        neighbors = np.full((size, k), -1, dtype=np.int32)
+        weights = np.full((size, k), -np.inf, dtype=np.float32)
+        for start in range(0, size, block):
+            rows = np.arange(start, min(start + block, size))
+            sim = cls._similarity(macros[rows], tokens[rows], macros, tokens)
+            sim[np.arange(rows.shape[0]), rows] = -np.inf
+            take = min(k, size - 1)
+            if take <= 0:
+                continue
+            part = np.argpartition(-sim, take - 1, axis=1)[:, :take]
+            part_sim = np.take_along_axis(sim, part, axis=1)
+            order = np.argsort(-part_sim, axis=1, kind="stable")
+            neighbors[rows, :take] = np.take_along_axis(part, order, axis=1)
+            weights[rows, :take] = np.take_along_axis(part_sim, order, axis=1)
+
+        graph = cls(neighbors, weights, mean, std, macros, tokens, vocab)
+        positions = {d["name"]: i for i, d in enumerate(dishes)}
+        for i, d in enumerate(dishes):
+            curated = [positions[n] for n in split_list(d.get("recommendations")) if n in positions]
+            graph._pin(i, curated)
+        return graph
+
+    def _pin(self, row, curated):
+        """Кураторские соседи - в начало списка, остальное добивается kNN"""
+        curated = [c for c in dict.fromkeys(curated) if c != row][:self.k]
+        if not curated:
+            return
+        rest = [(n, w) for n, w in zip(self.neighbors[row], self.weights[row])
+                if n >= 0 and n not in curated]
+        merged = [(c, PINNED) for c in curated] + rest
+        merged += [(-1, -np.inf)] * (self.k - len(merged))
+        self.neighbors[row] = [n for n, _ in merged[:self.k]]
+        self.weights[row] = [w for _, w in merged[:self.k]]
+
+    # --- выдача ---
+
+    def companions(self, position, n=None):
+        """Позиции соседей блюда, лучшие первыми"""
+        row = self.neighbors[position][:n or self.k]
+        return row[row >= 0].tolist()
+
+    # --- инкрементальное добавление ---
+
+    def add(self, dish, curated=(), referenced_by=()):
+        """Добавляет блюдо без пересборки: O(M) близостей к новому блюду.
+
+        Новое блюдо получает своих k соседей, а у существующих блюд оно
+        вытесняет самого слабого kNN-соседа, если оказалось ближе.
+        curated - позиции кураторских соседей нового блюда, referenced_by -
+        блюда, у которых новое блюдо указано в recommendations. Возвращает позицию.
+        Нормировка КБЖУ остаётся прежней. Массивы графа не меняются на месте,
+        а заменяются копиями: граф из файла поколения (mmap) доступен только для чтения.
+        """
+        position = len(self)
+        macro = (np.array([float(dish[c]) for c in MACRO_COLUMNS]) - self.mean) / self.std
+        vocab = dict(self.vocab)
+        for t in sorted(dish_tokens(dish)):
+            vocab.setdefault(t, len(vocab))
+        old_tokens = np.pad(self.tokens, ((0, 0), (0, len(vocab) - len(self.vocab))))
+        tokens = np.zeros((1, len(vocab)), dtype=bool)
+        tokens[0, [vocab[t] for t in dish_tokens(dish)]] = True
+
+        sim = self._similarity(macro[None, :], tokens, self.macros, old_tokens)[0]
+        neighbors = np.vstack([self.neighbors, np.full((1, self.k), -1, dtype=np.int32)])
+        weights = np.vstack([self.weights, np.full((1, self.k), -np.inf, dtype=np.float32)])
+
+        # существующие блюда: заменить худшего соседа, если новое ближе
+        worst = np.argmin(weights[:position], axis=1)
+        worst_w = weights[np.arange(position), worst]
+        rows = np.flatnonzero(sim > worst_w)
+        neighbors[rows, worst[rows]] = position
+        weights[rows, worst[rows]] = sim[rows]
+        order = np.argsort(-weights[rows], axis=1, kind="stable")
+        neighbors[rows] = np.take_along_axis(neighbors[rows], order, axis=1)
+        weights[rows] = np.take_along_axis(weights[rows], order, axis=1)
+
+        # соседи нового блюда
+        take = min(self.k, position)
+        if take:
+            top = np.argsort(-sim, kind="stable")[:take]
+            neighbors[position, :take], weights[position, :take] = top, sim[top]
+
+        self.neighbors, self.weights, self.vocab = neighbors, weights, vocab
+        self.macros = np.vstack([self.macros, macro])
+        self.tokens = np.vstack([old_tokens, tokens])
+        self._pin(position, list(curated))
+        for row in referenced_by:
+            pinned = [n for n, w in zip(self.neighbors[row], self.weights[row]) if w == PINNED]
+            self._pin(row, pinned + [position])
+        return position
+
+    # --- хранение ---
+
+    def save(self, path, fingerprint=""):
+        vocab = np.array(sorted(self.vocab, key=self.vocab.get), dtype=str)
+        np.savez(path, neighbors=self.neighbors, weights=self.weights, mean=self.mean,
+                 std=self.std, macros=self.macros, tokens=self.tokens, vocab=vocab,
+                 fingerprint=fingerprint, version=VERSION)
+
+    @classmethod
+    def load(cls, path, fingerprint=""):
+        """Граф из .npz или None, если файла нет или он собран для другого каталога
+        либо другой версией (VERSION)"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if "version" not in data.files or str(data["version"]) != VERSION:
+                return None
+            if str(data["fingerprint"]) != fingerprint:
+                return None
+            vocab = {str(t): j for j, t in enumerate(data["vocab"])}
+            return cls(data["neighbors"], data["weights"], data["mean"], data["std"],
+                       data["macros"], data["tokens"], vocab)
+
+
+def graph_path(catalog):
+    return f"{catalog.path}.graph.npz"
+
+
+def load_or_build(catalog, k=8):
+    """Граф для каталога: из файла рядом с catalog.db, иначе собирается и сохраняется"""
+    graph = SimilarityGraph.load(graph_path(catalog), catalog.fingerprint)
+    if graph is None or graph.k != k:
+        graph = SimilarityGraph.build(catalog.records(), k)
+        try:
+            graph.save(graph_path(catalog), catalog.fingerprint)
+        except OSError:
+            pass
+    return graph
+
+
+if __name__ == "__main__":
+    from catalog import load_catalog
+    from config import Config
+
+    catalog = load_catalog()
+    graph = SimilarityGraph.build(catalog.records(), Config.SIMILARITY_K)
+    graph.save(graph_path(catalog), catalog.fingerprint)
+    print(f"✅ Граф похожих блюд: {graph_path(catalog)} ({len(graph)} блюд, k={graph.k})")
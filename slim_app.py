@@ -0,0 +1,101 @@
+"""Лёгкая точка входа /recommend для serverless (Vercel).
+
+Ответ собирает тот же конвейер, что у app.py и api/index.py (pipeline/): лимит
+запросов, бюджет запроса и очередь к DeepSeek, кеш LLM, события и X-Trace.
+Отличается только источник каталога: готовый снимок catalog.snapshot
+(CATALOG_SOURCE=snapshot, см. snapshot.py) вместо catalog.db, поискового индекса
+и графа похожих блюд, которые свежий инстанс собирал бы на старте. И без Flask:
+здесь голый WSGI, pandas не импортируется вовсе, а части recommender (индексы,
+клиент DeepSeek, кеш LLM) создаются при первом обращении.
+
+Остальные маршруты - в app.py.
+
+    python snapshot.py            # после правки data.DISHES: пересобрать catalog.snapshot
+    python slim_app.py            # локально на http://127.0.0.1:5001
+"""
+import os
+
+# до импорта config: каталог recommender берёт из снимка
+os.environ.setdefault("CATALOG_SOURCE", "snapshot")
+
+import json
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+from config import Config
+from pipeline import recommend_pipeline
+from rules import query_payload
+from serialization import etag, not_modified
+from admission import client_id
+from instrumentation import log, timed, trace_request, trace_enabled, server_timing
+
+CORS_HEADERS = [("Access-Control-Allow-Origin", "*")]
+PREFLIGHT_HEADERS = [("Access-Control-Allow-Methods", "GET, POST, OPTIONS"),
+                     ("Access-Control-Allow-Headers", "Content-Type, X-Trace, If-None-Match")]
+
+
+def status_line(code):
+    return f"{code} {HTTPStatus(code).phrase}"
+
+
+def respond(start_response, code, body, headers=()):
+    start_response(status_line(code), [("Content-Type", "application/json"),
+                                       ("Content-Length", str(len(body))), *CORS_HEADERS, *headers])
+    return [body]
+
+
+def read_payload(environ):
+    """Параметры GET или JSON-тело POST; None, если тело не разобралось"""
+    if environ["REQUEST_METHOD"] == "GET":
+        return query_payload(parse_qsl(environ.get("QUERY_STRING", "")))
+    try:
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        return json.loads(environ["wsgi.input"].read(length) or b"null")
+    except ValueError:
+        return None
+
+
+def app(environ, start_response):
+    """WSGI-приложение: только /recommend"""
+    if environ.get("PATH_INFO") != "/recommend":
+        return respond(start_response, 404, b'{"error": "not found"}')
+    method = environ["REQUEST_METHOD"]
+    if method == "OPTIONS":
+        return respond(start_response, 200, b'{"status": "ok"}', PREFLIGHT_HEADERS)
+    if method not in ("GET", "POST"):
+        return respond(start_response, 405, b'{"error": "method not allowed"}',
+                       [("Allow", "GET, POST, OPTIONS")])
+
+    # X-Trace: 1 - длительности этапов вернутся в заголовке Server-Timing
+    with trace_request(trace_enabled(environ.get("HTTP_X_TRACE"))) as spans:
+        with timed("request"):
+            ctx = recommend_pipeline.run(read_payload(environ), client_id(
+                environ.get("REMOTE_ADDR"), environ.get("HTTP_X_FORWARDED_FOR"),
+                Config.RATE_LIMIT_TRUST_FORWARDED))
+
+        headers = list(ctx.headers.items())
+        expose = []
+        if ctx.status == 200:
+            tag = etag(ctx.body)
+            headers.append(("ETag", f'"{tag}"'))
+            expose.append("ETag")
+        if spans is not None:
+            headers.append(("Server-Timing", server_timing(spans)))
+            expose.append("Server-Timing")
+            log("trace", path="/recommend", stages={s: round(d * 1000, 3) for s, d in spans})
+        if expose:
+            headers.append(("Access-Control-Expose-Headers", ", ".join(expose)))
+
+    # GET с If-None-Match на тот же ответ - 304 без тела
+    if ctx.status == 200 and method == "GET":
+        headers.append(("Cache-Control", "no-cache"))
+        if not_modified(environ.get("HTTP_IF_NONE_MATCH"), tag):
+            start_response(status_line(304), [*CORS_HEADERS, *headers])
+            return [b""]
+    return respond(start_response, ctx.status, ctx.body, headers)
+
+
+if __name__ == "__main__":
+    from wsgiref.simple_server import make_server
+
+    make_server("127.0.0.1", 5001, app).serve_forever()
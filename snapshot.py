@@ -0,0 +1,226 @@
+"""Снимок каталога для холодного старта лёгкой точки входа (slim_app.py).
+
+В один pickle складывается всё, что app.py строит при старте: строки блюд
+встроенного каталога (data.DISHES), числовые колонки и индексы фильтров
+готовыми бинарными массивами, поисковый индекс и соседей из графа похожих блюд.
+Загрузка снимка - один pickle.load без SQLite и без сборки индексов: массивы
+превращаются в numpy через np.frombuffer, без копий, а соседи для
+recommendations читаются через array из стандартной библиотеки.
+recommender.use_catalog принимает SnapshotCatalog так же, как catalog.Catalog
+(CATALOG_SOURCE=snapshot, так работает slim_app.py).
+
+catalog.snapshot лежит в репозитории и уезжает на Vercel вместе с кодом
+(includeFiles в vercel.json): шага сборки у @vercel/python нет. Снимок
+встроенного каталога с отпечатком, отличным от fingerprint(DISHES), не
+используется, а собирается заново - как устаревший catalog.db (catalog._is_stale).
+После изменения DISHES снимок нужно пересобрать и закоммитить (за этим следит
+tests/test_snapshot.py):
+
+    python snapshot.py [путь]     # по умолчанию catalog.snapshot рядом с кодом
+"""
+import os, sys, array, pickle, tempfile, threading
+
+from data import COLUMNS, DISHES, fingerprint
+
+SNAPSHOT_PATH = os.getenv(
+    "CATALOG_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.snapshot"),
+)
+VERSION = 1
+
+
+def _pack(values):
+    return {"dtype": values.dtype.str, "data": values.tobytes()}
+
+
+def build_snapshot(path=None, rows=None, source="builtin"):
+    """Собирает снимок из rows (по умолчанию DISHES); запись атомарная (tmp + os.replace)"""
+    import numpy as np
+    from catalog import NUMERIC_COLUMNS, build_postings
+    from retrieval import RetrievalIndex, dish_document
+    from similarity import SimilarityGraph
+    from config import Config
+
+    path = path or SNAPSHOT_PATH
+    rows = [tuple(r) for r in (DISHES if rows is None else rows)]
+    records = [dict(zip(COLUMNS, r)) for r in rows]
+    index = RetrievalIndex.build([dish_document(d) for d in records])
+    graph = SimilarityGraph.build(records, Config.SIMILARITY_K)
+    snapshot = {
+        "version": VERSION,
+        "fingerprint": fingerprint(rows),
+        "source": source,
+        "columns": COLUMNS,
+        "rows": rows,
+        "numeric": {c: np.array([r[c] for r in records], dtype=np.float64).tobytes()
+                    for c in NUMERIC_COLUMNS},
+        "postings": {key: np.array(pos, dtype=np.int32).tobytes()
+                     for key, pos in build_postings(rows).items()},
+        "retrieval": {"size": index.size, **{name: _pack(getattr(index, name)) for name in
+                      ("feature_ids", "offsets", "doc_ids", "weights", "idf")}},
+        "neighbors": graph.neighbors.astype(np.int32).tobytes(),
+        "k": graph.k,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+class SnapshotNeighbors:
+    """Соседи из графа похожих блюд снимка: companions() как у similarity.SimilarityGraph"""
+
+    def __init__(self, blob, k):
+        self._neighbors = array.array("i")
+        self._neighbors.frombytes(blob)
+        self.k = k
+
+    def __len__(self):
+        return len(self._neighbors) // self.k
+
+    def companions(self, position, n=None):
+        """Позиции соседей блюда, лучшие первыми"""
+        start = position * self.k
+        return [i for i in self._neighbors[start:start + (n or self.k)] if i >= 0]
+
+
+class SnapshotCatalog:
+    """Каталог из снимка с тем же интерфейсом, что у catalog.Catalog (только чтение)"""
+
+    def __init__(self, data, path=None):
+        self.path = path
+        self.source = data.get("source", "builtin")
+        self.fingerprint = data["fingerprint"]
+        self.columns = data["columns"]
+        self.rows = data["rows"]
+        self.size = len(self.rows)
+        self._data = data
+        self._names = [r[0] for r in self.rows]
+        self._positions = {name: i for i, name in enumerate(self._names)}
+        self._numeric = {}
+        self._retrieval = None
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def index_of(self, name):
+        return self._positions.get(name)
+
+    def record(self, position):
+        return dict(zip(self.columns, self.rows[int(position)]))
+
+    def get(self, name):
+        """Блюдо по имени или None"""
+        i = self.index_of(name)
+        return None if i is None else self.record(i)
+
+    def records(self):
+        return [dict(zip(self.columns, r)) for r in self.rows]
+
+    def names(self):
+        return self._names
+
+    def similarity_graph(self, k=8):
+        """Граф похожих блюд: соседи из снимка, для другого k - собирается заново"""
+        if k == self._data["k"]:
+            return SnapshotNeighbors(self._data["neighbors"], k)
+        from similarity import SimilarityGraph
+        return SimilarityGraph.build(self.records(), k)
+
+    # --- numpy-части: импортируются при первом обращении ---
+
+    def column(self, name):
+        """Числовая колонка как float64 массив (только чтение)"""
+        values = self._numeric.get(name)
+        if values is None:
+            import numpy as np
+            values = self._numeric[name] = np.frombuffer(self._data["numeric"][name],
+                                                         dtype=np.float64)
+        return values
+
+    def macro_matrix(self):
+        import numpy as np
+        from scoring import MACRO_COLUMNS
+        return np.column_stack([self.column(c) for c in MACRO_COLUMNS])
+
+    def postings(self, kind, value):
+        import numpy as np
+        blob = self._data["postings"].get((kind, value.lower()))
+        return np.frombuffer(blob or b"", dtype=np.int32)
+
+    def price_index(self):
+        """(позиции по возрастанию цены, отсортированные цены)"""
+        import numpy as np
+        price = self.column("price")
+        order = np.argsort(price, kind="stable")
+        return order, price[order]
+
+    def index_values(self, kind):
+        """Все значения индекса: категории, диеты или теги"""
+        return sorted(value for k, value in self._data["postings"] if k == kind)
+
+    def retrieval_index(self):
+        """Поисковый индекс (retrieval.RetrievalIndex) из массивов снимка"""
+        if self._retrieval is None:
+            import numpy as np
+            from retrieval import RetrievalIndex
+            data = self._data["retrieval"]
+            arrays = {name: np.frombuffer(data[name]["data"], dtype=data[name]["dtype"])
+                      for name in ("feature_ids", "offsets", "doc_ids", "weights", "idf")}
+            self._retrieval = RetrievalIndex(size=data["size"], **arrays)
+        return self._retrieval
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def _read(path):
+    """Данные снимка или None, если файла нет, он старого формата или собран из прежнего DISHES"""
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if data.get("version") != VERSION:
+        return None
+    if data.get("source", "builtin") == "builtin" and data.get("fingerprint") != fingerprint(DISHES):
+        return None
+    return data
+
+
+def load_snapshot(path=None):
+    """Каталог из снимка; если снимка нет, он старого формата или устарел - собирается на месте"""
+    global _snapshot
+    if path is None and _snapshot is not None:
+        return _snapshot
+    with _snapshot_lock:
+        if path is None and _snapshot is not None:
+            return _snapshot
+        target = path or SNAPSHOT_PATH
+        data = _read(target)
+        if data is None:
+            if os.path.exists(target):
+                import logging
+                from instrumentation import log
+                log("snapshot_stale", logging.WARNING, path=target)
+            try:
+                build_snapshot(target)
+            except OSError:
+                # read-only FS (serverless): собираем во временный каталог
+                target = os.path.join(tempfile.gettempdir(), "catalog.snapshot")
+                build_snapshot(target)
+            data = _read(target)
+        catalog = SnapshotCatalog(data, target)
+        if path is None:
+            _snapshot = catalog
+        return catalog
+
+
+if __name__ == "__main__":
+    out = build_snapshot(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"✅ Снимок каталога собран: {out} ({len(load_snapshot(out))} блюд)")
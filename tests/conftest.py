@@ -0,0 +1,24 @@
+"""Общие фикстуры тестов: корень репозитория в sys.path и заглушка DeepSeek"""
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.deepseek_stub import start_stub  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    """Фабрика заглушек DeepSeek: stub(**настройки start_stub) -> (server, base_url)"""
+    servers = []
+
+    def start(**kwargs):
+        server, url = start_stub(**kwargs)
+        servers.append(server)
+        return server, url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
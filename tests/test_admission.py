@@ -0,0 +1,105 @@
+"""admission.py: token bucket, очередь к LLM (синхронная и asyncio), бюджет запроса"""
+import time, asyncio, threading
+from types import SimpleNamespace
+
+import pytest
+
+import admission
+from admission import RateLimiter, ConcurrencyGate, AsyncConcurrencyGate, Deadline, client_id
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_rate_limiter_burst_and_refill(clock):
+    limiter = RateLimiter(rate=2, burst=3)
+    assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("a") == pytest.approx(0.5)
+    # другой клиент - своё ведро
+    assert limiter.acquire("b") == 0.0
+    clock[0] += 0.5
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("a") > 0
+    # ведро не копит больше burst
+    clock[0] += 60
+    assert [limiter.acquire("a") for _ in range(4)][-1] > 0
+
+
+def test_rate_limiter_off_and_forgets_old_clients(clock):
+    assert RateLimiter(0, 1).acquire("a") == 0.0
+    limiter = RateLimiter(rate=1, burst=1, max_clients=2)
+    for c in ("a", "b", "c"):
+        limiter.acquire(c)
+    assert list(limiter._buckets) == ["b", "c"]
+    # забытый клиент возвращается с полным ведром
+    assert limiter.acquire("a") == 0.0
+
+
+def test_gate_limit_and_release():
+    gate = ConcurrencyGate(1, max_queue=0)
+    assert gate.acquire(0) is True
+    assert gate.acquire(1.0) is False  # очередь на 0 мест - сразу отказ
+    gate.release()
+    assert gate.acquire(0) is True and gate.active == 1
+
+
+def test_gate_queue_full_and_timeout():
+    gate = ConcurrencyGate(1, max_queue=1)
+    assert gate.acquire(0)
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(gate.acquire(0.5)))
+    waiter.start()
+    while gate.waiting == 0:
+        time.sleep(0.001)
+    # единственное место в очереди занято
+    started = time.monotonic()
+    assert gate.acquire(0.5) is False and time.monotonic() - started < 0.1
+    waiter.join()
+    assert results == [False] and gate.waiting == 0 and gate.active == 1
+
+
+def test_gate_waiter_gets_released_slot():
+    gate = ConcurrencyGate(1, max_queue=1)
+    assert gate.acquire(0)
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(gate.acquire(5.0)))
+    waiter.start()
+    while gate.waiting == 0:
+        time.sleep(0.001)
+    gate.release()
+    waiter.join()
+    assert results == [True] and gate.active == 1
+
+
+def test_async_gate():
+    async def scenario():
+        gate = AsyncConcurrencyGate(1, max_queue=1)
+        assert await gate.acquire(0)
+        waiter = asyncio.ensure_future(gate.acquire(5.0))
+        await asyncio.sleep(0)
+        assert gate.waiting == 1
+        # очередь полна
+        assert await gate.acquire(5.0) is False
+        gate.release()
+        assert await waiter is True and gate.active == 1 and gate.waiting == 0
+        # место не освободилось за timeout
+        started = time.monotonic()
+        assert await gate.acquire(0.05) is False
+        assert 0.04 < time.monotonic() - started < 1.0 and gate.waiting == 0
+        gate.release()
+        assert gate.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_deadline_and_client_id():
+    deadline = Deadline(10)
+    assert 9 < deadline.remaining() <= 10
+    assert Deadline(-1).remaining() < 0
+    assert client_id("1.2.3.4", "5.6.7.8, 9.9.9.9") == "1.2.3.4"
+    assert client_id("1.2.3.4", "5.6.7.8, 9.9.9.9", trust_forwarded=True) == "5.6.7.8"
+    assert client_id(None) == "unknown"
@@ -0,0 +1,93 @@
+"""asgi.py: бюджет запроса и очередь к DeepSeek в асинхронном /recommend"""
+import json, time, asyncio
+
+import pytest
+
+import asgi
+import recommender
+from admission import AsyncConcurrencyGate
+from config import Config
+from deepseek_client import AsyncDeepSeekClient
+from llm_cache import MemoryCache
+
+
+def call(path, method, body=b""):
+    """Один запрос через asgi.app: (статус, тело в байтах)"""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        scope = {"type": "http", "path": path, "method": method, "headers": [],
+                 "client": ("127.0.0.1", 1)}
+        try:
+            await asgi.app(scope, receive, send)
+        finally:
+            await asgi.client.aclose()
+
+    asyncio.run(run())
+    return sent[0]["status"], sent[1]["body"]
+
+
+def post(body):
+    """Один POST /recommend через asgi.app: (статус, тело)"""
+    status, data = call("/recommend", "POST", json.dumps(body).encode())
+    return status, json.loads(data)
+
+
+@pytest.fixture
+def slow_llm(stub, monkeypatch):
+    server, url = stub(latency=2.0)
+    monkeypatch.setattr(recommender, "api_key", "stub")
+    monkeypatch.setattr(recommender, "llm_cache", MemoryCache(16, 60))
+    monkeypatch.setattr(asgi, "client", AsyncDeepSeekClient("stub", base_url=url, retries=2))
+    monkeypatch.setattr(Config, "REQUEST_DEADLINE", 0.3)
+    return server
+
+
+def test_deadline_bounds_llm_wait(slow_llm):
+    started = time.monotonic()
+    status, body = post({"query": "что-нибудь на ужин"})
+    assert time.monotonic() - started < 1.0
+    assert status == 200 and body["dish"]["name"]
+    assert slow_llm.requests == 1
+
+
+def test_full_llm_queue_goes_local(slow_llm, monkeypatch):
+    monkeypatch.setattr(recommender, "allm_gate", AsyncConcurrencyGate(0, 0))
+    status, body = post({"query": "что-нибудь на ужин"})
+    assert status == 200 and body["dish"]["name"]
+    assert slow_llm.requests == 0
+
+
+def test_async_client_deadline(stub):
+    server, url = stub(latency=1.0)
+
+    async def run():
+        client = AsyncDeepSeekClient("stub", base_url=url, retries=2)
+        try:
+            started = time.monotonic()
+            assert await client.chat("- Сырники", deadline=started + 0.3) is None
+            return time.monotonic() - started, client.breaker.failures
+        finally:
+            await client.aclose()
+
+    elapsed, failures = asyncio.run(run())
+    assert elapsed < 0.6
+    # 0.3 с без ответа при пустой статистике задержек - медленный вызов
+    assert failures == 1
+    assert server.requests == 1
+
+
+def test_refreshes_catalog(monkeypatch):
+    refreshed = []
+    monkeypatch.setattr(recommender, "api_key", None)
+    monkeypatch.setattr(asgi, "refresh_catalog", lambda: refreshed.append(1))
+    assert post({"query": "суп"})[0] == 200
+    assert call("/metrics", "GET")[0] == 200
+    # опубликованное поколение каталога подхватывают и /recommend, и /metrics
+    assert len(refreshed) == 2
@@ -0,0 +1,65 @@
+"""/recommend/batch: разбор тела, лимит запросов и очередь к DeepSeek"""
+import pytest
+
+from batch import parse_batch_payload
+
+
+@pytest.mark.parametrize("payload", [None, [1], "queries", 42])
+def test_payload_must_be_object(payload):
+    with pytest.raises(ValueError, match="invalid json"):
+        parse_batch_payload(payload)
+
+
+def test_endpoint_rejects_non_object_with_json_400():
+    from app import app
+    client = app.test_client()
+    for body in (b"[1]", b"not json"):
+        response = client.post("/recommend/batch", data=body, content_type="application/json")
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "invalid json"}
+
+
+def test_endpoint_is_rate_limited(monkeypatch):
+    from app import app
+    from admission import RateLimiter
+    monkeypatch.setattr("pipeline.stages.limiter", RateLimiter(0.1, 1))
+    client = app.test_client()
+    body = {"queries": ["суп"]}
+    assert client.post("/recommend/batch", json=body).status_code == 200
+    response = client.post("/recommend/batch", json=body)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"]
+
+
+def test_chunk_waits_for_llm_gate(monkeypatch):
+    import batch, recommender
+    from types import SimpleNamespace
+    from admission import ConcurrencyGate, Deadline
+    calls = []
+    monkeypatch.setattr(recommender, "llm_gate", ConcurrencyGate(0, 0))
+    monkeypatch.setattr(recommender, "deepseek", SimpleNamespace(chat=lambda *args, **kwargs: calls.append(args)))
+    picked = batch.ask_chunk([(0, "суп")], "- Борщ", Deadline(5.0))
+    # места в очереди к DeepSeek нет - локальная логика, провайдер не вызывался
+    assert calls == [] and picked[0][2]["choice"]
+
+
+def test_parses_queries_and_k():
+    assert parse_batch_payload({"queries": ["суп", "салат"], "k": 2}) == (["суп", "салат"], 2)
+
+
+def test_endpoint_uses_batch_deadline(monkeypatch):
+    import app as app_module
+    from config import Config
+    seen = []
+
+    def fake_batch(queries, k, deadline):
+        seen.append(deadline.remaining())
+        return iter([])
+
+    monkeypatch.setattr(Config, "REQUEST_DEADLINE", 0.1)
+    monkeypatch.setattr(Config, "BATCH_DEADLINE", 30.0)
+    monkeypatch.setattr(app_module, "recommend_batch", fake_batch)
+    response = app_module.app.test_client().post("/recommend/batch", json={"queries": ["суп"]})
+    assert response.status_code == 200 and response.data == b""
+    # вся пачка живёт в BATCH_DEADLINE, а не в бюджете одиночного /recommend
+    assert seen and seen[0] > 1.0
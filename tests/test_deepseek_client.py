@@ -0,0 +1,179 @@
+"""DeepSeekClient против локальной заглушки (benchmarks/deepseek_stub.py)"""
+import time, random
+
+import pytest
+
+from deepseek_client import DeepSeekClient, CircuitBreaker, backoff_delay
+
+
+def make(url, **kwargs):
+    kwargs.setdefault("backoff", 0.01)
+    kwargs.setdefault("read_timeout", 5.0)
+    return DeepSeekClient("stub", base_url=url, **kwargs)
+
+
+def content(result):
+    return result["choices"][0]["message"]["content"]
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retries_transient_statuses(stub, status):
+    server, url = stub(fail_first=2, fail_status=status)
+    client = make(url, retries=2)
+    assert client.chat("- Сырники") is not None
+    assert server.requests == 3
+    assert client.breaker.state == "closed"
+
+
+def test_gives_up_after_retries(stub):
+    server, url = stub(fail_first=10)
+    client = make(url, retries=2)
+    assert client.chat("- Сырники") is None
+    assert server.requests == 3
+    assert client.breaker.failures == 1
+
+
+def test_client_error_is_not_retried(stub):
+    server, url = stub(fail_first=10, fail_status=400)
+    client = make(url, retries=2)
+    assert client.chat("- Сырники") is None
+    assert server.requests == 1
+
+
+def test_backoff_delay_bounds():
+    random.seed(0)
+    for attempt in range(8):
+        limit = min(4.0, 0.25 * 2 ** attempt)
+        delays = [backoff_delay(attempt) for _ in range(500)]
+        assert all(0 <= d <= limit for d in delays)
+        # полный джиттер: задержки разбросаны по всему интервалу, а не прижаты к границе
+        assert min(delays) < limit * 0.1 and max(delays) > limit * 0.9
+
+
+def test_breaker_open_half_open_closed(stub):
+    server, url = stub(fail_first=2)
+    client = make(url, retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+
+    assert client.chat("- Сырники") is None
+    assert client.breaker.state == "closed"
+    assert client.chat("- Сырники") is None
+    assert client.breaker.state == "open"
+
+    # пока open - к провайдеру не ходим
+    assert client.chat("- Сырники") is None
+    assert server.requests == 2
+
+    time.sleep(0.25)
+    assert client.breaker.state == "half_open"
+    assert client.chat("- Сырники") is not None
+    assert server.requests == 3
+    assert client.breaker.state == "closed"
+
+
+def test_failed_probe_reopens_breaker(stub):
+    server, url = stub(fail_first=10)
+    client = make(url, retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.2))
+    client.chat("- Сырники")
+    time.sleep(0.25)
+    assert client.breaker.state == "half_open"
+    assert client.chat("- Сырники") is None
+    assert client.breaker.state == "open"
+    assert server.requests == 2
+
+
+def test_hedges_slow_request(stub):
+    server, url = stub(latency=0.3)
+    client = make(url, hedge=True, hedge_delay=0.05)
+    assert '"Сырники"' in content(client.chat("- Сырники"))
+    assert server.requests == 2
+
+
+def test_fast_request_is_not_hedged(stub):
+    server, url = stub(latency=0.0)
+    client = make(url, hedge=True, hedge_delay=0.5)
+    assert client.chat("- Сырники") is not None
+    assert server.requests == 1
+
+
+def test_hedge_survives_failed_first_request(stub):
+    server, url = stub(latency=0.2, fail_first=1)
+    client = make(url, retries=0, hedge=True, hedge_delay=0.05)
+    assert client.chat("- Сырники") is not None
+    assert server.requests == 2
+
+
+def test_deadline_truncates_wait(stub):
+    server, url = stub(latency=1.0)
+    client = make(url, retries=2)
+    started = time.monotonic()
+    assert client.chat("- Сырники", deadline=started + 0.2) is None
+    assert time.monotonic() - started < 0.6
+    # на повторы бюджета не осталось
+    assert server.requests == 1
+    # 0.2 с без ответа, а замеров p95 ещё нет - медленный вызов, ошибка провайдера
+    assert client.breaker.failures == 1
+
+
+def test_slow_provider_trips_breaker(stub):
+    # провайдер всегда медленнее бюджета: breaker открывается и перестаёт занимать очередь
+    server, url = stub(latency=1.0)
+    client = make(url, retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30))
+    for _ in range(4):
+        assert client.chat("- Сырники", deadline=time.monotonic() + 0.3) is None
+    assert client.breaker.state == "open"
+    assert server.requests == 2
+
+
+def test_short_budget_is_not_a_failure(stub):
+    # у попытки было 0.05 с - провайдер не успел бы и здоровым
+    server, url = stub(latency=0.5)
+    client = make(url, retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+    for _ in range(3):
+        assert client.chat("- Сырники", deadline=time.monotonic() + 0.05) is None
+    assert client.breaker.state == "closed" and client.breaker.failures == 0
+    assert client.chat("- Сырники", deadline=time.monotonic() + 2.0) is not None
+
+
+def test_budget_below_p95_is_not_a_failure(stub):
+    server, url = stub(latency=1.0)
+    client = make(url, retries=0)
+    for _ in range(client.latency.min_samples):
+        client.latency.add(1.0)
+    assert client.chat("- Сырники", deadline=time.monotonic() + 0.3) is None
+    assert client.breaker.failures == 0
+
+
+def test_untrimmed_timeout_is_a_failure(stub):
+    # сработал собственный read_timeout клиента, а не дедлайн запроса
+    server, url = stub(latency=0.5)
+    client = make(url, retries=0, read_timeout=0.1)
+    assert client.chat("- Сырники", deadline=time.monotonic() + 5.0) is None
+    assert client.breaker.failures == 1
+
+
+def test_retry_cut_by_deadline_is_not_a_failure(stub):
+    server, url = stub(fail_first=10)
+    client = make(url, retries=2, backoff=1.0)
+    random.seed(0)  # задержка перед повтором - из [0, 1) с, не 0
+    assert client.chat("- Сырники", deadline=time.monotonic() + 0.01) is None
+    assert server.requests == 1
+    assert client.breaker.failures == 0
+
+
+def test_deadline_on_probe_keeps_half_open(stub):
+    server, url = stub(fail_first=1, latency=0.3)
+    client = make(url, retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.1))
+    client.chat("- Сырники")
+    time.sleep(0.15)
+    assert client.chat("- Сырники", deadline=time.monotonic() + 0.05) is None
+    # проба оборвана дедлайном: следующая снова пропускается
+    assert client.breaker.state == "half_open"
+    assert client.chat("- Сырники") is not None
+    assert client.breaker.state == "closed"
+
+
+def test_deadline_leaves_time_for_retry(stub):
+    server, url = stub(fail_first=1)
+    client = make(url, retries=2)
+    assert client.chat("- Сырники", deadline=time.monotonic() + 2.0) is not None
+    assert server.requests == 2
@@ -0,0 +1,102 @@
+"""Фильтры из текста запроса"""
+import pytest
+
+from catalog import load_catalog
+from filters import FilterIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FilterIndex(load_catalog())
+
+
+@pytest.mark.parametrize("text", [
+    "белковое блюдо до 30 г жира",
+    "что-нибудь до 500 ккал",
+    "приготовить до 15 минут",
+    "от 20 г белка",
+    "блюдо до 2 порций",
+    "подойдет и на 500 ккал, и до 40 г углеводов",
+    "ужин от 300 калорий",
+    "чтобы было недорого300",
+])
+def test_macros_and_time_are_not_prices(index, text):
+    spec = index.extract(text)
+    assert "price_max" not in spec and "price_min" not in spec
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ужин до 400 ₽", {"price_max": 400.0}),
+    ("до 400₽", {"price_max": 400.0}),
+    ("что-нибудь до 350 рублей", {"price_max": 350.0}),
+    ("не дороже 300 руб", {"price_max": 300.0}),
+    ("дешевле 250 р", {"price_max": 250.0}),
+    ("от 200 р", {"price_min": 200.0}),
+    ("дороже 500 руб, но до 900 руб", {"price_min": 500.0, "price_max": 900.0}),
+])
+def test_prices_with_currency(index, text, expected):
+    spec = index.extract(text)
+    assert {k: v for k, v in spec.items() if k.startswith("price")} == expected
+
+
+def test_macro_phrase_still_gets_a_dish():
+    from app import app
+    response = app.test_client().post("/recommend", json={"query": "белковое блюдо до 30 г жира"})
+    assert response.status_code == 200
+    assert response.get_json()["filters"] == {}
+
+
+@pytest.mark.parametrize("text", [
+    "что угодно, только не салат",
+    "не хочу салат",
+    "без салата",
+    "все кроме салатов",
+])
+def test_negated_category_is_excluded(index, text):
+    spec = index.extract(text)
+    assert "category" not in spec
+    assert spec["exclude_category"] == ["салат"]
+    rows = index.select(spec).rows
+    assert len(rows) and all(index.catalog.record(int(i))["category"] != "салат" for i in rows)
+
+
+def test_without_dessert_excludes_all_desserts(index):
+    rows = index.select(index.extract("без десерта")).rows
+    assert all(index.catalog.record(int(i))["category"] != "десерт" for i in rows)
+
+
+def test_without_tag_keeps_positive_diet(index):
+    spec = index.extract("вегетарианское без сыра")
+    assert spec["diet"] == ["вегетарианское"] and spec["exclude_tags"] == ["сыр"]
+
+
+def test_text_filters_are_relaxed_instead_of_404():
+    from app import app
+    response = app.test_client().post("/recommend", json={"query": "салат до 300 ₽"})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["filters"] == {"category": ["салат"]}
+    assert body["dish"]["category"] == "салат"
+
+
+def test_explicit_filters_still_404():
+    from app import app
+    response = app.test_client().post("/recommend", json={
+        "query": "салат", "filters": {"category": "салат", "price_max": 10}})
+    assert response.status_code == 404
+    assert response.get_json()["error"] == "no dishes match filters"
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", float("nan"), float("inf"), "abc", [1]])
+def test_price_filter_must_be_finite(value):
+    from filters import normalize_filters
+    with pytest.raises(ValueError, match="must be a number"):
+        normalize_filters({"price_max": value})
+
+
+def test_nan_price_is_400():
+    from app import app
+    response = app.test_client().post(
+        "/recommend", data='{"query": "ужин", "filters": {"price_max": NaN}}',
+        content_type="application/json")
+    assert response.status_code == 400
@@ -0,0 +1,68 @@
+"""llm_cache.py: ключи по нормализованному запросу, TTL и LRU обоих бэкендов"""
+from types import SimpleNamespace
+
+import pytest
+
+import llm_cache
+from llm_cache import MemoryCache, SQLiteCache, make_cache, make_key, normalize_query
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: now[0], monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make(request, tmp_path):
+    def build(maxsize, ttl):
+        return make_cache(request.param, maxsize, ttl, str(tmp_path / "llm_cache.db"))
+    return build
+
+
+def test_key_ignores_case_punctuation_and_endings():
+    assert normalize_query("Что-нибудь  ДИЕТИЧЕСКОЕ!") == "что нибуд диетическ"
+    assert make_key("Хочу лёгкий салат", "h") == make_key("хочу легкого салата!", "h")
+    # другой каталог - другой ключ
+    assert make_key("суп", "a") != make_key("суп", "b")
+
+
+def test_ttl_expires(make, clock):
+    cache = make(10, ttl=60)
+    cache.set("k", {"choice": "Борщ"})
+    clock[0] += 59
+    assert cache.get("k") == {"choice": "Борщ"}
+    clock[0] += 2
+    assert cache.get("k") is None
+    # просроченная запись удалена при чтении
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_evicts_least_recently_used(make, clock):
+    cache = make(2, ttl=60)
+    cache.set("a", 1)
+    clock[0] += 1
+    cache.set("b", 2)
+    clock[0] += 1
+    assert cache.get("a") == 1  # a свежее b
+    clock[0] += 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["size"] == 2
+
+
+def test_sqlite_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    SQLiteCache(path).set("k", {"choice": "Борщ", "target_macros": {"calories": None}})
+    other = SQLiteCache(path)
+    assert other.get("k") == {"choice": "Борщ", "target_macros": {"calories": None}}
+    assert other.stats() == {"backend": "sqlite", "size": 1, "hits": 1, "misses": 0}
+
+
+def test_unknown_backend():
+    assert isinstance(make_cache("memory"), MemoryCache)
+    with pytest.raises(ValueError, match="unknown LLM cache backend"):
+        make_cache("redis")
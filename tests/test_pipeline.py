@@ -0,0 +1,101 @@
+"""Конвейер /recommend: разбор тела, переходы между стадиями, попадание в кеш LLM"""
+import json
+
+import pytest
+
+import recommender
+from llm_cache import MemoryCache
+from pipeline import Context, Pipeline, build_pipeline, recommend_pipeline
+from pipeline.stages import parse
+
+
+@pytest.mark.parametrize("query", [5, None, ["суп"], {"q": "суп"}, "  "])
+def test_non_string_query_is_400(query):
+    ctx = Context({"query": query}, "test")
+    parse(ctx)
+    assert ctx.status == 400 and ctx.result == {"error": "empty query"}
+
+
+def recording(names, jumps=None):
+    """Конвейер из стадий, которые пишут своё имя в calls; jumps - {стадия: куда прыгнуть}"""
+    calls = []
+
+    def stage(name):
+        def run(ctx):
+            calls.append(name)
+            if jumps and name in jumps:
+                ctx.jump(jumps[name])
+        return run
+
+    return Pipeline([(name, stage(name)) for name in names]), calls
+
+
+def test_jump_skips_forward():
+    pipeline, calls = recording("abcde", {"b": "d"})
+    pipeline.run(None)
+    assert calls == ["a", "b", "d", "e"]
+
+
+def test_jump_never_goes_back():
+    pipeline, calls = recording("abcd", {"c": "a"})
+    pipeline.run(None)
+    assert calls == ["a", "b", "c", "d"]
+
+
+def test_jump_to_unknown_stage_ends_run():
+    pipeline, calls = recording("abc", {"a": "nowhere"})
+    pipeline.run(None)
+    assert calls == ["a"]
+
+
+def test_resume_starts_at_stage():
+    pipeline, calls = recording("abcd", {"b": "d"})
+    pipeline.resume(Context(), "b")
+    assert calls == ["b", "d"]
+
+
+def test_stage_error_is_500():
+    def boom(ctx):
+        raise RuntimeError("boom")
+
+    pipeline, calls = recording("abc")
+    ctx = pipeline.replace("b", boom).run(None)
+    assert calls == ["a"] and ctx.status == 500 and json.loads(ctx.body) == {"error": "Internal server error"}
+    with pytest.raises(ValueError, match="unknown stages"):
+        build_pipeline(nope=boom)
+
+
+@pytest.fixture
+def cached_pick(monkeypatch):
+    """Ключ DeepSeek задан, а выбор для запроса уже в кеше"""
+    query = "что-нибудь на ужин"
+    cache = MemoryCache(16, 60)
+    monkeypatch.setattr(recommender, "api_key", "stub")
+    monkeypatch.setattr(recommender, "llm_cache", cache)
+    name = recommender.catalog.record(0)["name"]
+    selection = recommender.select_dishes(query, None)
+    cache.set(recommender.cache_key_for(query, selection),
+              {"choice": name, "reason": "из кеша", "target_macros": None})
+    return query, name
+
+
+def test_cache_hit_skips_pick(cached_pick):
+    query, name = cached_pick
+
+    def pick(ctx):
+        raise AssertionError("при попадании в кеш DeepSeek не спрашивают")
+
+    ctx = recommend_pipeline.replace("pick", pick).run({"query": query})
+    assert ctx.status == 200 and ctx.llm["reason"] == "из кеша"
+    body = json.loads(ctx.body)
+    assert body["dish"]["name"] == name and body["reason"] == "из кеша"
+
+
+def test_cache_hit_after_resume(cached_pick):
+    # как asgi.py: admit и parse отдельно, дальше resume
+    query, name = cached_pick
+    pipeline = recommend_pipeline.replace("pick", lambda ctx: pytest.fail("pick"))
+    ctx = Context({"query": query})
+    parse(ctx)
+    pipeline.resume(ctx, "retrieve")
+    assert ctx.status == 200 and json.loads(ctx.body)["dish"]["name"] == name
@@ -0,0 +1,64 @@
+"""Разбор тела /plan"""
+import pytest
+
+from planner import parse_plan_payload
+
+
+@pytest.mark.parametrize("caps", [{"десерт": "много"}, {"десерт": None}, {"десерт": [1]}, {"десерт": -1}])
+def test_invalid_caps_are_rejected(caps):
+    with pytest.raises(ValueError, match="max_per_category"):
+        parse_plan_payload({"targets": {"calories": 900}, "max_per_category": caps})
+
+
+def test_caps_are_integers():
+    params = parse_plan_payload({"max_per_category": {"десерт": "1", "суп": 2}})
+    assert params["max_per_category"] == {"десерт": 1, "суп": 2}
+
+
+def test_string_diets_and_categories():
+    params = parse_plan_payload({"diets": "вегетарианское", "categories": ["десерт", " "]})
+    assert params["diets"] == ["вегетарианское"]
+    assert params["categories"] == ["десерт"]
+
+
+@pytest.mark.parametrize("diets", [42, {"a": 1}, ["вегетарианское", 1]])
+def test_invalid_diets_are_rejected(diets):
+    with pytest.raises(ValueError, match="diets"):
+        parse_plan_payload({"diets": diets})
+
+
+@pytest.mark.parametrize("payload", [None, [1], "plan"])
+def test_payload_must_be_object(payload):
+    with pytest.raises(ValueError, match="invalid json"):
+        parse_plan_payload(payload)
+
+
+@pytest.mark.parametrize("payload", [{"targets": {"calories": "nan"}}, {"targets": {"proteins": "inf"}},
+                                     {"max_price": "nan"}, {"max_price": "-inf"},
+                                     {"time_budget_ms": "inf"}])
+def test_non_finite_numbers_are_rejected(payload):
+    with pytest.raises(ValueError, match="invalid plan parameters"):
+        parse_plan_payload(payload)
+
+
+def test_endpoint_rejects_bad_json_with_json_400():
+    from app import app
+    client = app.test_client()
+    for body in (b"[1]", b"not json"):
+        response = client.post("/plan", data=body, content_type="application/json")
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "invalid json"}
+    response = client.post("/plan", json={"max_price": "nan"})
+    assert response.status_code == 400
+
+
+def test_endpoint():
+    from app import app
+    client = app.test_client()
+    response = client.post("/plan", json={"targets": {"calories": 900}, "max_per_category": {"десерт": "x"}})
+    assert response.status_code == 400
+    response = client.post("/plan", json={"targets": {"calories": 900}, "courses": 2,
+                                          "diets": "вегетарианское"})
+    assert response.status_code == 200
+    dishes = response.get_json()["dishes"]
+    assert len(dishes) == 2 and all(d["diet"] == "вегетарианское" for d in dishes)
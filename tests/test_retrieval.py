@@ -0,0 +1,29 @@
+"""Поисковый индекс: файл .retrieval.npz рядом с каталогом"""
+import numpy as np
+
+import retrieval
+from benchmarks.common import synthetic_dishes
+from data import COLUMNS
+
+
+def build(n=50):
+    dishes = [dict(zip(COLUMNS, r)) for r in synthetic_dishes(n)]
+    return retrieval.RetrievalIndex.build([retrieval.dish_document(d) for d in dishes])
+
+
+def test_saved_index_round_trips(tmp_path):
+    path = str(tmp_path / "catalog.db.retrieval.npz")
+    index = build()
+    index.save(path, "fp")
+    loaded = retrieval.RetrievalIndex.load(path, "fp")
+    assert loaded is not None and loaded.size == index.size
+    np.testing.assert_array_equal(loaded.weights, index.weights)
+    assert retrieval.RetrievalIndex.load(path, "other") is None
+
+
+def test_index_of_other_version_is_ignored(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.db.retrieval.npz")
+    build().save(path, "fp")
+    # NGRAM/DIM/формат поменялись - старый файл не годится
+    monkeypatch.setattr(retrieval, "VERSION", "0:2:1024")
+    assert retrieval.RetrievalIndex.load(path, "fp") is None
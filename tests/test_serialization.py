@@ -0,0 +1,82 @@
+"""serialization.encode: склейка готовых фрагментов блюд даёт тот же JSON, что и json.dumps"""
+import json
+
+import pytest
+
+from serialization import DishFragments, encode, etag, not_modified
+
+DISHES = [
+    {"name": "Борщ", "category": "суп", "price": 250.0, "tags": "свёкла,горячее", "image_url": "https://x/1.jpg"},
+    {"name": "Салат \"Цезарь\"", "category": "салат", "price": 320.5, "tags": "", "image_url": None},
+    {"name": "Чизкейк", "category": "десерт", "price": 190, "tags": "сладкое", "image_url": ""},
+]
+
+
+class Catalog:
+    """Минимальный каталог: record/index_of как у catalog.Catalog"""
+
+    def __len__(self):
+        return len(DISHES)
+
+    def record(self, position):
+        return dict(DISHES[position])
+
+    def index_of(self, name):
+        names = [d["name"] for d in DISHES]
+        return names.index(name) if name in names else None
+
+
+def reference(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@pytest.fixture(params=[True, False], ids=["precomputed", "lazy"])
+def fragments(request):
+    return DishFragments(Catalog(), precompute=request.param)
+
+
+@pytest.mark.parametrize("data", [
+    {"dish": DISHES[0], "alternatives": [DISHES[2], DISHES[1]], "reason": "тёплое",
+     "target_macros": {"calories": 500, "proteins": None}},
+    # блюдо не из каталога кодируется как есть
+    {"dish": {"name": "Новое блюдо", "price": 1.5}, "alternatives": [DISHES[0], {"name": "Ещё"}],
+     "reason": None},
+    {"dish": DISHES[1], "reason": "без alternatives"},
+    {"dish": DISHES[2], "alternatives": []},
+    {"dish": DISHES[0]},
+])
+def test_encode_matches_json_dumps(fragments, data):
+    body = encode(data, fragments)
+    assert json.loads(body) == data
+    assert body == reference(data)
+
+
+def test_non_dish_bodies_are_dumped(fragments):
+    for data in ({"error": "empty query"}, {"dish": None, "reason": "нет"}):
+        assert json.loads(encode(data, fragments)) == data
+    assert json.loads(encode({"dish": DISHES[0]})) == {"dish": DISHES[0]}
+
+
+def test_lazy_fragments_encode_each_dish_once():
+    fragments = DishFragments(Catalog(), precompute=False)
+    assert len(fragments) == 0
+    encode({"dish": DISHES[0], "alternatives": [DISHES[0], DISHES[1]]}, fragments)
+    assert len(fragments) == 2
+
+
+def test_not_modified():
+    tag = etag(b'{"dish":1}')
+    assert not_modified(f'"{tag}"', tag)
+    assert not_modified(f'W/"{tag}", "other"', tag)
+    assert not_modified("*", tag)
+    assert not not_modified('"other"', tag) and not not_modified(None, tag)
+
+
+def test_real_catalog_round_trips():
+    import recommender
+    catalog = recommender.catalog
+    dishes = [catalog.record(p) for p in range(min(len(catalog), 4))]
+    data = {"dish": dishes[0], "alternatives": dishes[1:], "reason": "ок",
+            "target_macros": {"calories": 600.0, "proteins": None, "fats": None, "carbs": 70}}
+    body = encode(data, recommender.fragments)
+    assert json.loads(body) == data and body == reference(data)
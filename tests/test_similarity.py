@@ -0,0 +1,78 @@
+"""Инкрементальное добавление в граф похожих блюд против полной пересборки"""
+import numpy as np
+import pytest
+
+import similarity
+from benchmarks.common import synthetic_dishes
+from data import COLUMNS
+from similarity import SimilarityGraph
+from shared_catalog import publish, add_dish, Generations
+
+
+def records(n, seed=0):
+    return [dict(zip(COLUMNS, r)) for r in synthetic_dishes(n, seed)]
+
+
+def assert_same_graph(added, rebuilt):
+    assert added.neighbors.shape == rebuilt.neighbors.shape
+    for row in range(len(rebuilt)):
+        # наборы соседей совпадают; порядок внутри равных близостей не важен
+        assert set(added.neighbors[row].tolist()) == set(rebuilt.neighbors[row].tolist()), row
+        np.testing.assert_allclose(np.sort(added.weights[row]), np.sort(rebuilt.weights[row]),
+                                   rtol=1e-5)
+
+
+@pytest.mark.parametrize("size", [5, 200])
+def test_add_matches_rebuild(size):
+    dishes = records(size + 3)
+    graph = SimilarityGraph.build(dishes[:size], k=8)
+    for dish in dishes[size:]:
+        graph.add(dish)
+    # та же нормировка КБЖУ, что у инкрементального графа
+    rebuilt = SimilarityGraph.build(dishes, k=8, scale=(graph.mean, graph.std))
+    assert_same_graph(graph, rebuilt)
+
+
+def test_add_pins_curated_both_ways():
+    dishes = records(50)
+    new = dict(dishes[-1], recommendations=f"{dishes[3]['name']},{dishes[7]['name']}")
+    dishes[10] = dict(dishes[10], recommendations=new["name"])
+    graph = SimilarityGraph.build(dishes[:-1], k=8)
+    graph.add(new, curated=[3, 7], referenced_by=[10])
+    rebuilt = SimilarityGraph.build(dishes[:-1] + [new], k=8, scale=(graph.mean, graph.std))
+    assert graph.companions(49)[:2] == [3, 7]
+    assert graph.companions(10)[0] == 49
+    assert_same_graph(graph, rebuilt)
+
+
+def test_add_dish_republishes_shared_generation(tmp_path):
+    rows = synthetic_dishes(60)
+    first = publish(str(tmp_path), rows, source="test")
+    current = Generations(str(tmp_path)).get()
+    # граф поколения лежит в read-only mmap: add() не должен писать в него
+    frozen = current.similarity_graph(8)
+    before = frozen.neighbors.copy()
+    frozen.add(current.record(0) | {"name": "Проба"})
+    np.testing.assert_array_equal(current.similarity_graph(8).neighbors, before)
+
+    dish = dict(zip(COLUMNS, synthetic_dishes(61)[-1]))
+    second = add_dish(str(tmp_path), dish)
+    assert second != first
+    updated = Generations(str(tmp_path)).get()
+    assert len(updated) == 61 and updated.source == "test"
+    assert updated.get(dish["name"])["name"] == dish["name"]
+    graph = updated.similarity_graph(8)
+    rebuilt = SimilarityGraph.build(updated.records(), k=8, scale=(graph.mean, graph.std))
+    assert_same_graph(graph, rebuilt)
+
+    with pytest.raises(ValueError):
+        add_dish(str(tmp_path), dish)
+
+
+def test_graph_of_other_version_is_ignored(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.db.graph.npz")
+    SimilarityGraph.build(records(20), k=4).save(path, "fp")
+    assert SimilarityGraph.load(path, "fp").k == 4
+    # MACRO_WEIGHT/формат поменялись - старый файл не годится
+    monkeypatch.setattr(similarity, "VERSION", "0:1.0")
+    assert SimilarityGraph.load(path, "fp") is None
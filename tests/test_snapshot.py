@@ -0,0 +1,69 @@
+"""Снимок каталога для slim_app.py: свежесть закоммиченного файла, холодный старт, WSGI"""
+import os, io, sys, json, subprocess
+from wsgiref.util import setup_testing_defaults
+
+from data import DISHES, fingerprint
+from snapshot import SNAPSHOT_PATH, build_snapshot, load_snapshot, _read
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_committed_snapshot_matches_dishes():
+    # упал - после правки data.DISHES выполнить python snapshot.py и закоммитить catalog.snapshot
+    data = _read(SNAPSHOT_PATH)
+    assert data is not None
+    assert data["fingerprint"] == fingerprint(DISHES)
+
+
+def test_stale_snapshot_is_rebuilt(tmp_path):
+    path = str(tmp_path / "catalog.snapshot")
+    build_snapshot(path, DISHES[:-1])
+    assert _read(path) is None
+    catalog = load_snapshot(path)
+    assert len(catalog) == len(DISHES)
+    assert catalog.fingerprint == fingerprint(DISHES)
+
+
+def test_slim_app_uses_snapshot_without_heavy_imports():
+    # без ключа DeepSeek импорт не тянет ни numpy (индексы собираются при первом запросе),
+    # ни requests/sqlite3 (клиента и кеша LLM нет)
+    code = ("import sys, slim_app, recommender; "
+            "heavy = [m for m in ('pandas', 'flask', 'numpy', 'requests', 'sqlite3', 'asyncio') "
+            "if m in sys.modules]; "
+            "print(type(recommender.catalog).__name__, heavy)")
+    env = {k: v for k, v in os.environ.items() if k != "CATALOG_SOURCE"}
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                         check=True, env=dict(env, DEEPSEEK_API_KEY="")).stdout
+    assert out.strip().splitlines()[-1] == "SnapshotCatalog []"
+
+
+def call(path="/recommend", method="GET", query="", body=None, **headers):
+    import slim_app
+    environ = {"PATH_INFO": path, "REQUEST_METHOD": method, "QUERY_STRING": query}
+    if body is not None:
+        data = json.dumps(body).encode()
+        environ.update({"CONTENT_LENGTH": str(len(data)), "wsgi.input": io.BytesIO(data)})
+    environ.update({f"HTTP_{k.upper()}": v for k, v in headers.items()})
+    setup_testing_defaults(environ)
+    seen = {}
+
+    def start_response(status, response_headers):
+        seen["status"], seen["headers"] = int(status.split()[0]), dict(response_headers)
+
+    body = b"".join(slim_app.app(environ, start_response))
+    return seen["status"], seen["headers"], body
+
+
+def test_slim_app_runs_the_pipeline(monkeypatch):
+    import recommender
+    monkeypatch.setattr(recommender, "api_key", None)
+    status, headers, body = call(query="query=что-нибудь+на+ужин", x_trace="1")
+    assert status == 200 and json.loads(body)["dish"]["name"]
+    assert "pick" in headers["Server-Timing"] and "ETag" in headers["Access-Control-Expose-Headers"]
+
+    status, _, body = call(query="query=что-нибудь+на+ужин", if_none_match=headers["ETag"])
+    assert status == 304 and body == b""
+
+    assert call(method="POST", body={"query": "ужин", "k": "x"})[:1] == (400,)
+    assert call(method="POST", body=["ужин"])[0] == 400
+    assert call(path="/plan")[0] == 404
@@ -0,0 +1,177 @@
+"""/recommend/stream: stream_recommendation и DeepSeekClient.chat_stream против потоковой заглушки"""
+import json, time
+
+import pytest
+
+import recommender
+from admission import ConcurrencyGate, Deadline, RateLimiter
+from deepseek_client import DeepSeekClient
+from llm_cache import MemoryCache
+from rules import partial_choice
+
+
+@pytest.fixture
+def streaming(stub, monkeypatch):
+    """Поднимает заглушку и направляет на неё recommender; возвращает server"""
+    def start(**kwargs):
+        server, url = stub(**kwargs)
+        monkeypatch.setattr(recommender, "api_key", "stub")
+        monkeypatch.setattr(recommender, "deepseek", DeepSeekClient("stub", base_url=url, retries=0))
+        monkeypatch.setattr(recommender, "llm_cache", MemoryCache(16, 60))
+        return server
+    return start
+
+
+def events(query="что-нибудь на ужин", filters=None, k=1):
+    selection = recommender.select_dishes(query, filters)
+    return list(recommender.stream_recommendation(query, k, selection))
+
+
+def names(stream):
+    return [event for event, _ in stream]
+
+
+def test_event_order(streaming):
+    streaming(chunk_chars=8)
+    stream = events()
+    assert names(stream) == ["local", "choice", "llm", "companions", "done"]
+    data = dict(stream)
+    assert data["choice"]["llm_choice"] == data["llm"]["llm_choice"]
+    assert data["choice"]["dish"]["name"] == data["choice"]["llm_choice"]
+    assert data["companions"]["recommendations"]
+
+
+def test_event_order_without_key(monkeypatch):
+    monkeypatch.setattr(recommender, "api_key", None)
+    assert names(events()) == ["local", "companions", "done"]
+
+
+def test_cached_choice_skips_stream(streaming):
+    server = streaming()
+    events()
+    assert names(events()) == ["local", "llm", "companions", "done"]
+    assert server.requests == 1
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 2, 3, 5, 7, 64])
+def test_choice_on_any_chunk_boundary(streaming, chunk_chars):
+    streaming(chunk_chars=chunk_chars)
+    stream = events()
+    assert names(stream) == ["local", "choice", "llm", "companions", "done"]
+    assert dict(stream)["choice"]["llm_choice"] == dict(stream)["llm"]["llm_choice"]
+
+
+def test_full_llm_queue_keeps_local_choice(streaming, monkeypatch):
+    server = streaming()
+    monkeypatch.setattr(recommender, "llm_gate", ConcurrencyGate(0, 0))
+    assert names(events()) == ["local", "companions", "done"]
+    assert server.requests == 0
+
+
+def test_deadline_cuts_stream(streaming):
+    server = streaming(chunk_chars=1, token_delay=0.05)
+    started = time.monotonic()
+    stream = list(recommender.stream_recommendation("что-нибудь на ужин", deadline=Deadline(0.3)))
+    assert time.monotonic() - started < 1.0
+    assert names(stream) == ["local", "companions", "done"]
+    assert server.requests == 1
+    assert recommender.deepseek.breaker.state == "closed"
+
+
+def test_endpoint_is_rate_limited(monkeypatch):
+    from app import app
+    monkeypatch.setattr(recommender, "api_key", None)
+    monkeypatch.setattr("pipeline.stages.limiter", RateLimiter(0.1, 1))
+    client = app.test_client()
+    assert client.get("/recommend/stream?query=ужин").status_code == 200
+    response = client.get("/recommend/stream?query=ужин")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_partial_choice_waits_for_closing_quote():
+    name = 'Суп "Том ям"'
+    content = json.dumps({"choice": name, "reason": "тест"}, ensure_ascii=False)
+    closed = content.index('"reason"')
+    for end in range(len(content) + 1):
+        found = partial_choice(content[:end])
+        # имя появляется, только когда закрыта его кавычка, и сразу целиком
+        assert found is None or found == name
+        if end >= closed:
+            assert found == name
+
+
+def test_provider_disconnect_withdraws_choice(streaming):
+    # первые куски несут {"choice": "..."}, затем заглушка рвёт соединение
+    streaming(chunk_chars=8, truncate_after=8)
+    stream = events()
+    assert names(stream) == ["local", "choice", "withdraw", "companions", "done"]
+    data = dict(stream)
+    assert data["withdraw"]["llm_choice"] == data["choice"]["llm_choice"]
+    # похожие блюда - к локальному выбору, который остался в силе
+    assert data["companions"]["recommendations"] == recommender.companions_for(data["local"]["dish"]["name"])
+    assert recommender.deepseek.breaker.state == "closed"
+
+
+def test_invalid_json_withdraws_choice(streaming):
+    streaming()
+    # поток закончился без обрыва, но ответ - не JSON целиком: choice объявлен, разбор не прошёл
+    recommender.deepseek.chat_stream = lambda prompt, **kwargs: iter(['{"choice": "Сырники", ', '"reason": '])
+    assert names(events()) == ["local", "choice", "withdraw", "companions", "done"]
+
+
+def test_client_disconnect_closes_upstream(streaming, monkeypatch):
+    streaming(chunk_chars=4, token_delay=0.01)
+    closed = []
+    original = recommender.deepseek.chat_stream
+
+    def tracked(prompt, **kwargs):
+        try:
+            yield from original(prompt, **kwargs)
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(recommender.deepseek, "chat_stream", tracked)
+    stream = recommender.stream_recommendation("что-нибудь на ужин")
+    for event, _ in stream:
+        if event == "choice":
+            break
+    stream.close()
+    assert closed == [True]
+
+
+def test_filtered_out_choice_is_not_announced(streaming):
+    # DeepSeek выбирает блюдо не из фильтра: ни choice, ни llm, остаётся локальный выбор
+    streaming(responder=lambda prompt: {"choice": "Курица с овощами", "reason": "stub",
+                                        "target_macros": {}})
+    stream = events("что-нибудь", filters={"category": "десерт"})
+    assert names(stream) == ["local", "companions", "done"]
+    assert dict(stream)["local"]["dish"]["category"] == "десерт"
+
+
+def test_unknown_choice_is_not_announced(streaming):
+    streaming(responder=lambda prompt: {"choice": "Борщ", "reason": "stub", "target_macros": {}})
+    assert names(events()) == ["local", "companions", "done"]
+
+
+def test_chat_stream_yields_content_pieces(stub):
+    server, url = stub(chunk_chars=5)
+    pieces = list(DeepSeekClient("stub", base_url=url).chat_stream("- Сырники"))
+    assert all(len(p) <= 5 for p in pieces)
+    assert json.loads("".join(pieces))["choice"] == "Сырники"
+
+
+def test_chat_stream_stops_at_deadline(stub):
+    server, url = stub(chunk_chars=1, token_delay=0.05)
+    started = time.monotonic()
+    content = "".join(DeepSeekClient("stub", base_url=url).chat_stream(
+        "- Сырники", deadline=started + 0.2))
+    assert time.monotonic() - started < 0.6
+    assert 0 < len(content) < 10
+
+
+def test_chat_stream_retries_before_first_byte(stub):
+    server, url = stub(fail_first=1)
+    client = DeepSeekClient("stub", base_url=url, retries=1, backoff=0.01)
+    assert json.loads("".join(client.chat_stream("- Сырники")))["choice"] == "Сырники"
+    assert server.requests == 2